@@ -0,0 +1,108 @@
+#!/usr/bin/env python3.11
+"""Mixed read/write throughput on a copy of the SQLite database, untuned vs tuned engine settings.
+
+"untuned" reproduces the previous engine: rollback journal, synchronous=FULL
+and the driver's default 5 s lock timeout. "tuned" uses the defaults from
+src/db_config.py (WAL, synchronous=NORMAL, busy_timeout, mmap, cache).
+
+Usage: python benchmarks/db_concurrency.py [--threads 8] [--seconds 5] [--write-ratio 0.2]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from src.db_config import DEFAULT_SQLITE_PATH, engine_options, sqlite_pragmas, apply_sqlite_pragmas
+
+UNTUNED = {
+    'SQLITE_JOURNAL_MODE': 'DELETE',
+    'SQLITE_SYNCHRONOUS': 'FULL',
+    'SQLITE_BUSY_TIMEOUT': '5000',
+    'SQLITE_MMAP_SIZE': '0',
+    'SQLITE_CACHE_SIZE': '-2000',
+}
+
+READ = text(
+    'SELECT id, name, price_per_day FROM tool WHERE is_available = 1 '
+    'ORDER BY created_at DESC LIMIT 20'
+)
+WRITE = text('INSERT INTO bench_write (payload, created_at) VALUES (:payload, CURRENT_TIMESTAMP)')
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def run(label, environ, source, args):
+    workdir = tempfile.mkdtemp(prefix='toolshare-bench-')
+    path = os.path.join(workdir, 'app.db')
+    shutil.copy(source, path)
+    url = f'sqlite:///{path}'
+    engine = create_engine(url, **engine_options(url, environ))
+    apply_sqlite_pragmas(engine, sqlite_pragmas(environ))
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE IF NOT EXISTS bench_write (id INTEGER PRIMARY KEY, payload TEXT, created_at DATETIME)'))
+
+    stats = {'read': [], 'write': [], 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def worker(seed):
+        rng = random.Random(seed)
+        reads, writes, errors = [], [], 0
+        while time.perf_counter() < deadline:
+            is_write = rng.random() < args.write_ratio
+            started = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    if is_write:
+                        conn.execute(WRITE, {'payload': 'x' * 200})
+                    else:
+                        conn.execute(READ).fetchall()
+            except OperationalError:
+                errors += 1
+                continue
+            (writes if is_write else reads).append(time.perf_counter() - started)
+        with lock:
+            stats['read'] += reads
+            stats['write'] += writes
+            stats['errors'] += errors
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    for kind in ('read', 'write'):
+        latencies = stats[kind]
+        print(f'{label:<9}{kind:<7}{len(latencies) / args.seconds:>10.1f}'
+              f'{percentile(latencies, 0.5) * 1000:>10.2f}{percentile(latencies, 0.95) * 1000:>10.2f}'
+              f'{percentile(latencies, 0.99) * 1000:>10.2f}{stats["errors"] if kind == "write" else "":>8}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default=DEFAULT_SQLITE_PATH, help='SQLite file to copy')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    args = parser.parse_args()
+
+    print(f'{args.threads} threads, {args.seconds:g}s, {args.write_ratio:.0%} writes')
+    print(f'{"config":<9}{"op":<7}{"ops/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"errors":>8}')
+    run('untuned', UNTUNED, args.database, args)
+    run('tuned', {}, args.database, args)
+
+if __name__ == '__main__':
+    main()
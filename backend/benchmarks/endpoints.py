@@ -0,0 +1,333 @@
+#!/usr/bin/env python3.11
+"""Latency percentiles, throughput, SQL query counts and peak RSS for the hot API endpoints.
+
+Each dataset runs in a fresh process against a scratch copy of a
+generate_dataset.py snapshot (built on first use for each of --scales, or
+given with --dataset). Requests go through the Flask test client
+(sequential), a real multi-threaded HTTP server (--threads clients with
+keep-alive connections), or both. Every endpoint gets --warmup requests
+first, then --requests measured ones, as the dataset's busiest lender.
+
+Query counts come from the X-Query-Count header (src/instrumentation.py),
+which streamed responses (the CSV export) only count up to their first
+chunk. RSS is the process's resident set, sampled after every request.
+
+Results are written as JSON. --compare reads a saved run and flags
+endpoints whose p95 grew by more than --threshold (and --min-delta-ms), or
+that issue more queries; the exit status is 1 when anything regressed.
+
+Usage: python benchmarks/endpoints.py [--scales 0.1,1] [--modes client,server] [--requests 200]
+                                      [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:  # no procfs: the process-wide peak is the best available
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+def endpoints(ids, anchor):
+    """(name, path) for the benchmarked GET endpoints."""
+    available_from = anchor + timedelta(days=3)
+    window = f'available_from={available_from.date()}&available_to={(available_from + timedelta(days=7)).date()}'
+    return [
+        ('tools.list', '/api/tools/'),
+        ('tools.search', '/api/tools/?search=drill'),
+        ('tools.filter', f"/api/tools/?category_id={ids['category']}&sort_by=price_low"),
+        ('tools.available', f'/api/tools/?{window}'),
+        ('tools.detail', f"/api/tools/{ids['tool']}"),
+        ('tools.availability', f"/api/tools/{ids['tool']}/availability"),
+        ('tools.insights', f"/api/tools/{ids['tool']}/insights"),
+        ('tools.mine', '/api/tools/my-tools'),
+        ('categories.list', '/api/categories/'),
+        ('categories.tools', f"/api/categories/{ids['category']}/tools"),
+        ('bookings.list', '/api/bookings/'),
+        ('bookings.lender', '/api/bookings/?type=lender'),
+        ('messages.conversations', '/api/messages/conversations'),
+        ('messages.thread', f"/api/messages/booking/{ids['booking']}"),
+        ('reviews.tool', f"/api/reviews/tool/{ids['tool']}"),
+        ('reviews.user', f"/api/reviews/user/{ids['user']}"),
+        ('dashboard.stats', '/api/dashboard/stats'),
+        ('analytics.earnings', '/api/analytics/earnings?range=year'),
+        ('analytics.export', '/api/analytics/export?range=year'),
+        ('notifications.list', '/api/notifications/'),
+    ]
+
+def pick_ids():
+    """The busiest lender, their most-booked tool and most-messaged booking."""
+    from sqlalchemy import func
+    from src.models.user import db, Tool, Booking, Message, Category
+
+    user_id = db.session.query(Booking.lender_id).group_by(Booking.lender_id).order_by(
+        func.count(Booking.id).desc()
+    ).limit(1).scalar()
+    tool_id = db.session.query(Booking.tool_id).filter(Booking.lender_id == user_id).group_by(Booking.tool_id).order_by(
+        func.count(Booking.id).desc()
+    ).limit(1).scalar()
+    booking_id = db.session.query(Message.booking_id).join(Booking, Booking.id == Message.booking_id).filter(
+        Booking.lender_id == user_id
+    ).group_by(Message.booking_id).order_by(func.count(Message.id).desc()).limit(1).scalar()
+    category_id = db.session.query(Tool.category_id).filter(Tool.id == tool_id).scalar()
+    return {
+        'user': user_id, 'tool': tool_id, 'booking': booking_id or 0,
+        'category': category_id or db.session.query(func.min(Category.id)).scalar()
+    }
+
+def measure(request, count, warmup, threads=1):
+    """Run request() warmup + count times over `threads` threads; return the endpoint's metrics."""
+    for _ in range(warmup):
+        request()
+
+    latencies, queries = [], []
+    stats = {'errors': 0, 'bytes': 0, 'rss': rss_mb()}
+    lock = threading.Lock()
+
+    def run(n):
+        for _ in range(n):
+            started = time.perf_counter()
+            status, query_count, size = request()
+            elapsed = (time.perf_counter() - started) * 1000
+            rss = rss_mb()
+            with lock:
+                latencies.append(elapsed)
+                queries.append(query_count)
+                stats['bytes'] += size
+                stats['errors'] += status >= 400
+                stats['rss'] = max(stats['rss'], rss)
+
+    started = time.perf_counter()
+    if threads == 1:
+        run(count)
+    else:
+        pool = [threading.Thread(target=run, args=(count // threads + (i < count % threads),)) for i in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+    wall = time.perf_counter() - started
+
+    return {
+        'requests': len(latencies),
+        'errors': stats['errors'],
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        'throughput_rps': round(len(latencies) / wall, 1) if wall else 0.0,
+        'queries': round(sum(queries) / len(queries), 2) if queries else 0,
+        'response_bytes': stats['bytes'] // max(1, len(latencies)),
+        'rss_peak_mb': round(stats['rss'], 1)
+    }
+
+def run_client(app, user_id, targets, args):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+
+    results = {}
+    for name, path in targets:
+        def request():
+            response = client.get(path)
+            size = len(response.get_data())
+            return response.status_code, int(response.headers.get('X-Query-Count', 0)), size
+        results[name] = measure(request, args.requests, args.warmup)
+    return results
+
+def run_server(app, user_id, targets, args):
+    from werkzeug.serving import make_server, WSGIRequestHandler
+
+    class Handler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, one connection per client thread
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+    cookie = f"session={client.get_cookie('session').value}"
+    local = threading.local()
+
+    results = {}
+    try:
+        for name, path in targets:
+            def request():
+                connection = getattr(local, 'connection', None)
+                if connection is None:
+                    connection = local.connection = http.client.HTTPConnection('127.0.0.1', server.server_port)
+                connection.request('GET', path, headers={'Cookie': cookie})
+                response = connection.getresponse()
+                size = len(response.read())
+                return response.status, int(response.getheader('X-Query-Count', 0)), size
+            results[name] = measure(request, args.requests, args.warmup, args.threads)
+    finally:
+        server.shutdown()
+    return results
+
+def worker_main(config):
+    args = argparse.Namespace(**config)
+    from src.main import app
+
+    with app.app_context():
+        ids = pick_ids()
+    targets = endpoints(ids, datetime.fromisoformat(args.anchor))
+    if args.only:
+        targets = [(name, path) for name, path in targets if any(name.startswith(prefix) for prefix in args.only)]
+
+    runs = {}
+    for mode in args.modes:
+        runs[mode] = (run_client if mode == 'client' else run_server)(app, ids['user'], targets, args)
+    print(json.dumps({'ids': ids, 'runs': runs}))
+
+def ensure_snapshot(scale, seed):
+    from generate_dataset import default_output
+    output = default_output(scale, seed)
+    if not os.path.exists(output):
+        subprocess.run([sys.executable, os.path.join(BACKEND, 'generate_dataset.py'), '--scale', f'{scale:g}', '--seed', str(seed)],
+                       cwd=BACKEND, check=True)
+    return output
+
+def run_dataset(path, args):
+    manifest_path = os.path.splitext(path)[0] + '.json'
+    manifest = json.load(open(manifest_path)) if os.path.exists(manifest_path) else {}
+    workdir = tempfile.mkdtemp(prefix='toolshare-bench-')
+    try:
+        scratch = os.path.join(workdir, 'app.db')
+        shutil.copy(path, scratch)
+        env = dict(os.environ, DATABASE_URL=f'sqlite:///{scratch}', PASSWORD_HASH_WORKERS='0')
+        if args.no_cache:
+            env.update(RESPONSE_CACHE_ENABLED='0', DASHBOARD_STATS_CACHE_TTL='0')
+        config = {
+            'modes': args.modes, 'requests': args.requests, 'warmup': args.warmup, 'threads': args.threads,
+            'only': args.only, 'anchor': manifest.get('anchor') or datetime.utcnow().date().isoformat()
+        }
+        output = subprocess.run(
+            [sys.executable, __file__, '--worker', json.dumps(config)],
+            env=env, cwd=BACKEND, capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()
+        result = json.loads(output[-1])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    result['dataset'] = os.path.splitext(os.path.basename(path))[0]
+    result['manifest'] = manifest
+    return result
+
+def print_run(dataset, mode, endpoints):
+    print(f'\n{dataset} / {mode}')
+    print(f'{"endpoint":<24}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"req/s":>9}{"queries":>9}{"RSS MB":>9}{"errors":>8}')
+    for name, metrics in endpoints.items():
+        print(f'{name:<24}{metrics["p50_ms"]:>9.2f}{metrics["p95_ms"]:>9.2f}{metrics["p99_ms"]:>9.2f}'
+              f'{metrics["throughput_rps"]:>9.1f}{metrics["queries"]:>9g}{metrics["rss_peak_mb"]:>9.1f}{metrics["errors"]:>8}')
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Return regression descriptions for endpoints slower or chattier than in baseline."""
+    saved = {
+        (run['dataset'], mode, name): metrics
+        for run in baseline['datasets'] for mode, endpoints in run['runs'].items() for name, metrics in endpoints.items()
+    }
+    regressions = []
+    for run in results['datasets']:
+        for mode, endpoints in run['runs'].items():
+            for name, metrics in endpoints.items():
+                before = saved.get((run['dataset'], mode, name))
+                if before is None:
+                    continue
+                key = f"{run['dataset']} / {mode} / {name}"
+                delta = metrics['p95_ms'] - before['p95_ms']
+                if delta > min_delta_ms and metrics['p95_ms'] > before['p95_ms'] * (1 + threshold):
+                    regressions.append(f"{key}: p95 {before['p95_ms']:.2f} -> {metrics['p95_ms']:.2f} ms")
+                if metrics['queries'] > before['queries']:
+                    regressions.append(f"{key}: queries {before['queries']:g} -> {metrics['queries']:g}")
+                if metrics['errors'] > before['errors']:
+                    regressions.append(f"{key}: errors {before['errors']} -> {metrics['errors']}")
+    return regressions
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == '--worker':
+        worker_main(json.loads(sys.argv[2]))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', default='0.1,1', help='generated dataset sizes ("" for none)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--dataset', action='append', default=[], help='extra snapshot path (repeatable)')
+    parser.add_argument('--modes', default='client,server')
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=8, help='client threads in server mode')
+    parser.add_argument('--only', default='', help='comma-separated endpoint name prefixes, e.g. tools,dashboard')
+    parser.add_argument('--no-cache', action='store_true', help='disable the response and dashboard caches')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--compare', help='baseline results JSON to flag regressions against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative p95 growth')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help='ignore p95 growth below this')
+    args = parser.parse_args()
+    args.modes = [mode for mode in args.modes.split(',') if mode]
+    args.only = [prefix for prefix in args.only.split(',') if prefix]
+
+    paths = [ensure_snapshot(float(scale), args.seed) for scale in args.scales.split(',') if scale]
+    paths += [os.path.abspath(path) for path in args.dataset]
+
+    results = {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(), 'revision': git_revision(),
+            'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'requests': args.requests, 'warmup': args.warmup, 'threads': args.threads, 'no_cache': args.no_cache
+        },
+        'datasets': []
+    }
+    for path in paths:
+        run = run_dataset(path, args)
+        results['datasets'].append(run)
+        for mode, endpoints in run['runs'].items():
+            print_run(run['dataset'], mode, endpoints)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+        print(f'\nResults written to {args.output}')
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            regressions = compare(results, json.load(baseline), args.threshold, args.min_delta_ms)
+        print(f'\n{len(regressions)} regression(s) against {args.compare}')
+        for regression in regressions:
+            print(f'  {regression}')
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3.11
+"""Write throughput of POST /api/messages/ with and without the group-commit write queue.
+
+Each mode runs in a fresh process against its own copy of the SQLite database.
+
+Usage: python benchmarks/group_commit.py [--threads 1,4,16,32] [--seconds 3]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+def worker_main(threads, seconds):
+    from datetime import datetime, timedelta
+    from src.main import app
+    from src.models.user import db, User, Tool, Booking
+
+    with app.app_context():
+        booking = Booking.query.first()
+        if booking is None:  # the copy is scratch, so seed one booking to message on
+            tool = Tool.query.first()
+            borrower = User.query.filter(User.id != tool.owner_id).first()
+            start = datetime.utcnow() + timedelta(days=1)
+            booking = Booking(tool_id=tool.id, borrower_id=borrower.id, lender_id=tool.owner_id,
+                              start_date=start, end_date=start + timedelta(days=1), total_price=tool.price_per_day)
+            db.session.add(booking)
+            db.session.commit()
+        booking_id, sender_id, receiver_id = booking.id, booking.borrower_id, booking.lender_id
+
+    counts = [0] * threads
+    errors = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def run(index):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = sender_id
+        while time.perf_counter() < deadline:
+            response = client.post('/api/messages/', json={
+                'booking_id': booking_id, 'receiver_id': receiver_id, 'content': 'benchmark'
+            })
+            if response.status_code == 201:
+                counts[index] += 1
+            else:
+                errors[index] += 1
+
+    pool = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    queue = app.extensions.get('write_queue')
+    batch = f'{queue.jobs / queue.batches:.1f}' if queue and queue.batches else '-'
+    print(f'{sum(counts) / seconds:.1f} {sum(errors)} {batch}')
+
+def run_mode(enabled, threads, seconds):
+    workdir = tempfile.mkdtemp(prefix='toolshare-bench-')
+    try:
+        path = os.path.join(workdir, 'app.db')
+        shutil.copy(os.path.join(BACKEND, 'src', 'database', 'app.db'), path)
+        env = dict(os.environ, DATABASE_URL=f'sqlite:///{path}', WRITE_QUEUE_ENABLED='1' if enabled else '0')
+        output = subprocess.run(
+            [sys.executable, __file__, '--worker', str(threads), str(seconds)],
+            env=env, cwd=BACKEND, capture_output=True, text=True, check=True
+        ).stdout.split()
+        return float(output[-3]), int(output[-2]), output[-1]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == '--worker':
+        worker_main(int(sys.argv[2]), float(sys.argv[3]))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', default='1,4,16,32')
+    parser.add_argument('--seconds', type=float, default=3)
+    args = parser.parse_args()
+
+    print(f'{"threads":>8}{"direct w/s":>12}{"errors":>8}{"queued w/s":>12}{"errors":>8}{"avg batch":>11}')
+    for threads in [int(value) for value in args.threads.split(',')]:
+        direct, direct_errors, _ = run_mode(False, threads, args.seconds)
+        queued, queued_errors, batch = run_mode(True, threads, args.seconds)
+        print(f'{threads:>8}{direct:>12.1f}{direct_errors:>8}{queued:>12.1f}{queued_errors:>8}{batch:>11}')
+
+if __name__ == '__main__':
+    main()
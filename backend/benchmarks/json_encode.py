@@ -0,0 +1,74 @@
+#!/usr/bin/env python3.11
+"""Encode throughput of a 1k-tool listing page, per JSON provider and projection.
+
+Usage: python benchmarks/json_encode.py [--tools 1000] [--repeat 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask.json.provider import DefaultJSONProvider
+from src.main import app
+from src.models.user import User, Category, Tool, ToolImage
+from src.models.serializers import serialize_tools, TOOL_LIST_PROJECTION
+from src.json_provider import FastJSONProvider, orjson
+
+def build_tools(count):
+    """Transient tools shaped like a real page: 50 owners, 8 categories, 2 images each."""
+    now = datetime(2025, 1, 1)
+    owners = [User(id=i, username=f'user{i}', email=f'user{i}@example.com', full_name=f'User {i}',
+                   location='Medijana', is_verified=True, rating_count=3, average_rating=4.5,
+                   created_at=now, updated_at=now) for i in range(50)]
+    categories = [Category(id=i, name=f'Category {i}', description='Tools', icon_url='/icons/x.svg') for i in range(8)]
+    tools = []
+    for i in range(count):
+        tool = Tool(id=i, owner_id=i % 50, category_id=i % 8, name=f'Tool {i}', brand_model='DEWALT DCD771C2',
+                    description='Cordless drill with two batteries and charger. ' * 3, condition='Good',
+                    price_per_hour=3.0, price_per_day=15.0, price_per_week=80.0, security_deposit=50.0,
+                    pickup_delivery_options='pickup', is_available=True, rating_count=2, average_rating=4.0,
+                    created_at=now - timedelta(minutes=i), updated_at=now)
+        tool.owner = owners[i % 50]
+        tool.category = categories[i % 8]
+        tool.images = [ToolImage(id=i * 2 + j, tool_id=i, image_url=f'/img/{i}-{j}.jpg', is_primary=j == 0, created_at=now)
+                       for j in range(2)]
+        tools.append(tool)
+    return tools
+
+def measure(provider, tools, projection, repeat):
+    app.json = provider
+    best = None
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = app.json.response({'tools': serialize_tools(tools, projection), 'total': len(tools)})
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+        size = len(response.get_data())
+    return best, size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tools', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    providers = [('default', DefaultJSONProvider(app))]
+    if orjson is not None:
+        providers.append(('fast', FastJSONProvider(app)))
+    else:
+        print('orjson is not installed; only the default provider is measured')
+
+    with app.test_request_context():
+        tools = build_tools(args.tools)
+        print(f'{"provider":<10}{"projection":<12}{"ms/page":>10}{"pages/s":>10}{"tools/s":>12}{"bytes":>10}')
+        for name, provider in providers:
+            for label, projection in (('full', None), ('compact', TOOL_LIST_PROJECTION)):
+                best, size = measure(provider, tools, projection, args.repeat)
+                print(f'{name:<10}{label:<12}{best * 1000:>10.2f}{1 / best:>10.1f}{args.tools / best:>12.0f}{size:>10}')
+
+if __name__ == '__main__':
+    main()
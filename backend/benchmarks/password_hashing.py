@@ -0,0 +1,47 @@
+#!/usr/bin/env python3.11
+"""Password checks (logins) per second, total and per core, for a hashing method and pool size.
+
+Usage: python benchmarks/password_hashing.py [--method scrypt:32768:8:1] [--workers N] [--threads 16] [--logins 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.passwords import PasswordHasher, PasswordHasherBusy, DEFAULT_METHOD
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--method', default=DEFAULT_METHOD)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='process pool size, 0 = inline')
+    parser.add_argument('--threads', type=int, default=16, help='concurrent request threads')
+    parser.add_argument('--logins', type=int, default=200)
+    args = parser.parse_args()
+
+    hasher = PasswordHasher(args.method, workers=args.workers, max_pending=args.threads)
+    password_hash = hasher.hash('password123')
+    hasher.verify(password_hash, 'password123')  # start the pool
+
+    def login(_):
+        try:
+            return hasher.verify(password_hash, 'password123')
+        except PasswordHasherBusy:
+            return None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as threads:
+        results = list(threads.map(login, range(args.logins)))
+    elapsed = time.perf_counter() - started
+    hasher.shutdown()
+
+    ok = sum(1 for result in results if result)
+    cores = min(max(args.workers, 1), os.cpu_count() or 1)
+    print(f'method={hasher.method_prefix} workers={args.workers} threads={args.threads}')
+    print(f'{ok} logins in {elapsed:.2f}s, {len(results) - ok} rejected as busy')
+    print(f'{ok / elapsed:.1f} logins/s, {ok / elapsed / cores:.1f} logins/s per core')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3.11
+"""Generate a deterministic synthetic ToolShare dataset as a SQLite snapshot.
+
+--scale 1 is about 2k users, 10k tools and half a million rows in all
+(bookings, messages, reviews, images); row counts grow linearly with it.
+The same --seed, --scale and --anchor always produce the same rows (only the
+salted password hash differs). Rows are generated tool by tool and written
+with bulk Core inserts, --chunk-size rows per transaction. The derived tables
+(rating aggregates, earnings rollup, read marks, search index) are then
+rebuilt the way the app would. The result is a standalone database file
+plus a .json manifest. An existing snapshot is reused unless --force is given.
+
+Every user logs in as user<N>@example.com with password123.
+
+Usage: python generate_dataset.py [--scale 1] [--seed 42] [--anchor 2025-07-01] [--output PATH]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+BACKEND = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND)
+
+USERS_PER_SCALE = 2000
+TOOLS_PER_SCALE = 10000
+OWNER_SHARE = 0.4
+MAX_BOOKINGS_PER_TOOL = 16
+MAX_MESSAGES_PER_BOOKING = 8
+PASSWORD = 'password123'
+
+CATEGORIES = [
+    ('Power Tools', 'power-tools', 'Electric and battery-powered tools for construction and DIY projects',
+     ['Cordless Drill', 'Circular Saw', 'Orbital Sander', 'Angle Grinder', 'Jigsaw', 'Impact Driver', 'Rotary Hammer']),
+    ('Hand Tools', 'hand-tools', 'Manual tools for precision work and general maintenance',
+     ['Claw Hammer', 'Wrench Set', 'Screwdriver Set', 'Hand Saw', 'Chisel Set', 'Pliers Set', 'Socket Set']),
+    ('Garden Tools', 'garden-tools', 'Tools for gardening, landscaping, and outdoor maintenance',
+     ['Lawn Mower', 'Hedge Trimmer', 'Leaf Blower', 'Chainsaw', 'Pressure Washer', 'Tiller', 'String Trimmer']),
+    ('Construction Tools', 'construction-tools', 'Heavy-duty tools for construction and building projects',
+     ['Spirit Level', 'Concrete Mixer', 'Tile Cutter', 'Scaffold Tower', 'Laser Level', 'Demolition Hammer']),
+    ('Automotive Tools', 'automotive-tools', 'Specialized tools for vehicle maintenance and repair',
+     ['Floor Jack', 'Torque Wrench', 'OBD2 Scanner', 'Battery Charger', 'Creeper', 'Engine Hoist']),
+    ('Cleaning Equipment', 'cleaning-equipment', 'Machines for deep cleaning floors, carpets and upholstery',
+     ['Carpet Cleaner', 'Wet Dry Vacuum', 'Floor Polisher', 'Steam Cleaner']),
+    ('Painting Tools', 'painting-tools', 'Sprayers, rollers and prep tools for painting jobs',
+     ['Paint Sprayer', 'Wallpaper Steamer', 'Heat Gun', 'Extension Ladder']),
+    ('Woodworking', 'woodworking', 'Shop machines for cutting, shaping and joining wood',
+     ['Table Saw', 'Router', 'Planer', 'Miter Saw', 'Band Saw', 'Biscuit Joiner']),
+]
+BRANDS = ['DeWalt', 'Bosch', 'Makita', 'Ryobi', 'Milwaukee', 'Stanley', 'Einhell', 'Black+Decker', 'Stihl', 'Husqvarna', 'Metabo', 'Hilti']
+CONDITIONS = ['Excellent', 'Very Good', 'Good', 'Fair']
+DELIVERY = ['Pickup only', 'Pickup or delivery', 'Delivery available']
+LOCATIONS = ['Niš Center', 'Medijana', 'Pantelej', 'Crveni Krst', 'Palilula', 'Dušanovac', 'Bubanj', 'Durlan', 'Ledena Stena', 'Niška Banja']
+FIRST_NAMES = ['Marko', 'Ana', 'Stefan', 'Maria', 'Petar', 'Jelena', 'Nikola', 'Milica', 'Luka', 'Ivana', 'John', 'Sara', 'Đorđe', 'Tamara', 'Filip', 'Katarina']
+LAST_NAMES = ['Petrović', 'Jovanović', 'Nikolić', 'Milić', 'Ilić', 'Đorđević', 'Stojanović', 'Marković', 'Pavlović', 'Smith', 'Doe', 'Popović', 'Živković']
+MESSAGES = [
+    'Hi, is the tool still available for these dates?', 'Yes, it is. When would you like to pick it up?',
+    'Could I pick it up in the morning?', 'Sure, 9am works for me.', 'Does it come with extra blades?',
+    'Thanks, returning it tomorrow.', 'Great, see you then!', 'Is delivery possible to my address?'
+]
+REVIEW_COMMENTS = ['Worked perfectly.', 'Great condition, would rent again.', 'Easy pickup, friendly owner.', 'Did the job.', 'A bit worn but fine.', None]
+RATING_WEIGHTS = [3, 5, 12, 35, 45]
+
+def default_output(scale, seed):
+    return os.path.join(BACKEND, 'benchmarks', 'data', f'toolshare-s{scale:g}-seed{seed}.db')
+
+class Generator:
+    def __init__(self, scale, seed, anchor, chunk_size, insert_rows):
+        self.rng = random.Random(seed)
+        self.anchor = anchor
+        self.chunk_size = chunk_size
+        self.insert_rows = insert_rows
+        self.user_count = max(10, round(USERS_PER_SCALE * scale))
+        self.tool_count = max(10, round(TOOLS_PER_SCALE * scale))
+        self.counts = {}
+        self.pending = {}
+        self.pending_rows = 0
+        self.next_id = {}
+
+    def _id(self, table):
+        self.next_id[table] = self.next_id.get(table, 0) + 1
+        return self.next_id[table]
+
+    def add(self, table, row):
+        self.pending.setdefault(table, []).append(row)
+        self.pending_rows += 1
+        if self.pending_rows >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        # Parents before children, one transaction per chunk
+        tables = [table for table in ('user', 'category', 'tool', 'tool_image', 'booking', 'message', 'review') if self.pending.get(table)]
+        self.insert_rows([(table, self.pending[table]) for table in tables])
+        for table in tables:
+            self.counts[table] = self.counts.get(table, 0) + len(self.pending[table])
+        self.pending = {}
+        self.pending_rows = 0
+
+    def _days_ago(self, low, high):
+        return self.anchor - timedelta(days=self.rng.randint(low, high), minutes=self.rng.randint(0, 1439))
+
+    def users(self, password_hash):
+        rng = self.rng
+        self.user_created = {}
+        for _ in range(self.user_count):
+            user_id = self._id('user')
+            created = self._days_ago(60, 900)
+            self.user_created[user_id] = created
+            self.add('user', {
+                'id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@example.com',
+                'password_hash': password_hash,
+                'full_name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                'profile_picture_url': None,
+                'phone_number': f'+381 18 {rng.randint(100, 999)} {rng.randint(100, 999)}',
+                'location': rng.choice(LOCATIONS), 'is_verified': rng.random() < 0.7,
+                'created_at': created, 'updated_at': created
+            })
+        # A minority of users own tools, a few of them many (power-law-ish)
+        self.owners = rng.sample(range(1, self.user_count + 1), max(1, int(self.user_count * OWNER_SHARE)))
+
+    def categories(self):
+        for name, _, description, _ in CATEGORIES:
+            category_id = self._id('category')
+            self.add('category', {'id': category_id, 'name': name, 'description': description,
+                                  'icon_url': f'/icons/{CATEGORIES[category_id - 1][1]}.svg'})
+
+    def tools(self):
+        rng = self.rng
+        for _ in range(self.tool_count):
+            tool_id = self._id('tool')
+            owner_id = self.owners[int(len(self.owners) * rng.random() ** 2)]
+            category_id = rng.randint(1, len(CATEGORIES))
+            _, slug, _, items = CATEGORIES[category_id - 1]
+            item = rng.choice(items)
+            brand = rng.choice(BRANDS)
+            price_per_day = float(rng.randint(3, 40))
+            created = max(self.user_created[owner_id], self._days_ago(30, 700))
+            self.add('tool', {
+                'id': tool_id, 'owner_id': owner_id, 'category_id': category_id,
+                'name': f'{brand} {item}', 'brand_model': f'{brand} {rng.choice("ABCDEFGHKMX")}{rng.randint(100, 9999)}',
+                'description': f'{item} by {brand}, well maintained. {rng.choice(MESSAGES[:1] + REVIEW_COMMENTS[:4])}',
+                'condition': rng.choice(CONDITIONS),
+                'price_per_hour': round(price_per_day / 4, 1), 'price_per_day': price_per_day,
+                'price_per_week': price_per_day * 5, 'security_deposit': price_per_day * rng.choice([3, 5, 8]),
+                'pickup_delivery_options': rng.choice(DELIVERY), 'is_available': rng.random() < 0.95,
+                'rating_sum': 0, 'rating_count': 0, 'average_rating': 0.0,
+                'created_at': created, 'updated_at': created
+            })
+            item_slug = item.lower().replace(' ', '-')
+            for position in range(rng.randint(1, 4)):
+                self.add('tool_image', {
+                    'id': self._id('tool_image'), 'tool_id': tool_id, 'is_primary': position == 0,
+                    'image_url': f'/src/assets/tools/{slug}/{brand.lower().replace("+", "")}-{item_slug}-{position + 1}.jpg',
+                    'created_at': created
+                })
+            self.bookings(tool_id, owner_id, price_per_day, created)
+
+    def bookings(self, tool_id, owner_id, price_per_day, tool_created):
+        rng = self.rng
+        horizon = self.anchor + timedelta(days=60)
+        cursor = tool_created + timedelta(days=rng.randint(0, 20))
+        for _ in range(rng.randint(0, MAX_BOOKINGS_PER_TOOL)):
+            # Bookings of one tool follow each other, so their intervals never overlap
+            start = cursor + timedelta(days=rng.randint(0, 21), hours=rng.randint(0, 23))
+            days = rng.randint(1, 7)
+            end = start + timedelta(days=days)
+            if end > horizon:
+                break
+            cursor = end
+            if end <= self.anchor:
+                status = 'completed' if rng.random() < 0.85 else 'cancelled'
+            elif start <= self.anchor:
+                status = 'active'
+            else:
+                status = rng.choices(['confirmed', 'pending', 'cancelled'], [6, 3, 1])[0]
+            borrower_id = rng.randint(1, self.user_count - 1)
+            if borrower_id >= owner_id:
+                borrower_id += 1
+            created = max(tool_created, start - timedelta(days=rng.randint(1, 14), hours=rng.randint(0, 23)))
+            booking_id = self._id('booking')
+            self.add('booking', {
+                'id': booking_id, 'tool_id': tool_id, 'borrower_id': borrower_id, 'lender_id': owner_id,
+                'start_date': start, 'end_date': end, 'total_price': price_per_day * days,
+                'security_deposit': None, 'status': status, 'pickup_delivery_method': rng.choice(DELIVERY),
+                'created_at': created, 'updated_at': min(end, self.anchor)
+            })
+            self.messages(booking_id, borrower_id, owner_id, created, start)
+            if status == 'completed':
+                self.reviews(booking_id, tool_id, borrower_id, owner_id, end)
+
+    def messages(self, booking_id, borrower_id, lender_id, created, start):
+        rng = self.rng
+        sent = created
+        for position in range(rng.randint(0, MAX_MESSAGES_PER_BOOKING)):
+            sender, receiver = (borrower_id, lender_id) if position % 2 == 0 else (lender_id, borrower_id)
+            sent = min(sent + timedelta(minutes=rng.randint(5, 600)), max(start, sent))
+            self.add('message', {
+                'id': self._id('message'), 'booking_id': booking_id, 'sender_id': sender, 'receiver_id': receiver,
+                'content': MESSAGES[(position + booking_id) % len(MESSAGES)],
+                'is_read': sent < self.anchor - timedelta(days=2) or rng.random() < 0.5,
+                'created_at': sent
+            })
+
+    def reviews(self, booking_id, tool_id, borrower_id, lender_id, end):
+        rng = self.rng
+        written = [('tool_review', borrower_id, lender_id)] if rng.random() < 0.7 else []
+        if rng.random() < 0.4:
+            written.append(('user_review', lender_id, borrower_id))
+        for review_type, reviewer_id, reviewee_id in written:
+            created = end + timedelta(days=rng.randint(0, 5), hours=rng.randint(0, 23))
+            self.add('review', {
+                'id': self._id('review'), 'booking_id': booking_id, 'reviewer_id': reviewer_id,
+                'reviewee_id': reviewee_id, 'tool_id': tool_id,
+                'rating': rng.choices(range(1, 6), RATING_WEIGHTS)[0],
+                'comment': rng.choice(REVIEW_COMMENTS), 'review_type': review_type, 'created_at': created
+            })
+
+def generate(args, output):
+    partial = output + '.partial'
+    for path in (partial, partial + '-wal', partial + '-shm'):
+        if os.path.exists(path):
+            os.remove(path)
+
+    # The app creates the schema (tables, indexes, search triggers) in the new file
+    os.environ.update({
+        'DATABASE_URL': f'sqlite:///{partial}', 'SQLITE_SYNCHRONOUS': 'OFF',
+        'WRITE_QUEUE_ENABLED': '0', 'PASSWORD_HASH_WORKERS': '0'
+    })
+    from sqlalchemy import text
+    from src.main import app
+    from src.models.user import db
+    from src.passwords import get_password_hasher
+    from src.models.ratings import reconcile_rating_aggregates
+    from src.models.earnings import rebuild_earnings_rollup
+    from src.models.read_marks import backfill_read_marks
+
+    with app.app_context():
+        tables = db.metadata.tables
+
+        def insert_rows(batches):
+            with db.engine.begin() as conn:
+                for table, rows in batches:
+                    conn.execute(tables[table].insert(), rows)
+
+        generator = Generator(args.scale, args.seed, args.anchor, args.chunk_size, insert_rows)
+        generator.categories()
+        generator.users(get_password_hasher().hash(PASSWORD))
+        generator.tools()
+        generator.flush()
+
+        reconcile_rating_aggregates()
+        rebuild_earnings_rollup()
+        backfill_read_marks()
+        with db.engine.begin() as conn:
+            conn.execute(text('ANALYZE'))
+        # Fold the WAL back in so the snapshot is a single file
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)')
+            conn.exec_driver_sql('PRAGMA journal_mode=DELETE')
+        db.engine.dispose()
+
+    counts = dict(generator.counts)
+    os.replace(partial, output)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--anchor', type=lambda value: datetime.strptime(value, '%Y-%m-%d'), default=datetime(2025, 7, 1),
+                        help="'now' for the dataset: bookings before it are history, after it upcoming")
+    parser.add_argument('--chunk-size', type=int, default=20000, help='rows per insert transaction')
+    parser.add_argument('--output', help='snapshot path (default benchmarks/data/toolshare-s<scale>-seed<seed>.db)')
+    parser.add_argument('--force', action='store_true', help='regenerate an existing snapshot')
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output or default_output(args.scale, args.seed))
+    manifest_path = os.path.splitext(output)[0] + '.json'
+    if os.path.exists(output) and not args.force:
+        print(f'Snapshot exists: {output} (use --force to regenerate)')
+        return
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    started = time.perf_counter()
+    counts = generate(args, output)
+    elapsed = time.perf_counter() - started
+
+    with open(manifest_path, 'w') as manifest:
+        json.dump({
+            'scale': args.scale, 'seed': args.seed, 'anchor': args.anchor.date().isoformat(),
+            'rows': counts, 'password': PASSWORD
+        }, manifest, indent=2)
+    total = sum(counts.values())
+    print(f"{total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s): "
+          + ', '.join(f'{table} {count}' for table, count in counts.items()))
+    print(f'Snapshot: {output}')
+    print(f'Use it with: DATABASE_URL=sqlite:///{output}')
+
+if __name__ == '__main__':
+    main()
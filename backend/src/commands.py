@@ -0,0 +1,44 @@
+import click
+from src.models.user import db
+from src.models.migrations import upgrade_schema
+from src.models.watermarks import SCOPES, bump_watermarks
+from src.query_plans import check_query_plans
+
+def register_commands(app):
+    @app.cli.command('upgrade-db')
+    def upgrade_db_command():
+        """Add missing tables, columns, indexes and search index to the database."""
+        changes = upgrade_schema()
+        for change in changes:
+            click.echo(f'Added {change}')
+        click.echo('Database is up to date')
+
+    @app.cli.command('bump-cache-watermarks')
+    @click.argument('scopes', nargs=-1, type=click.Choice(SCOPES))
+    def bump_cache_watermarks_command(scopes):
+        """Invalidate cached responses for SCOPES (default all), e.g. after manual SQL."""
+        scopes = set(scopes or SCOPES)
+        with db.engine.begin() as conn:
+            bump_watermarks(conn, scopes)
+        click.echo(f"Bumped {', '.join(sorted(scopes))}")
+
+    @app.cli.command('check-query-plans')
+    def check_query_plans_command():
+        """EXPLAIN QUERY PLAN every query issued by the read endpoints; fail on full table scans."""
+        if db.engine.dialect.name != 'sqlite':
+            raise click.ClickException('check-query-plans requires an SQLite database')
+
+        endpoints, errors, plans = check_query_plans(app)
+        for endpoint, status in errors:
+            click.echo(f'{endpoint}: HTTP {status}', err=True)
+
+        failures = 0
+        for statement, (sources, scans) in plans.items():
+            if scans:
+                failures += 1
+                click.echo(f"FULL SCAN ({', '.join(sorted(sources))}): {'; '.join(scans)}")
+                click.echo(f'    {" ".join(statement.split())}')
+
+        click.echo(f'Checked {len(plans)} statements from {len(endpoints)} endpoints, {failures} with full scans')
+        if failures:
+            raise SystemExit(1)
@@ -0,0 +1,201 @@
+import itertools
+import json
+import queue
+import threading
+import uuid
+from collections import OrderedDict, deque
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session, scoped_session
+
+# In-process pub/sub behind the /api/events/ Server-Sent Events stream.
+# Writes queue their events with publish_after_commit(); they reach the
+# broker only when the transaction commits (a rolled-back write or
+# savepoint drops its events). Each open stream is a subscriber queue for
+# one user, so an idle tab costs a thread blocked on that queue and a
+# heartbeat comment every SSE_HEARTBEAT seconds, and no database work.
+#
+# Event ids are "<epoch>-<seq>": epoch changes on every restart. The broker
+# keeps each user's last SSE_REPLAY_SIZE events so a reconnect with
+# Last-Event-ID gets what it missed; when that is not possible (restart,
+# backlog overflowed, slow consumer) the stream sends a `resync` event and
+# the client refetches over the REST endpoints. The broker is per process:
+# run a single worker process, or events only reach streams on the process
+# that handled the write.
+
+class TooManyStreams(Exception):
+    pass
+
+class _Backlog:
+    __slots__ = ('events', 'dropped')
+
+    def __init__(self, size):
+        self.events = deque(maxlen=size)
+        self.dropped = 0  # highest seq that fell out of the backlog
+
+class _Subscription:
+    __slots__ = ('user_id', 'queue', 'overflowed')
+
+    def __init__(self, user_id, size):
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=size)
+        self.overflowed = False
+
+class EventBroker:
+    def __init__(self, max_streams=256, max_streams_per_user=8, replay_size=100,
+                 replay_users=10000, queue_size=256, heartbeat=15.0, retry_ms=3000):
+        self.max_streams = max_streams
+        self.max_streams_per_user = max_streams_per_user
+        self.replay_size = replay_size
+        self.replay_users = replay_users
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.retry_ms = retry_ms
+        self.epoch = uuid.uuid4().hex[:8]
+        self.streams = 0
+        self._seq = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._backlogs = OrderedDict()
+        self._evicted = 0  # highest seq held by a backlog evicted as least recently used
+
+    def _frame(self, seq, event_type, payload):
+        return f'id: {self.epoch}-{seq}\nevent: {event_type}\ndata: {payload}\n\n'
+
+    def _backlog(self, user_id):
+        backlog = self._backlogs.get(user_id)
+        if backlog is None:
+            backlog = self._backlogs[user_id] = _Backlog(self.replay_size)
+            if len(self._backlogs) > self.replay_users:
+                _, evicted = self._backlogs.popitem(last=False)
+                if evicted.events:
+                    self._evicted = max(self._evicted, evicted.events[-1][0])
+        else:
+            self._backlogs.move_to_end(user_id)
+        return backlog
+
+    def publish(self, user_id, event_type, data):
+        payload = json.dumps(data, separators=(',', ':'), default=str)
+        with self._lock:
+            seq = self._seq = next(self._ids)
+            frame = self._frame(seq, event_type, payload)
+            backlog = self._backlog(user_id)
+            if len(backlog.events) == backlog.events.maxlen:
+                backlog.dropped = backlog.events[0][0]
+            backlog.events.append((seq, frame))
+            subscribers = tuple(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(frame)
+            except queue.Full:
+                subscription.overflowed = True
+
+    def _missed(self, user_id, last_event_id):
+        """Frames after last_event_id, [] for a fresh connection, None if they can't be replayed."""
+        if not last_event_id:
+            return []
+        epoch, _, seq = last_event_id.partition('-')
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self._seq:
+            return None
+        seq = int(seq)
+        backlog = self._backlogs.get(user_id)
+        if backlog is None:
+            return [] if seq >= self._evicted else None
+        if seq < backlog.dropped:
+            return None
+        return [frame for event_seq, frame in backlog.events if event_seq > seq]
+
+    def subscribe(self, user_id, last_event_id=None):
+        """Register a stream for user_id; return it with the frames it missed (None: resync)."""
+        with self._lock:
+            streams = self._subscribers.setdefault(user_id, set())
+            if self.streams >= self.max_streams or len(streams) >= self.max_streams_per_user:
+                if not streams:
+                    del self._subscribers[user_id]
+                raise TooManyStreams('Too many open event streams')
+            subscription = _Subscription(user_id, self.queue_size)
+            streams.add(subscription)
+            self.streams += 1
+            # Taken under the lock, so nothing published in between is lost or doubled
+            return subscription, self._missed(user_id, last_event_id)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            streams = self._subscribers.get(subscription.user_id)
+            if streams and subscription in streams:
+                streams.discard(subscription)
+                self.streams -= 1
+                if not streams:
+                    del self._subscribers[subscription.user_id]
+
+    def _resync(self):
+        return self._frame(self._seq, 'resync', '{}')
+
+    def stream(self, subscription, missed):
+        """The SSE body for a subscription; unsubscribes when the client goes away."""
+        try:
+            yield f'retry: {self.retry_ms}\n\n'
+            if missed is None:
+                yield self._resync()
+            else:
+                yield from missed
+            while True:
+                try:
+                    frame = subscription.queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if subscription.overflowed:
+                    yield self._resync()
+                    return
+                yield frame
+        finally:
+            self.unsubscribe(subscription)
+
+def get_event_broker():
+    if has_app_context():
+        return current_app.extensions.get('event_broker')
+    return None
+
+def publish_after_commit(session, user_ids, event_type, data):
+    """Queue an event for user_ids, published once the session's transaction commits."""
+    if isinstance(session, scoped_session):
+        session = session()
+    transaction = session.get_nested_transaction() or session.get_transaction() or session.begin()
+    pending = session.info.setdefault('pending_events', [])
+    pending.extend((transaction, user_id, event_type, data) for user_id in set(user_ids))
+
+def _within(transaction, ancestor):
+    while transaction is not None:
+        if transaction is ancestor:
+            return True
+        transaction = transaction.parent
+    return False
+
+@event.listens_for(Session, 'after_commit')
+def _publish_pending_events(session):
+    pending = session.info.pop('pending_events', None)
+    broker = get_event_broker()
+    if pending and broker is not None:
+        for _, user_id, event_type, data in pending:
+            broker.publish(user_id, event_type, data)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _drop_pending_events(session, previous_transaction):
+    pending = session.info.get('pending_events')
+    if not pending:
+        return
+    if previous_transaction.nested:
+        session.info['pending_events'] = [p for p in pending if not _within(p[0], previous_transaction)]
+    else:
+        session.info.pop('pending_events', None)
+
+def init_event_broker(app):
+    if app.config.get('SSE_ENABLED', True):
+        app.extensions['event_broker'] = EventBroker(
+            max_streams=app.config.get('SSE_MAX_STREAMS', 256),
+            max_streams_per_user=app.config.get('SSE_MAX_STREAMS_PER_USER', 8),
+            replay_size=app.config.get('SSE_REPLAY_SIZE', 100),
+            heartbeat=app.config.get('SSE_HEARTBEAT', 15.0)
+        )
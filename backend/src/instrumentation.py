@@ -0,0 +1,189 @@
+import logging
+import re
+import time
+from flask import g, request, has_request_context
+from sqlalchemy import event, text
+from src.metrics import Registry, Counter, Histogram, Gauge, COUNT_BUCKETS, SIZE_BUCKETS
+
+# Per-request SQL and latency accounting. Engine hooks count and time every
+# statement; request hooks record, per endpoint, the query count, DB time,
+# JSON serialization time, total time and response size as histograms for
+# /api/metrics (METRICS_ENABLED). Every response carries X-Query-Count and a
+# Server-Timing header, so list endpoints can be checked for N+1 regressions
+# from the browser. Statements slower than SLOW_QUERY_MS are logged to the
+# 'toolshare.slow_queries' logger (stderr by default, SLOW_QUERY_LOG_FILE to
+# append to a file). Bound parameters are only logged with
+# SLOW_QUERY_LOG_PARAMS, by name, with values bound to REDACTED_COLUMNS
+# masked; statements run without a compiled SQLAlchemy construct (raw driver
+# SQL) have unnamed parameters and never log them. Writes run by the write
+# queue happen outside the request and are not part of its totals.
+
+slow_query_log = logging.getLogger('toolshare.slow_queries')
+
+MAX_LOGGED_PARAMS = 1000
+REDACTED_COLUMNS = frozenset({'password_hash', 'email', 'phone_number', 'content', 'message', 'comment'})
+BIND_SUFFIX = re.compile(r'(_\d+)+$')  # email_1, id_1_2 -> email, id
+
+def _endpoint():
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+def _redacted(row):
+    return {name: '<redacted>' if BIND_SUFFIX.sub('', name) in REDACTED_COLUMNS else value for name, value in row.items()}
+
+def _format_params(context, executemany):
+    if getattr(context, 'compiled', None) is None:
+        return '(unnamed, not logged)'
+    rows = context.compiled_parameters
+    if executemany:
+        shown = f'{len(rows)} rows, first {_redacted(rows[0])!r}' if rows else '0 rows'
+    else:
+        shown = repr(_redacted(rows[0])) if rows else '{}'
+    return shown if len(shown) <= MAX_LOGGED_PARAMS else shown[:MAX_LOGGED_PARAMS] + '...'
+
+def pool_status(engine):
+    """Connection pool size and use; saturation is checked-out / capacity when the pool has one."""
+    pool = engine.pool
+    status = {'class': type(pool).__name__}
+    for key, name in (('size', 'size'), ('checked_out', 'checkedout'), ('overflow', 'overflow')):
+        method = getattr(pool, name, None)
+        if callable(method):
+            status[key] = method()
+    max_overflow = getattr(pool, '_max_overflow', None)
+    if max_overflow is not None:
+        status['max_overflow'] = max_overflow
+    if 'size' in status and 'checked_out' in status and max_overflow is not None and max_overflow >= 0:
+        capacity = status['size'] + max_overflow
+        status['saturation'] = round(status['checked_out'] / capacity, 3) if capacity else None
+    return status
+
+def database_round_trip(engine):
+    """Seconds spent checking out a connection and running SELECT 1 on it."""
+    start = time.perf_counter()
+    with engine.connect() as connection:
+        checked_out = time.perf_counter()
+        connection.execute(text('SELECT 1'))
+        done = time.perf_counter()
+    return checked_out - start, done - checked_out
+
+def _register_metrics(app, engine):
+    registry = Registry()
+    labels = ('endpoint', 'method')
+    metrics = {
+        'requests': registry.register(Counter(
+            'toolshare_requests_total', 'HTTP requests by endpoint, method and status.', labels + ('status',))),
+        'duration': registry.register(Histogram(
+            'toolshare_request_duration_seconds', 'Time from request start to response headers.', labels)),
+        'queries': registry.register(Histogram(
+            'toolshare_request_queries', 'SQL statements executed per request.', labels, COUNT_BUCKETS)),
+        'db_time': registry.register(Histogram(
+            'toolshare_request_db_seconds', 'Time spent executing SQL per request.', labels)),
+        'serialize': registry.register(Histogram(
+            'toolshare_request_serialize_seconds', 'Time spent encoding JSON responses per request.', labels)),
+        'size': registry.register(Histogram(
+            'toolshare_response_size_bytes', 'Response body size (streamed responses excluded).', labels, SIZE_BUCKETS)),
+        'slow_queries': registry.register(Counter(
+            'toolshare_slow_queries_total', 'SQL statements slower than SLOW_QUERY_MS.'))
+    }
+
+    def pool_value(key):
+        return lambda: pool_status(engine).get(key)
+
+    registry.register(Gauge('toolshare_db_pool_size', 'Configured connection pool size.', pool_value('size')))
+    registry.register(Gauge('toolshare_db_pool_checked_out', 'Connections currently checked out.', pool_value('checked_out')))
+    registry.register(Gauge('toolshare_db_pool_overflow', 'Overflow connections currently open.', pool_value('overflow')))
+
+    def open_streams():
+        broker = app.extensions.get('event_broker')
+        return broker.streams if broker is not None else None
+
+    def pending_writes():
+        write_queue = app.extensions.get('write_queue')
+        return write_queue.pending() if write_queue is not None else None
+
+    registry.register(Gauge('toolshare_sse_streams', 'Open Server-Sent Events streams.', open_streams))
+    registry.register(Gauge('toolshare_write_queue_pending', 'Writes waiting for the writer thread.', pending_writes))
+    app.extensions['metrics'] = registry
+    return metrics
+
+def _configure_slow_query_log(path):
+    if path and not any(getattr(handler, 'baseFilename', None) == path for handler in slow_query_log.handlers):
+        handler = logging.FileHandler(path)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        slow_query_log.addHandler(handler)
+        slow_query_log.setLevel(logging.WARNING)
+
+def init_instrumentation(app, db):
+    """Call after init_json_provider(app), so serialization of the final JSON provider is timed."""
+    with app.app_context():
+        engine = db.engine
+    metrics = _register_metrics(app, engine) if app.config.get('METRICS_ENABLED', True) else None
+    slow_query_seconds = app.config.get('SLOW_QUERY_MS', 0) / 1000
+    log_params = app.config.get('SLOW_QUERY_LOG_PARAMS', False)
+    _configure_slow_query_log(app.config.get('SLOW_QUERY_LOG_FILE'))
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def finish_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        in_request = has_request_context()
+        if in_request:
+            g.query_count = g.get('query_count', 0) + 1
+            g.db_time = g.get('db_time', 0.0) + elapsed
+        if slow_query_seconds and elapsed >= slow_query_seconds:
+            if metrics is not None:
+                metrics['slow_queries'].inc()
+            slow_query_log.warning(
+                'slow query %.1f ms [%s] %s | params: %s',
+                elapsed * 1000,
+                f'{request.method} {_endpoint()}' if in_request else 'background',
+                ' '.join(statement.split()),
+                _format_params(context, executemany) if log_params else '(not logged)'
+            )
+
+    @event.listens_for(engine, 'handle_error')
+    def discard_failed_query(context):
+        # after_cursor_execute doesn't run for a failed statement
+        starts = context.connection.info.get('query_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    encode = app.json.response
+
+    def timed_response(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return encode(*args, **kwargs)
+        finally:
+            if has_request_context():
+                g.serialize_time = g.get('serialize_time', 0.0) + time.perf_counter() - start
+
+    app.json.response = timed_response
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        total = time.perf_counter() - g.get('request_start', time.perf_counter())
+        query_count = g.get('query_count', 0)
+        db_time = g.get('db_time', 0.0)
+        serialize_time = g.get('serialize_time', 0.0)
+        response.headers['X-Query-Count'] = str(query_count)
+        response.headers['Server-Timing'] = (
+            f'db;dur={db_time * 1000:.2f}, serialize;dur={serialize_time * 1000:.2f}, total;dur={total * 1000:.2f}'
+        )
+        if metrics is not None:
+            labels = (_endpoint(), request.method)
+            metrics['requests'].inc(*labels, str(response.status_code))
+            metrics['duration'].observe(total, *labels)
+            metrics['queries'].observe(query_count, *labels)
+            metrics['db_time'].observe(db_time, *labels)
+            metrics['serialize'].observe(serialize_time, *labels)
+            if not response.is_streamed and response.content_length is not None:
+                metrics['size'].observe(response.content_length, *labels)
+        return response
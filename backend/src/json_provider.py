@@ -0,0 +1,46 @@
+from flask.json.provider import DefaultJSONProvider
+from src.models.user import db
+
+try:
+    import orjson
+except ImportError:  # a broken install; init_json_provider warns and keeps the default provider
+    orjson = None
+
+# Fast JSON provider (FAST_JSON config, on by default) backed by orjson, a
+# required dependency in requirements.txt. Datetimes, dates and model rows
+# are encoded natively, so list serializers can skip isoformat() (see
+# native_datetimes in models/serializers.py). Output matches the default
+# provider except that object keys are not sorted.
+
+class FastJSONProvider(DefaultJSONProvider):
+    native_datetimes = True
+    option = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    @staticmethod
+    def default(obj):
+        if isinstance(obj, db.Model):
+            return obj.to_dict()
+        return DefaultJSONProvider.default(obj)
+
+    def _encode(self, obj, indent=False):
+        option = self.option | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        return self._encode(obj, kwargs.get('indent')).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._encode(obj, indent) + b'\n', mimetype=self.mimetype)
+
+def init_json_provider(app):
+    if not app.config.get('FAST_JSON'):
+        return
+    if orjson is None:
+        app.logger.warning('FAST_JSON is set but orjson is not installed; using the default JSON provider')
+        return
+    app.json = FastJSONProvider(app)
@@ -1,11 +1,22 @@
+import hmac
 import os
 import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask, Response, request, send_from_directory
 from flask_cors import CORS
 from src.models.user import db
+from src.models.migrations import upgrade_schema
+from src.db_config import configure_database, init_database
+from src.instrumentation import init_instrumentation, database_round_trip, pool_status
+from src.commands import register_commands
+from src.response_cache import init_response_cache
+from src.json_provider import init_json_provider
+from src.passwords import init_password_hasher, DEFAULT_METHOD
+from src.write_queue import init_write_queue
+from src.events import init_event_broker
+from src.profiling import init_profiling
 from src.routes.auth import auth_bp
 from src.routes.tools import tools_bp
 from src.routes.categories import categories_bp
@@ -15,6 +26,8 @@ from src.routes.messages import messages_bp
 from src.routes.notifications import notifications_bp
 from src.routes.analytics import analytics_bp
 from src.routes.dashboard import dashboard_bp
+from src.routes.events import events_bp
+from src.routes.profiles import profiles_bp
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -32,15 +45,85 @@ app.register_blueprint(messages_bp, url_prefix='/api/messages')
 app.register_blueprint(notifications_bp, url_prefix='/api/notifications')
 app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
 app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+app.register_blueprint(events_bp, url_prefix='/api/events')
+app.register_blueprint(profiles_bp, url_prefix='/api/profiles')
 
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+# Database configuration: DATABASE_URL, DB_POOL_* and SQLITE_* (see src/db_config.py)
+configure_database(app)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# Per-user dashboard stats cache lifetime in seconds (off by default; with
+# several worker processes, stats can be this many seconds stale)
+app.config['DASHBOARD_STATS_CACHE_TTL'] = int(os.environ.get('DASHBOARD_STATS_CACHE_TTL', 0))
+
+# HTTP response cache for public read endpoints (ETag/Last-Modified + body LRU)
+app.config['RESPONSE_CACHE_ENABLED'] = os.environ.get('RESPONSE_CACHE_ENABLED', '1') == '1'
+app.config['RESPONSE_CACHE_SIZE'] = int(os.environ.get('RESPONSE_CACHE_SIZE', 512))
+app.config['RESPONSE_CACHE_TTL'] = int(os.environ.get('RESPONSE_CACHE_TTL', 300))
+
+# Encode responses with orjson when it is installed (0 keeps Flask's default provider)
+app.config['FAST_JSON'] = os.environ.get('FAST_JSON', '1') == '1'
+
+# Password hashing: werkzeug method string, process pool size (0 = hash inline,
+# default one per CPU) and how many hashes may be in flight before logins get 429
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+if 'PASSWORD_HASH_WORKERS' in os.environ:
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ['PASSWORD_HASH_WORKERS'])
+if 'PASSWORD_HASH_MAX_PENDING' in os.environ:
+    app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.environ['PASSWORD_HASH_MAX_PENDING'])
+
+# Group-commit writes through a single writer thread (opt-in; batch size and
+# how long a batch stays open after its first write)
+app.config['WRITE_QUEUE_ENABLED'] = os.environ.get('WRITE_QUEUE_ENABLED', '0') == '1'
+app.config['WRITE_QUEUE_MAX_BATCH'] = int(os.environ.get('WRITE_QUEUE_MAX_BATCH', 64))
+app.config['WRITE_QUEUE_MAX_DELAY_MS'] = float(os.environ.get('WRITE_QUEUE_MAX_DELAY_MS', 0))
+
+# Server-Sent Events stream at /api/events/: open stream caps (total and per
+# user), heartbeat interval in seconds and per-user replay backlog for Last-Event-ID
+app.config['SSE_ENABLED'] = os.environ.get('SSE_ENABLED', '1') == '1'
+app.config['SSE_MAX_STREAMS'] = int(os.environ.get('SSE_MAX_STREAMS', 256))
+app.config['SSE_MAX_STREAMS_PER_USER'] = int(os.environ.get('SSE_MAX_STREAMS_PER_USER', 8))
+app.config['SSE_HEARTBEAT'] = float(os.environ.get('SSE_HEARTBEAT', 15))
+app.config['SSE_REPLAY_SIZE'] = int(os.environ.get('SSE_REPLAY_SIZE', 100))
+
+# Prometheus metrics at /api/metrics: served only with METRICS_TOKEN as a
+# bearer token, or to anyone with METRICS_PUBLIC=1 (only behind a proxy that
+# restricts the path). Slow-query log: threshold in ms (0 disables), whether
+# bound parameters are logged (off by default; sensitive columns are redacted)
+# and an optional file to append to (default stderr)
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '1') == '1'
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+app.config['METRICS_PUBLIC'] = os.environ.get('METRICS_PUBLIC', '0') == '1'
+app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', 200))
+app.config['SLOW_QUERY_LOG_PARAMS'] = os.environ.get('SLOW_QUERY_LOG_PARAMS', '0') == '1'
+app.config['SLOW_QUERY_LOG_FILE'] = os.environ.get('SLOW_QUERY_LOG_FILE')
+
+# Admin user ids (comma-separated): may profile requests and read profiles
+app.config['ADMIN_USER_IDS'] = {int(i) for i in os.environ.get('ADMIN_USER_IDS', '').split(',') if i.strip()}
+
+# Request profiling (off by default; see src/profiling.py): share of requests
+# to sample, optionally only for some url rules (comma-separated), whether
+# sampled profiles trace allocations, and the on-disk ring's directory and size
+app.config['PROFILING_ENABLED'] = os.environ.get('PROFILING_ENABLED', '0') == '1'
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+app.config['PROFILE_ENDPOINTS'] = [e.strip() for e in os.environ.get('PROFILE_ENDPOINTS', '').split(',') if e.strip()]
+app.config['PROFILE_MEMORY'] = os.environ.get('PROFILE_MEMORY', '1') == '1'
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'profiles'))
+app.config['PROFILE_MAX_COUNT'] = int(os.environ.get('PROFILE_MAX_COUNT', 50))
 db.init_app(app)
+init_database(app, db)
+init_json_provider(app)
+init_instrumentation(app, db)
+register_commands(app)
+init_response_cache(app)
+init_password_hasher(app)
+init_write_queue(app)
+init_event_broker(app)
+init_profiling(app)
 
-# Create tables
+# Create tables and apply schema upgrades
 with app.app_context():
-    db.create_all()
+    upgrade_schema()
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -60,7 +143,32 @@ def serve(path):
 
 @app.route('/api/health')
 def health_check():
-    return {'status': 'healthy', 'message': 'ToolShare API is running'}
+    try:
+        checkout, round_trip = database_round_trip(db.engine)
+    except Exception as e:
+        return {'status': 'unhealthy', 'message': 'Database is unreachable', 'error': str(e)}, 503
+    return {
+        'status': 'healthy',
+        'message': 'ToolShare API is running',
+        'database': {
+            'checkout_ms': round(checkout * 1000, 3),
+            'latency_ms': round(round_trip * 1000, 3),
+            'pool': pool_status(db.engine)
+        }
+    }
+
+@app.route('/api/metrics')
+def metrics():
+    registry = app.extensions.get('metrics')
+    if registry is None:
+        return {'error': 'Metrics are disabled'}, 404
+    token = app.config.get('METRICS_TOKEN')
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return {'error': 'Authentication required'}, 401
+    elif not app.config.get('METRICS_PUBLIC'):
+        return {'error': 'Metrics require METRICS_TOKEN'}, 403
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,78 @@
+from datetime import datetime
+from sqlalchemy import and_, exists
+from src.models.user import db, Booking, Tool
+
+# Tool availability from indexed interval queries on booking
+# (ix_booking_tool_status_dates). Busy intervals for any number of tools
+# are fetched with one query and merged in Python.
+
+# Booking statuses that block the tool for their date range
+BLOCKING_STATUSES = ('confirmed', 'active')
+
+# Longest window a client may ask about in one call
+MAX_WINDOW_DAYS = 366
+
+def parse_datetime(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+
+def _overlaps(start, end):
+    return and_(
+        Booking.status.in_(BLOCKING_STATUSES),
+        Booking.start_date < end,
+        Booking.end_date > start
+    )
+
+def has_conflict(tool_id, start, end):
+    return db.session.query(
+        Booking.query.filter(Booking.tool_id == tool_id, _overlaps(start, end)).exists()
+    ).scalar()
+
+def busy_intervals(tool_ids, start, end):
+    """Return {tool_id: [(start, end), ...]} of merged busy intervals clipped to the window."""
+    tool_ids = list(set(tool_ids))
+    busy = {tool_id: [] for tool_id in tool_ids}
+    if not tool_ids:
+        return busy
+
+    rows = db.session.query(Booking.tool_id, Booking.start_date, Booking.end_date).filter(
+        Booking.tool_id.in_(tool_ids),
+        _overlaps(start, end)
+    ).order_by(Booking.tool_id, Booking.start_date).all()
+
+    for tool_id, busy_start, busy_end in rows:
+        busy_start, busy_end = max(busy_start, start), min(busy_end, end)
+        intervals = busy[tool_id]
+        if intervals and busy_start <= intervals[-1][1]:
+            intervals[-1] = (intervals[-1][0], max(intervals[-1][1], busy_end))
+        else:
+            intervals.append((busy_start, busy_end))
+    return busy
+
+def free_intervals(busy, start, end):
+    free = []
+    cursor = start
+    for busy_start, busy_end in busy:
+        if busy_start > cursor:
+            free.append((cursor, busy_start))
+        cursor = max(cursor, busy_end)
+    if cursor < end:
+        free.append((cursor, end))
+    return free
+
+def _as_dicts(intervals):
+    return [{'start': start.isoformat(), 'end': end.isoformat()} for start, end in intervals]
+
+def tool_availability(tool_ids, start, end):
+    """Free and busy intervals for each tool over [start, end)."""
+    busy = busy_intervals(tool_ids, start, end)
+    return {
+        tool_id: {
+            'available': not intervals,
+            'busy': _as_dicts(intervals),
+            'free': _as_dicts(free_intervals(intervals, start, end))
+        } for tool_id, intervals in busy.items()
+    }
+
+def filter_available(query, start, end):
+    """Restrict a Tool query to tools with no blocking booking in [start, end)."""
+    return query.filter(~exists().where(Booking.tool_id == Tool.id, _overlaps(start, end)))
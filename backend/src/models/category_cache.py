@@ -0,0 +1,41 @@
+from sqlalchemy import func
+from src.cache import TTLCache
+from src.models.user import db, Category, Tool
+from src.models.watermarks import read_watermarks
+
+# The category catalogue (with available-tool counts) is held in a
+# process-local cache keyed on the 'tools' cache watermark, which every
+# write to tools or categories bumps (ORM flushes, imports, manual
+# bump-cache-watermarks). Every worker process therefore sees a change on
+# its next read, and a catalogue loaded alongside a write is stored under
+# the watermark read before it, never under a newer one. The TTL is a
+# backstop for writes that skip the watermark.
+
+CATALOGUE_TTL = 300
+
+_catalogue_cache = TTLCache(maxsize=4, ttl=CATALOGUE_TTL)
+
+def _load_catalogue():
+    counts = dict(db.session.query(Tool.category_id, func.count(Tool.id)).filter(
+        Tool.is_available == True
+    ).group_by(Tool.category_id).all())
+
+    catalogue = []
+    for category in Category.query.order_by(Category.id).all():
+        category_dict = category.to_dict()
+        category_dict['tool_count'] = counts.get(category.id, 0)
+        catalogue.append(category_dict)
+    return catalogue
+
+def get_category_catalogue():
+    # Keyed on (version, updated_at), read before the catalogue so the data is
+    # never older than its key; updated_at tells apart a version reused after a rollback
+    key = read_watermarks(['tools'])['tools']
+    catalogue = _catalogue_cache.get(key)
+    if catalogue is None:
+        catalogue = _load_catalogue()
+        _catalogue_cache.set(key, catalogue)
+    return catalogue
+
+def get_cached_category(category_id):
+    return next((category for category in get_category_catalogue() if category['id'] == category_id), None)
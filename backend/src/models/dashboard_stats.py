@@ -0,0 +1,89 @@
+from flask import current_app
+from sqlalchemy import event, select, func, case, true
+from sqlalchemy.orm import Session
+from src.cache import TTLCache
+from src.models.user import db, Tool, Booking, Review, Message
+from src.models.read_marks import unread_messages_count
+
+# Lender dashboard stats computed in one aggregate statement, with an
+# optional per-user cache (DASHBOARD_STATS_CACHE_TTL seconds, off by
+# default). Cached entries are dropped when a committed flush touches the
+# user's tools, bookings, reviews or received messages, but only in the
+# process that made the write: other worker processes keep serving their
+# copy until the TTL runs out, so only enable it with one worker process or
+# when stats that stale are acceptable.
+
+_stats_cache = TTLCache(maxsize=10000)
+
+def compute_dashboard_stats(user_id):
+    bookings = select(
+        func.coalesce(func.sum(case((Booking.status == 'completed', Booking.total_price), else_=0)), 0).label('total_earnings'),
+        func.count(Booking.id).label('total_bookings'),
+        func.coalesce(func.sum(case((Booking.status == 'pending', 1), else_=0)), 0).label('pending_requests')
+    ).where(Booking.lender_id == user_id).subquery()
+
+    tools = select(
+        func.coalesce(func.sum(case((Tool.is_available == True, 1), else_=0)), 0).label('active_listings'),
+        func.coalesce(func.sum(Tool.rating_sum), 0).label('rating_sum'),
+        func.coalesce(func.sum(Tool.rating_count), 0).label('rating_count')
+    ).where(Tool.owner_id == user_id).subquery()
+
+    messages = unread_messages_count(user_id).subquery()
+
+    row = db.session.execute(
+        select(bookings, tools, messages).select_from(bookings).join(tools, true()).join(messages, true())
+    ).one()
+
+    average_rating = row.rating_sum / row.rating_count if row.rating_count else 0
+    return {
+        'totalEarnings': row.total_earnings,
+        'activeListings': row.active_listings,
+        'totalBookings': row.total_bookings,
+        'averageRating': round(average_rating, 1),
+        'pendingRequests': row.pending_requests,
+        'unreadMessages': row.unread_messages
+    }
+
+def get_dashboard_stats(user_id):
+    ttl = current_app.config.get('DASHBOARD_STATS_CACHE_TTL', 0)
+    if not ttl:
+        return compute_dashboard_stats(user_id)
+
+    stats = _stats_cache.get(user_id)
+    if stats is None:
+        stats = compute_dashboard_stats(user_id)
+        _stats_cache.set(user_id, stats, ttl=ttl)
+    return stats
+
+def invalidate_dashboard_stats(*user_ids):
+    for user_id in user_ids:
+        _stats_cache.pop(user_id)
+
+def invalidate_dashboard_stats_on_commit(*user_ids):
+    """Drop the users' cached stats when the current transaction commits (for Core writes)."""
+    db.session().info.setdefault('stale_dashboard_stats', set()).update(user_ids)
+
+def _affected_user_ids(obj):
+    if isinstance(obj, Tool):
+        return [obj.owner_id]
+    if isinstance(obj, Booking):
+        return [obj.lender_id]
+    if isinstance(obj, Review):
+        return [obj.reviewee_id]
+    if isinstance(obj, Message):
+        return [obj.receiver_id]
+    return []
+
+@event.listens_for(Session, 'after_flush')
+def _collect_stale_stats(session, flush_context):
+    stale = session.info.setdefault('stale_dashboard_stats', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        stale.update(user_id for user_id in _affected_user_ids(obj) if user_id is not None)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_stale_stats(session):
+    invalidate_dashboard_stats(*session.info.pop('stale_dashboard_stats', ()))
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_stale_stats(session):
+    session.info.pop('stale_dashboard_stats', None)
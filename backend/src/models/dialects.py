@@ -0,0 +1,9 @@
+from src.models.user import db
+
+def dialect_insert():
+    """Return the INSERT construct for the bound dialect (supports on_conflict_do_update)."""
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
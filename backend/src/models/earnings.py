@@ -0,0 +1,178 @@
+from datetime import datetime, date, timedelta
+from sqlalchemy import func, desc, Date, cast
+from src.models.user import db, Tool, Category, Booking, EarningsDaily
+from src.models.dialects import dialect_insert
+
+# Earnings analytics served from the earnings_daily rollup, so long ranges
+# aggregate at most one row per tool per day instead of scanning bookings.
+
+RANGE_DAYS = {'week': 7, 'month': 30, 'quarter': 90, 'year': 365}
+GRANULARITIES = ('day', 'week', 'month')
+
+# Most buckets one history may have (about three years of days)
+MAX_BUCKETS = 1100
+
+def record_completed_booking(booking):
+    """Add a booking that just became 'completed' to the rollup (same transaction)."""
+    stmt = dialect_insert()(EarningsDaily).values(
+        tool_id=booking.tool_id,
+        day=(booking.created_at or datetime.utcnow()).date(),
+        lender_id=booking.lender_id,
+        earnings=booking.total_price,
+        bookings=1
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[EarningsDaily.tool_id, EarningsDaily.day],
+        set_={
+            'earnings': EarningsDaily.earnings + stmt.excluded.earnings,
+            'bookings': EarningsDaily.bookings + stmt.excluded.bookings
+        }
+    )
+    db.session.execute(stmt)
+
+def rebuild_earnings_rollup():
+    """Rebuild earnings_daily from completed bookings."""
+    day = func.date(Booking.created_at)
+    completed = db.session.query(
+        Booking.tool_id,
+        day,
+        Booking.lender_id,
+        func.sum(Booking.total_price),
+        func.count(Booking.id)
+    ).filter(
+        Booking.status == 'completed'
+    ).group_by(Booking.tool_id, day, Booking.lender_id)
+
+    db.session.query(EarningsDaily).delete()
+    db.session.execute(
+        EarningsDaily.__table__.insert().from_select(
+            ['tool_id', 'day', 'lender_id', 'earnings', 'bookings'], completed.statement
+        )
+    )
+    db.session.commit()
+
+def resolve_date_range(args, today=None):
+    """Return (start, end) dates, inclusive, from ?range= or ?start=/&end= (start None = all time)."""
+    today = today or datetime.utcnow().date()
+    start = args.get('start')
+    end = args.get('end')
+    if start or end:
+        start = date.fromisoformat(start) if start else None
+        end = date.fromisoformat(end) if end else today
+        if start and start > end:
+            raise ValueError('start must not be after end')
+        return start, end
+
+    time_range = args.get('range', 'month')
+    if time_range == 'all':
+        return None, today
+    if time_range not in RANGE_DAYS:
+        raise ValueError(f"range must be one of {', '.join(RANGE_DAYS)}, all")
+    return today - timedelta(days=RANGE_DAYS[time_range]), today
+
+def default_granularity(start, end):
+    if start is None or (end - start).days > 180:
+        return 'month'
+    if (end - start).days > 31:
+        return 'week'
+    return 'day'
+
+def _bucket(granularity):
+    if granularity == 'day':
+        return EarningsDaily.day
+    if db.engine.dialect.name == 'postgresql':
+        return cast(func.date_trunc(granularity, EarningsDaily.day), Date)
+    if granularity == 'week':
+        return func.date(EarningsDaily.day, 'weekday 0', '-6 days')  # Monday
+    return func.strftime('%Y-%m-01', EarningsDaily.day)
+
+def _bucket_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+def _next_bucket(day, granularity):
+    if granularity == 'week':
+        return day + timedelta(weeks=1)
+    if granularity == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+def _check_bucket_count(first, last, granularity):
+    if granularity == 'day':
+        count = (last - first).days + 1
+    elif granularity == 'week':
+        count = (last - first).days // 7 + 1
+    else:
+        count = (last.year - first.year) * 12 + last.month - first.month + 1
+    if count > MAX_BUCKETS:
+        raise ValueError(f'the range spans more than {MAX_BUCKETS} {granularity}s; use a shorter range or a coarser granularity')
+
+def _as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+def _in_range(query, start, end):
+    if start:
+        query = query.filter(EarningsDaily.day >= start)
+    return query.filter(EarningsDaily.day <= end)
+
+def earnings_history(lender_id, start, end, granularity):
+    """Earnings and booking counts per bucket, with empty buckets filled in.
+
+    Raises ValueError when that would be more than MAX_BUCKETS buckets.
+    """
+    if start is not None:
+        _check_bucket_count(_bucket_start(start, granularity), _bucket_start(end, granularity), granularity)
+    bucket = _bucket(granularity).label('period')
+    rows = _in_range(db.session.query(
+        bucket,
+        func.sum(EarningsDaily.earnings),
+        func.sum(EarningsDaily.bookings)
+    ).filter(EarningsDaily.lender_id == lender_id), start, end).group_by(bucket).order_by(bucket).all()
+
+    totals = {_as_date(period): (earnings or 0, bookings or 0) for period, earnings, bookings in rows}
+    if not totals and start is None:
+        return []
+
+    period = _bucket_start(start or min(totals), granularity)
+    last = _bucket_start(end, granularity)
+    _check_bucket_count(period, last, granularity)
+    history = []
+    while period <= last:
+        earnings, bookings = totals.get(period, (0, 0))
+        history.append({'period': period.isoformat(), 'earnings': earnings, 'bookings': bookings})
+        period = _next_bucket(period, granularity)
+    return history
+
+def top_tools(lender_id, start, end, limit=5):
+    total = func.sum(EarningsDaily.earnings).label('earnings')
+    rows = _in_range(db.session.query(
+        Tool.id,
+        Tool.name,
+        Category.name,
+        total,
+        func.sum(EarningsDaily.bookings)
+    ).join(
+        Tool, Tool.id == EarningsDaily.tool_id
+    ).outerjoin(
+        Category, Category.id == Tool.category_id
+    ).filter(EarningsDaily.lender_id == lender_id), start, end).group_by(
+        Tool.id, Tool.name, Category.name
+    ).order_by(desc(total)).limit(limit).all()
+
+    return [{
+        'id': tool_id,
+        'name': name,
+        'category': category or 'Unknown',
+        'earnings': earnings,
+        'bookings': bookings
+    } for tool_id, name, category, earnings, bookings in rows]
+
+def listing_stats(owner_id):
+    active_tools, avg_daily_rate = db.session.query(
+        func.count(Tool.id).filter(Tool.is_available == True),
+        func.avg(Tool.price_per_day)
+    ).filter(Tool.owner_id == owner_id).one()
+    return {'activeTools': active_tools, 'avgDailyRate': avg_daily_rate or 0}
@@ -0,0 +1,72 @@
+from sqlalchemy import inspect, text
+from src.models.user import db
+from src.models.search import ensure_search_index
+
+# Lightweight, idempotent schema upgrades for databases created by an older
+# version of the models. db.create_all() only creates missing tables, so new
+# columns on existing tables are added here.
+
+def add_missing_columns():
+    """Add model columns missing from existing tables; return 'table.column' names."""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+            if not column.nullable:
+                ddl += ' NOT NULL'
+            with db.engine.begin() as conn:
+                conn.execute(text(ddl))
+            added.append(f'{table.name}.{column.name}')
+
+    return added
+
+def create_missing_indexes():
+    """Create model indexes missing from existing tables; return their names."""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(db.engine)
+                created.append(index.name)
+
+    return created
+
+def upgrade_schema():
+    existing_tables = set(inspect(db.engine).get_table_names())
+    db.create_all()
+    added = [table.name for table in db.metadata.sorted_tables if existing_tables and table.name not in existing_tables]
+    added += add_missing_columns()
+    added += create_missing_indexes()
+
+    if {'tool.rating_sum', 'user.rating_sum'} & set(added):
+        from src.models.ratings import reconcile_rating_aggregates
+        reconcile_rating_aggregates()
+
+    if 'earnings_daily' in added:
+        from src.models.earnings import rebuild_earnings_rollup
+        rebuild_earnings_rollup()
+
+    if 'message_read_mark' in added:
+        from src.models.read_marks import backfill_read_marks
+        backfill_read_marks()
+
+    ensure_search_index()
+
+    return added
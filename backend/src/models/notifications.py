@@ -0,0 +1,162 @@
+from datetime import datetime
+from sqlalchemy import event, inspect, select, update, bindparam, case, func
+from sqlalchemy.orm import Session
+from src.models.user import db, User, Tool, Booking, Review, Message, Notification
+from src.events import get_event_broker, publish_after_commit
+
+# Notifications fan out from domain writes. after_flush turns the bookings,
+# status changes, messages and reviews in a flush into notification rows and
+# writes them with one executemany INSERT, plus one executemany UPDATE of
+# the per-user unread counters, in the same transaction as the write that
+# caused them. user.unread_notifications is kept in step by every insert
+# and mark-read, so the badge count is a primary-key column read. No cached
+# response shows the counter, so its UPDATEs leave the 'users' cache
+# watermark alone (see watermarks.IGNORED_COLUMNS). Each new
+# notification, with its recipient's new unread count, is also pushed to the
+# recipient's event stream once the transaction commits.
+
+MESSAGE_PREVIEW_LENGTH = 120
+
+def _status_change(booking):
+    history = inspect(booking).attrs.status.history
+    if history.has_changes() and history.deleted:
+        return booking.status
+    return None
+
+def _collect_events(session):
+    """(kind, obj) pairs for the writes in this flush that notify someone."""
+    events = []
+    for obj in session.new:
+        if isinstance(obj, Booking):
+            events.append(('booking_request', obj))
+        elif isinstance(obj, Message):
+            events.append(('new_message', obj))
+        elif isinstance(obj, Review):
+            events.append(('new_review', obj))
+    for obj in session.dirty:
+        if isinstance(obj, Booking) and obj not in session.new:
+            status = _status_change(obj)
+            if status:
+                events.append((f'booking_{status}', obj))
+    return events
+
+def _lookup_names(connection, booking_ids, user_ids):
+    tools = dict(connection.execute(
+        select(Booking.id, Tool.name).join(Tool, Tool.id == Booking.tool_id).where(Booking.id.in_(booking_ids))
+    ).all()) if booking_ids else {}
+    users = dict(connection.execute(
+        select(User.id, func.coalesce(User.full_name, User.username)).where(User.id.in_(user_ids))
+    ).all()) if user_ids else {}
+    return tools, users
+
+def _build_rows(events, tools, users, now):
+    rows = []
+
+    def add(user_id, kind, title, message, booking_id):
+        rows.append({
+            'user_id': user_id, 'type': kind, 'title': title, 'message': message,
+            'booking_id': booking_id, 'is_read': False, 'created_at': now
+        })
+
+    for kind, obj in events:
+        if isinstance(obj, Booking):
+            tool = tools.get(obj.id, 'your tool')
+            if kind == 'booking_request':
+                add(obj.lender_id, kind, 'New Booking Request',
+                    f"{users.get(obj.borrower_id, 'Someone')} wants to rent your {tool}", obj.id)
+            elif kind == 'booking_confirmed':
+                add(obj.borrower_id, kind, 'Booking Confirmed', f'Your booking for {tool} has been confirmed', obj.id)
+            elif kind == 'booking_cancelled':
+                add(obj.borrower_id, kind, 'Booking Cancelled', f'Your booking for {tool} has been cancelled', obj.id)
+            elif kind == 'booking_active':
+                add(obj.borrower_id, kind, 'Rental Started', f'Your rental of {tool} has started', obj.id)
+            elif kind == 'booking_completed':
+                for user_id in (obj.borrower_id, obj.lender_id):
+                    add(user_id, kind, 'Booking Completed', f'Your booking for {tool} is complete. Leave a review!', obj.id)
+        elif isinstance(obj, Message):
+            add(obj.receiver_id, kind, f"New message from {users.get(obj.sender_id, 'a user')}",
+                (obj.content or '')[:MESSAGE_PREVIEW_LENGTH], obj.booking_id)
+        elif isinstance(obj, Review):
+            subject = tools.get(obj.booking_id, 'your tool') if obj.review_type == 'tool_review' else 'you'
+            add(obj.reviewee_id, kind, 'New Review',
+                f"{users.get(obj.reviewer_id, 'Someone')} left a {obj.rating}-star review for {subject}", obj.booking_id)
+    return rows
+
+def fan_out(connection, rows):
+    """Insert notification rows and bump their recipients' unread counters; return the new ids."""
+    if not rows:
+        return []
+    notification = Notification.__table__
+    ids = connection.execute(
+        notification.insert().returning(notification.c.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+    counts = {}
+    for row in rows:
+        counts[row['user_id']] = counts.get(row['user_id'], 0) + 1
+    user = User.__table__
+    connection.execute(
+        update(user).where(user.c.id == bindparam('uid')).values(
+            unread_notifications=user.c.unread_notifications + bindparam('n')
+        ),
+        [{'uid': user_id, 'n': n} for user_id, n in counts.items()]
+    )
+    return ids
+
+def unread_count(user_id):
+    return db.session.query(User.unread_notifications).filter(User.id == user_id).scalar() or 0
+
+def mark_read(user_id, notification_ids=None):
+    """Mark the user's notifications (all, or the given ids) read; return how many changed."""
+    query = db.session.query(Notification).filter(Notification.user_id == user_id, Notification.is_read == False)
+    if notification_ids is not None:
+        query = query.filter(Notification.id.in_(notification_ids))
+    changed = query.update({Notification.is_read: True}, synchronize_session=False)
+    if changed:
+        db.session.query(User).filter(User.id == user_id).update({
+            User.unread_notifications: case(
+                (User.unread_notifications > changed, User.unread_notifications - changed), else_=0
+            )
+        }, synchronize_session=False)
+    return changed
+
+def reconcile_unread_counts():
+    """Recount every user's unread notifications from the notification table."""
+    unread = select(func.count(Notification.id)).where(
+        Notification.user_id == User.id, Notification.is_read == False
+    ).scalar_subquery()
+    db.session.query(User).update({User.unread_notifications: unread}, synchronize_session=False)
+    db.session.commit()
+
+@event.listens_for(Session, 'after_flush')
+def _fan_out_notifications(session, flush_context):
+    events = _collect_events(session)
+    if not events:
+        return
+    booking_ids = {obj.id if isinstance(obj, Booking) else obj.booking_id for _, obj in events}
+    user_ids = set()
+    for kind, obj in events:
+        if isinstance(obj, Booking):
+            user_ids.add(obj.borrower_id)
+        elif isinstance(obj, Message):
+            user_ids.add(obj.sender_id)
+        elif isinstance(obj, Review):
+            user_ids.add(obj.reviewer_id)
+
+    connection = session.connection()
+    tools, users = _lookup_names(connection, booking_ids, user_ids)
+    rows = _build_rows(events, tools, users, datetime.utcnow())
+    ids = fan_out(connection, rows)
+    _publish(session, connection, rows, ids)
+
+def _publish(session, connection, rows, ids):
+    if get_event_broker() is None:
+        return
+    recipients = {row['user_id'] for row in rows}
+    counts = dict(connection.execute(
+        select(User.id, User.unread_notifications).where(User.id.in_(recipients))
+    ).all())
+    for row, notification_id in zip(rows, ids):
+        data = dict(row, id=notification_id, created_at=row['created_at'].isoformat())
+        publish_after_commit(session, [row['user_id']], 'notification', {
+            'notification': data, 'unread_count': counts.get(row['user_id'], 0)
+        })
@@ -0,0 +1,106 @@
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import and_, or_, false, DateTime
+from src.models.user import Tool
+
+# Keyset (cursor) pagination. A cursor is an opaque token holding the sort
+# key values of the last row returned; the next page continues strictly
+# after it, so fetching page N costs the same as fetching page 1. NULLs in
+# nullable sort columns (e.g. a tool without price_per_day) sort as the
+# smallest value, SQLite's native order: first ascending, last descending.
+# The ORDER BY says so explicitly so other databases agree, and the seek
+# predicate handles them, as plain comparisons never match NULL.
+
+KeysetPage = namedtuple('KeysetPage', ['items', 'next_cursor', 'total'])
+
+class InvalidCursor(ValueError):
+    pass
+
+def tool_sort_keys(sort_by, rank=None):
+    """Return [(expression, descending)] for a tool listing, ending with the id tie-breaker."""
+    if sort_by == 'relevance' and rank is not None:
+        return [(rank, False), (Tool.id, False)]
+    if sort_by == 'price_low':
+        return [(Tool.price_per_day, False), (Tool.id, False)]
+    if sort_by == 'price_high':
+        return [(Tool.price_per_day, True), (Tool.id, True)]
+    return [(Tool.created_at, True), (Tool.id, True)]
+
+def _nullable(expression):
+    return getattr(getattr(expression, 'expression', expression), 'nullable', False)
+
+def _ordered(expression, descending):
+    if not _nullable(expression):
+        return expression.desc() if descending else expression.asc()
+    return expression.desc().nulls_last() if descending else expression.asc().nulls_first()
+
+def order_by_keys(query, keys):
+    return query.order_by(*[_ordered(expression, descending) for expression, descending in keys])
+
+def encode_cursor(values):
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, keys):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise InvalidCursor('Invalid cursor')
+
+    decoded = []
+    for (expression, _), value in zip(keys, values):
+        if value is not None and isinstance(expression.type, DateTime):
+            try:
+                value = datetime.fromisoformat(value)
+            except (ValueError, TypeError):
+                raise InvalidCursor('Invalid cursor')
+        decoded.append(value)
+    return decoded
+
+def _equal(expression, value):
+    return expression.is_(None) if value is None else expression == value
+
+def _beyond(expression, descending, value):
+    if value is None:
+        # NULLs come last descending, and before every value ascending
+        return false() if descending else expression.isnot(None)
+    if descending:
+        return or_(expression < value, expression.is_(None)) if _nullable(expression) else expression < value
+    return expression > value
+
+def _after(keys, values):
+    # (a, b) after (x, y) == a > x OR (a = x AND b > y), per-column direction
+    clauses = []
+    for i, (expression, descending) in enumerate(keys):
+        equal = [_equal(keys[j][0], values[j]) for j in range(i)]
+        clauses.append(and_(*equal, _beyond(expression, descending, values[i])))
+    return or_(*clauses)
+
+def keyset_paginate(query, keys, per_page, cursor=None, include_total=False):
+    """Fetch one page after `cursor` (an empty cursor starts from the top).
+
+    Items are the query's rows: a single entity/column, or a tuple when the
+    query selects several columns.
+    """
+    total = query.order_by(None).count() if include_total else None
+    width = len(query.column_descriptions)
+
+    if cursor:
+        query = query.filter(_after(keys, decode_cursor(cursor, keys)))
+
+    labels = [expression.label(f'_sort_key_{i}') for i, (expression, _) in enumerate(keys)]
+    rows = order_by_keys(query.add_columns(*labels), keys).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(list(rows[-1][width:]))
+
+    items = [row[0] if width == 1 else tuple(row[:width]) for row in rows]
+    return KeysetPage(items, next_cursor, total)
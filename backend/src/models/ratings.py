@@ -0,0 +1,47 @@
+from sqlalchemy import func, case, select
+from src.models.user import db, Tool, User, Review
+from src.models.watermarks import bump_watermarks
+
+# Rating aggregates are denormalized onto Tool (tool_review) and User
+# (user_review) so reading a rating is a column read, not a scan of reviews.
+# The aggregate UPDATEs bypass the flush hooks, so they bump the target's
+# cache watermark themselves.
+
+def _aggregate_target(review_type):
+    if review_type == 'tool_review':
+        return Tool, Review.tool_id
+    return User, Review.reviewee_id
+
+def adjust_rating_aggregates(review, rating_delta, count_delta):
+    """Apply a review write to its target's aggregates in the current transaction."""
+    model, _ = _aggregate_target(review.review_type)
+    target_id = review.tool_id if review.review_type == 'tool_review' else review.reviewee_id
+
+    new_sum = model.rating_sum + rating_delta
+    new_count = model.rating_count + count_delta
+    db.session.query(model).filter(model.id == target_id).update({
+        model.rating_sum: new_sum,
+        model.rating_count: new_count,
+        model.average_rating: case((new_count > 0, new_sum * 1.0 / new_count), else_=0.0)
+    }, synchronize_session='fetch')
+    bump_watermarks(db.session.connection(), {'tools' if model is Tool else 'users'})
+
+def reconcile_rating_aggregates():
+    """Rebuild every rating aggregate from the Review table."""
+    for review_type in ('tool_review', 'user_review'):
+        model, key = _aggregate_target(review_type)
+        reviews = select(Review.rating).where(
+            key == model.id,
+            Review.review_type == review_type
+        )
+        db.session.query(model).update({
+            model.rating_sum: func.coalesce(
+                reviews.with_only_columns(func.sum(Review.rating)).scalar_subquery(), 0
+            ),
+            model.rating_count: reviews.with_only_columns(func.count()).scalar_subquery(),
+            model.average_rating: func.coalesce(
+                reviews.with_only_columns(func.avg(Review.rating)).scalar_subquery(), 0.0
+            )
+        }, synchronize_session=False)
+    bump_watermarks(db.session.connection(), {'tools', 'users'})
+    db.session.commit()
@@ -0,0 +1,82 @@
+from datetime import datetime
+from sqlalchemy import select, func, case, and_, or_, literal
+from src.models.user import db, Booking, Message, MessageReadMark
+from src.models.dialects import dialect_insert
+
+# Message read receipts as per-(booking, user) high-water marks. A message
+# is read by its receiver once the receiver's mark for the booking reaches
+# its id, so reading a thread is one conditional upsert instead of an
+# UPDATE of every message, and unread counts are index range counts of
+# received messages above the mark. Message.is_read is no longer written;
+# the API derives it from the marks.
+
+def read_marks(booking_id):
+    """{user_id: last_read_message_id} for a booking."""
+    return dict(db.session.query(MessageReadMark.user_id, MessageReadMark.last_read_message_id).filter(
+        MessageReadMark.booking_id == booking_id
+    ).all())
+
+def _upsert(stmt):
+    return stmt.on_conflict_do_update(
+        index_elements=[MessageReadMark.booking_id, MessageReadMark.user_id],
+        set_={
+            'last_read_message_id': stmt.excluded.last_read_message_id,
+            'updated_at': stmt.excluded.updated_at
+        },
+        where=MessageReadMark.last_read_message_id < stmt.excluded.last_read_message_id
+    )
+
+def advance_read_mark(booking_id, user_id, message_id):
+    """Mark the user's messages in the booking read up to message_id; never moves a mark back."""
+    db.session.execute(_upsert(dialect_insert()(MessageReadMark).values(
+        booking_id=booking_id, user_id=user_id, last_read_message_id=message_id, updated_at=datetime.utcnow()
+    )))
+
+def _user_bookings(user_id):
+    return or_(Booking.borrower_id == user_id, Booking.lender_id == user_id)
+
+def mark_all_read(user_id):
+    """Advance the user's mark in every booking to its latest received message; return how many moved."""
+    latest = select(func.max(Message.id)).where(
+        Message.booking_id == Booking.id, Message.receiver_id == user_id
+    ).scalar_subquery()
+    marks = select(Booking.id, literal(user_id), latest, literal(datetime.utcnow())).where(
+        _user_bookings(user_id), latest.isnot(None)
+    )
+    stmt = _upsert(dialect_insert()(MessageReadMark).from_select(
+        ['booking_id', 'user_id', 'last_read_message_id', 'updated_at'], marks
+    ))
+    return db.session.execute(stmt).rowcount
+
+def mark_join(user_id):
+    """Outer-join condition from Message to the user's read mark for its booking."""
+    return and_(MessageReadMark.booking_id == Message.booking_id, MessageReadMark.user_id == user_id)
+
+def is_unread(user_id):
+    """Condition on a Message (outer-joined to the user's marks) that it is unread by user_id."""
+    return and_(Message.receiver_id == user_id, Message.id > func.coalesce(MessageReadMark.last_read_message_id, 0))
+
+def unread_messages_count(user_id):
+    """Select of the user's unread received messages over all their bookings."""
+    return select(func.count(Message.id).label('unread_messages')).select_from(Booking).join(
+        Message, and_(Message.booking_id == Booking.id, Message.receiver_id == user_id)
+    ).outerjoin(MessageReadMark, mark_join(user_id)).where(
+        _user_bookings(user_id), is_unread(user_id)
+    )
+
+def unread_case(user_id):
+    """1 for a message unread by user_id, else 0 (sum it per booking)."""
+    return case((is_unread(user_id), 1), else_=0)
+
+def backfill_read_marks():
+    """Seed read marks from the legacy per-message is_read flags."""
+    first_unread = func.min(case((Message.is_read == True, None), else_=Message.id))
+    marks = select(
+        Message.booking_id, Message.receiver_id,
+        func.coalesce(first_unread - 1, func.max(Message.id)), literal(datetime.utcnow())
+    ).group_by(Message.booking_id, Message.receiver_id)
+    db.session.query(MessageReadMark).delete()
+    db.session.execute(MessageReadMark.__table__.insert().from_select(
+        ['booking_id', 'user_id', 'last_read_message_id', 'updated_at'], marks
+    ))
+    db.session.commit()
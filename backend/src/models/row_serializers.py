@@ -0,0 +1,48 @@
+from functools import lru_cache
+from sqlalchemy import inspect, Date, DateTime
+
+# Row -> dict functions generated once per (model, fields) from the mapped
+# column definitions. Each is compiled to straight-line code
+# ({'id': row.id, ...}) so serializing a row costs one dict display, with
+# no per-field loops or lookups. Date/DateTime columns are rendered with
+# isoformat() unless the JSON provider encodes them natively.
+#
+# A model's response fields are its mapped columns, in definition order,
+# minus its EXCLUDED_FIELDS and with RENAMED_FIELDS (column -> response
+# key) applied, so a new column is serialized without touching a list.
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+@lru_cache(maxsize=None)
+def model_fields(model):
+    """Response field -> attribute name for the model's serializable columns."""
+    excluded = set(getattr(model, 'EXCLUDED_FIELDS', ()))
+    renamed = getattr(model, 'RENAMED_FIELDS', {})
+    return {
+        renamed.get(prop.key, prop.key): prop.key
+        for prop in inspect(model).column_attrs if prop.key not in excluded
+    }
+
+@lru_cache(maxsize=None)
+def row_serializer(model, fields=None, native_datetimes=False):
+    """Compile a serializer for `fields` (keys of model_fields(model), default all of them)."""
+    mapping = model_fields(model)
+    fields = tuple(mapping) if fields is None else tuple(fields)
+    columns = inspect(model).columns
+
+    items = []
+    for field in fields:
+        attribute = mapping[field]
+        if not attribute.isidentifier():
+            raise ValueError(f'Invalid attribute name {attribute!r}')
+        value = f'row.{attribute}'
+        if not native_datetimes and isinstance(columns[attribute].type, (Date, DateTime)):
+            value = f'_isoformat({value})'
+        items.append(f'{field!r}: {value}')
+
+    name = f'serialize_{model.__name__.lower()}'
+    source = f"def {name}(row):\n    return {{{', '.join(items)}}}\n"
+    namespace = {'_isoformat': _isoformat}
+    exec(compile(source, f'<{name}>', 'exec'), namespace)
+    return namespace[name]
@@ -0,0 +1,124 @@
+import re
+from sqlalchemy import event, text, table, column, literal_column, func, or_
+from sqlalchemy.exc import OperationalError
+from src.models.user import db, Tool
+from src.models.watermarks import bump_watermarks
+
+# Full-text search over tool name, description and brand_model backed by an
+# SQLite FTS5 external-content table kept in sync by triggers. Databases
+# without FTS5 (or non-SQLite engines) fall back to LIKE matching.
+
+FTS_TABLE = 'tool_fts'
+
+# bm25 column weights: name, description, brand_model
+BM25_WEIGHTS = (10.0, 1.0, 5.0)
+
+_CREATE_STATEMENTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, brand_model,
+        content='tool', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON tool BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description, brand_model)
+        VALUES (new.id, new.name, new.description, new.brand_model);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON tool BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description, brand_model)
+        VALUES ('delete', old.id, old.name, old.description, old.brand_model);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description, brand_model ON tool BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description, brand_model)
+        VALUES ('delete', old.id, old.name, old.description, old.brand_model);
+        INSERT INTO {FTS_TABLE}(rowid, name, description, brand_model)
+        VALUES (new.id, new.name, new.description, new.brand_model);
+    END"""
+]
+
+# engine url -> whether the FTS index is usable
+_fts_enabled = {}
+
+def _is_sqlite(bind):
+    return bind.dialect.name == 'sqlite'
+
+def fts_enabled():
+    engine = db.engine
+    key = str(engine.url)
+    if key not in _fts_enabled:
+        enabled = False
+        if _is_sqlite(engine):
+            with engine.connect() as conn:
+                enabled = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+                    {'name': FTS_TABLE}
+                ).first() is not None
+        _fts_enabled[key] = enabled
+    return _fts_enabled[key]
+
+def _create_index(conn):
+    """Create the FTS table and triggers; return False if FTS5 is unavailable."""
+    try:
+        for statement in _CREATE_STATEMENTS:
+            conn.execute(text(statement))
+    except OperationalError:
+        return False
+    return True
+
+def ensure_search_index():
+    """Create the search index on an existing database; return True if it was newly built."""
+    engine = db.engine
+    if not _is_sqlite(engine):
+        return False
+
+    _fts_enabled.pop(str(engine.url), None)
+    with engine.begin() as conn:
+        existed = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+            {'name': FTS_TABLE}
+        ).first() is not None
+        if not _create_index(conn):
+            return False
+
+    if not existed:
+        rebuild_search_index()
+        return True
+    return False
+
+def rebuild_search_index():
+    with db.engine.begin() as conn:
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        bump_watermarks(conn, {'tools'})
+
+@event.listens_for(Tool.__table__, 'after_create')
+def _create_search_index(target, connection, **kw):
+    if _is_sqlite(connection):
+        _create_index(connection)
+    _fts_enabled.pop(str(connection.engine.url), None)
+
+@event.listens_for(Tool.__table__, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    if _is_sqlite(connection):
+        connection.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+    _fts_enabled.pop(str(connection.engine.url), None)
+
+def build_match_expression(search):
+    """Turn free text into an FTS5 query: every word must match, as a prefix."""
+    tokens = re.findall(r'\w+', search)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+def apply_search(query, search):
+    """Filter a Tool query by search text; return (query, rank) where rank orders by relevance."""
+    match = build_match_expression(search)
+    if match and fts_enabled():
+        fts = table(FTS_TABLE, column('rowid'))
+        fts_column = literal_column(FTS_TABLE)
+        query = query.join(fts, fts.c.rowid == Tool.id).filter(fts_column.op('MATCH')(match))
+        return query, func.bm25(fts_column, *BM25_WEIGHTS)
+
+    query = query.filter(
+        or_(
+            Tool.name.ilike(f'%{search}%'),
+            Tool.description.ilike(f'%{search}%'),
+            Tool.brand_model.ilike(f'%{search}%')
+        )
+    )
+    return query, None
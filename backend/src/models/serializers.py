@@ -0,0 +1,143 @@
+from collections import namedtuple
+from flask import current_app
+from sqlalchemy.orm import selectinload, load_only
+from src.models.user import User, Category, Tool, ToolImage, Booking
+from src.models.row_serializers import model_fields
+
+# Batch serializers: related rows for a whole page of results are loaded with
+# a fixed number of set-based queries instead of one lazy load per row.
+#
+# List endpoints also accept sparse fieldsets (?fields=id,name&include=owner).
+# A Projection names the columns and relations to return; only those are
+# loaded from the database, and relations are embedded as slim public dicts.
+# ?view=full returns the complete legacy representation.
+
+Projection = namedtuple('Projection', ['fields', 'include'])
+
+class InvalidProjection(ValueError):
+    pass
+
+# Compact defaults for list views: what the listing cards actually render
+TOOL_LIST_PROJECTION = Projection(
+    fields=('id', 'owner_id', 'category_id', 'name', 'price_per_day', 'is_available',
+            'average_rating', 'review_count', 'created_at'),
+    include=('owner', 'category', 'images')
+)
+BOOKING_LIST_PROJECTION = Projection(
+    fields=('id', 'tool_id', 'borrower_id', 'lender_id', 'start_date', 'end_date', 'total_price',
+            'security_deposit', 'status', 'pickup_delivery_method', 'created_at'),
+    include=('tool', 'borrower', 'lender')
+)
+
+def _summary_columns(model, *extra):
+    return [getattr(model, model_fields(model)[field]) for field in model.SUMMARY_FIELDS] + list(extra)
+
+_USER_SUMMARY_COLUMNS = _summary_columns(User)
+_CATEGORY_SUMMARY_COLUMNS = _summary_columns(Category)
+_IMAGE_SUMMARY_COLUMNS = _summary_columns(ToolImage, ToolImage.tool_id)
+
+def _split(value):
+    return tuple(dict.fromkeys(part.strip() for part in value.split(',') if part.strip()))
+
+def parse_projection(args, model, default=None):
+    """Projection from ?fields=&include= (falling back to `default`); None means the full representation."""
+    if args.get('view') == 'full':
+        return None
+    fields = args.get('fields')
+    include = args.get('include')
+    if fields is None and include is None:
+        return default
+
+    default = default or Projection(tuple(model_fields(model)), model.RELATIONS)
+    fields = _split(fields) if fields is not None else default.fields
+    include = _split(include) if include is not None else default.include
+
+    unknown = [field for field in fields if field not in model_fields(model)]
+    if unknown:
+        raise InvalidProjection(f"Unknown fields: {', '.join(unknown)}")
+    unknown = [relation for relation in include if relation not in model.RELATIONS]
+    if unknown:
+        raise InvalidProjection(f"Unknown include: {', '.join(unknown)}")
+
+    if 'id' not in fields:
+        fields = ('id',) + fields
+    return Projection(fields, include)
+
+def _columns(model, fields, *extra):
+    names = dict.fromkeys([model_fields(model)[field] for field in fields] + list(extra))
+    return load_only(*[getattr(model, name) for name in names])
+
+def tool_load_options(projection=None):
+    if projection is None:
+        return [
+            selectinload(Tool.owner),
+            selectinload(Tool.category),
+            selectinload(Tool.images)
+        ]
+
+    options = []
+    keys = []
+    if 'owner' in projection.include:
+        keys.append('owner_id')
+        options.append(selectinload(Tool.owner).load_only(*_USER_SUMMARY_COLUMNS))
+    if 'category' in projection.include:
+        keys.append('category_id')
+        options.append(selectinload(Tool.category).load_only(*_CATEGORY_SUMMARY_COLUMNS))
+    if 'images' in projection.include:
+        options.append(selectinload(Tool.images).load_only(*_IMAGE_SUMMARY_COLUMNS))
+    return [_columns(Tool, projection.fields, *keys)] + options
+
+def booking_load_options(projection=None):
+    if projection is None:
+        return [
+            selectinload(Booking.tool).selectinload(Tool.owner),
+            selectinload(Booking.tool).selectinload(Tool.category),
+            selectinload(Booking.tool).selectinload(Tool.images),
+            selectinload(Booking.borrower),
+            selectinload(Booking.lender)
+        ]
+
+    options = []
+    keys = []
+    if 'tool' in projection.include:
+        keys.append('tool_id')
+        tool = selectinload(Booking.tool)
+        options += [
+            tool.load_only(Tool.id, Tool.name, Tool.price_per_day, Tool.category_id),
+            tool.selectinload(Tool.category).load_only(*_CATEGORY_SUMMARY_COLUMNS),
+            tool.selectinload(Tool.images).load_only(*_IMAGE_SUMMARY_COLUMNS)
+        ]
+    for relation in ('borrower', 'lender'):
+        if relation in projection.include:
+            keys.append(f'{relation}_id')
+            options.append(selectinload(getattr(Booking, relation)).load_only(*_USER_SUMMARY_COLUMNS))
+    return [_columns(Booking, projection.fields, *keys)] + options
+
+def conversation_load_options():
+    """Booking options for conversation rows: the parties' and tool's summaries only."""
+    tool = selectinload(Booking.tool)
+    return [
+        load_only(Booking.id, Booking.tool_id, Booking.borrower_id, Booking.lender_id),
+        tool.load_only(Tool.id, Tool.name, Tool.price_per_day),
+        tool.selectinload(Tool.images).load_only(*_IMAGE_SUMMARY_COLUMNS),
+        selectinload(Booking.borrower).load_only(*_USER_SUMMARY_COLUMNS),
+        selectinload(Booking.lender).load_only(*_USER_SUMMARY_COLUMNS)
+    ]
+
+def native_datetimes():
+    """True when the app's JSON provider encodes datetimes itself (see src/json_provider.py)."""
+    return getattr(current_app.json, 'native_datetimes', False)
+
+def serialize_tools(tools, projection=None):
+    """Serialize tools loaded with tool_load_options(projection)."""
+    if projection is None:
+        return [tool.to_dict() for tool in tools]
+    native, memo = native_datetimes(), {}
+    return [tool.to_sparse_dict(projection.fields, projection.include, native, memo) for tool in tools]
+
+def serialize_bookings(bookings, projection=None):
+    """Serialize bookings loaded with booking_load_options(projection)."""
+    if projection is None:
+        return [booking.to_dict() for booking in bookings]
+    native, memo = native_datetimes(), {}
+    return [booking.to_sparse_dict(projection.fields, projection.include, native, memo) for booking in bookings]
@@ -0,0 +1,202 @@
+import csv
+import io
+import json
+import math
+from datetime import datetime
+from sqlalchemy import update
+from src.models.user import db, Category, Tool, ToolImage, ToolImportJob
+from src.models.watermarks import bump_watermarks
+from src.models.dashboard_stats import invalidate_dashboard_stats_on_commit
+from src.write_queue import run_write
+
+# Bulk tool import from NDJSON or CSV uploads. Rows are read and validated
+# one at a time and inserted CHUNK_SIZE at a time: one executemany INSERT
+# for the chunk's tools (RETURNING their ids) and one for their images.
+# Each chunk advances its job's rows_processed in the same transaction, so
+# an interrupted upload is resumed by sending the same file to the job
+# again: rows it already processed are skipped, and none is imported twice.
+# Invalid rows are reported per row and never stop the import. The inserts
+# bypass the ORM flush hooks, so chunks bump the cache watermarks (which
+# also refreshes the category catalogue) and drop the dashboard cache
+# themselves.
+
+CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+MAX_IMAGES = 20
+FORMATS = ('ndjson', 'csv')
+
+class ImportConflict(Exception):
+    pass
+
+def detect_format(content_type, requested=None):
+    """The upload format from ?format= or the Content-Type (NDJSON by default)."""
+    fmt = (requested or ('csv' if content_type and 'csv' in content_type else 'ndjson')).lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    return fmt
+
+def read_rows(stream, fmt):
+    """Yield (row number, dict) from a binary upload, or (row number, error message) for unreadable rows."""
+    if not hasattr(stream, 'read1'):
+        stream = io.BufferedReader(stream)
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(text), 1):
+            yield number, {key.strip(): value for key, value in row.items() if key and value not in (None, '')}
+        return
+
+    number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, 'Invalid JSON'
+            continue
+        yield number, row if isinstance(row, dict) else 'Row must be a JSON object'
+
+def _text(row, field, max_length, required=False, default=None):
+    value = row.get(field)
+    if value is None or (isinstance(value, str) and not value.strip()):
+        if required:
+            raise ValueError(f'{field} is required')
+        return default
+    value = str(value).strip()
+    if len(value) > max_length:
+        raise ValueError(f'{field} must be at most {max_length} characters')
+    return value
+
+def _number(row, field, required=False, default=None):
+    value = row.get(field)
+    if value is None or value == '':
+        if required:
+            raise ValueError(f'{field} is required')
+        return default
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{field} must be a number')
+    if isinstance(value, bool) or not math.isfinite(number) or number < 0:
+        raise ValueError(f'{field} must be a non-negative number')
+    return number
+
+def _category_id(row, categories):
+    ids, names = categories
+    value = row.get('category_id')
+    if value in (None, '') and row.get('category'):
+        category_id = names.get(str(row['category']).strip().lower())
+        if category_id is None:
+            raise ValueError(f"Unknown category {row['category']!r}")
+        return category_id
+    if value in (None, ''):
+        raise ValueError('category_id is required')
+    try:
+        category_id = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('category_id must be an integer')
+    if category_id not in ids:
+        raise ValueError(f'Unknown category_id {category_id}')
+    return category_id
+
+def _images(row):
+    images = row.get('images') or []
+    if isinstance(images, str):
+        images = [url.strip() for url in images.split('|') if url.strip()]
+    if not isinstance(images, list) or not all(isinstance(url, str) and url for url in images):
+        raise ValueError('images must be a list of URLs')
+    if len(images) > MAX_IMAGES:
+        raise ValueError(f'At most {MAX_IMAGES} images per tool')
+    if any(len(url) > 255 for url in images):
+        raise ValueError('Image URLs must be at most 255 characters')
+    return images
+
+def validate_row(row, categories):
+    """Return (tool column values, image URLs) for an import row, or raise ValueError."""
+    price_per_day = _number(row, 'price_per_day', required=True)
+    if not price_per_day:
+        raise ValueError('price_per_day is required')
+    values = {
+        'category_id': _category_id(row, categories),
+        'name': _text(row, 'name', 100, required=True),
+        'brand_model': _text(row, 'brand_model', 100),
+        'description': _text(row, 'description', 10000, required=True),
+        'condition': _text(row, 'condition', 50, default='Good'),
+        'price_per_hour': _number(row, 'price_per_hour'),
+        'price_per_day': price_per_day,
+        'price_per_week': _number(row, 'price_per_week'),
+        'security_deposit': _number(row, 'security_deposit', default=0),
+        'pickup_delivery_options': _text(row, 'pickup_delivery_options', 100, default='Pickup only')
+    }
+    return values, _images(row)
+
+def load_categories():
+    rows = db.session.query(Category.id, Category.name).all()
+    return {category_id for category_id, _ in rows}, {name.lower(): category_id for category_id, name in rows}
+
+def import_chunk(job_id, owner_id, start, end, tools, images, failed, errors, complete=False):
+    """Insert a chunk of validated rows and move the job from row `start` to `end`."""
+    job = ToolImportJob.__table__
+    now = datetime.utcnow()
+    values = {
+        'rows_processed': end,
+        'imported': job.c.imported + len(tools),
+        'failed': job.c.failed + failed,
+        'errors': json.dumps(errors),
+        'updated_at': now
+    }
+    if complete:
+        values['status'] = 'completed'
+    # Guarded on the old position, so two uploads to one job can't both apply a chunk
+    advanced = db.session.execute(
+        update(job).where(job.c.id == job_id, job.c.rows_processed == start).values(**values)
+    ).rowcount
+    if not advanced:
+        raise ImportConflict('Import job was advanced by another upload')
+    if not tools:
+        return
+
+    tool = Tool.__table__
+    tool_ids = db.session.execute(
+        tool.insert().returning(tool.c.id, sort_by_parameter_order=True),
+        [dict(row, owner_id=owner_id, created_at=now, updated_at=now) for row in tools]
+    ).scalars().all()
+    image_rows = [
+        {'tool_id': tool_id, 'image_url': url, 'is_primary': i == 0, 'created_at': now}
+        for tool_id, urls in zip(tool_ids, images) for i, url in enumerate(urls)
+    ]
+    if image_rows:
+        db.session.execute(ToolImage.__table__.insert(), image_rows)
+
+    bump_watermarks(db.session.connection(), {'tools'})
+    invalidate_dashboard_stats_on_commit(owner_id)
+
+def run_import(job, rows, chunk_size=CHUNK_SIZE):
+    """Import `rows` (from read_rows) into job, skipping the rows it has already processed."""
+    job_id, owner_id, start = job.id, job.owner_id, job.rows_processed
+    errors = json.loads(job.errors) if job.errors else []
+    categories = load_categories()
+    position = start
+    tools, images, failed = [], [], 0
+
+    for number, row in rows:
+        if number <= start:
+            continue
+        position = number
+        try:
+            if isinstance(row, str):
+                raise ValueError(row)
+            values, urls = validate_row(row, categories)
+            tools.append(values)
+            images.append(urls)
+        except ValueError as e:
+            failed += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({'row': number, 'error': str(e)})
+
+        if position - start >= chunk_size:
+            run_write(import_chunk, job_id, owner_id, start, position, tools, images, failed, errors)
+            start, tools, images, failed = position, [], [], 0
+
+    run_write(import_chunk, job_id, owner_id, start, position, tools, images, failed, errors, True)
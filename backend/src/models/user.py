@@ -1,9 +1,28 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+import json
+from src.models.row_serializers import row_serializer
+from src.passwords import get_password_hasher
 
 db = SQLAlchemy()
 
+# The column part of to_dict() is generated by row_serializer() from the
+# mapped columns; EXCLUDED_FIELDS keeps internal columns out of responses
+# and RENAMED_FIELDS maps a column to a different response key. Relations
+# are embedded by hand.
+
+def _summary(obj, memo=None):
+    """obj.to_summary_dict(), built once per object when a memo dict is shared across rows."""
+    if obj is None:
+        return None
+    if memo is None:
+        return obj.to_summary_dict()
+    key = (type(obj), obj.id)
+    summary = memo.get(key)
+    if summary is None:
+        summary = memo[key] = obj.to_summary_dict()
+    return summary
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -14,9 +33,18 @@ class User(db.Model):
     phone_number = db.Column(db.String(20))
     location = db.Column(db.String(100))
     is_verified = db.Column(db.Boolean, default=False)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # user_review ratings
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    average_rating = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    unread_notifications = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    EXCLUDED_FIELDS = ('password_hash', 'rating_sum', 'unread_notifications')
+    RENAMED_FIELDS = {'rating_count': 'review_count'}
+    # Public profile embedded in other resources (no contact details)
+    SUMMARY_FIELDS = ('id', 'username', 'full_name', 'profile_picture_url', 'location')
+
     # Relationships
     tools = db.relationship('Tool', backref='owner', lazy=True, foreign_keys='Tool.owner_id')
     bookings_as_borrower = db.relationship('Booking', backref='borrower', lazy=True, foreign_keys='Booking.borrower_id')
@@ -25,27 +53,26 @@ class User(db.Model):
     reviews_received = db.relationship('Review', backref='reviewee', lazy=True, foreign_keys='Review.reviewee_id')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = get_password_hasher().hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return get_password_hasher().verify(self.password_hash, password)
+
+    def rehash_password_if_needed(self, password):
+        """Re-hash a just-verified password when the configured method or cost changed."""
+        if get_password_hasher().needs_rehash(self.password_hash):
+            self.set_password(password)
+            return True
+        return False
 
     def __repr__(self):
         return f'<User {self.username}>'
 
     def to_dict(self):
-        return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'full_name': self.full_name,
-            'profile_picture_url': self.profile_picture_url,
-            'phone_number': self.phone_number,
-            'location': self.location,
-            'is_verified': self.is_verified,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+        return row_serializer(User)(self)
+
+    def to_summary_dict(self):
+        return row_serializer(User, User.SUMMARY_FIELDS)(self)
 
 class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -53,6 +80,8 @@ class Category(db.Model):
     description = db.Column(db.Text)
     icon_url = db.Column(db.String(255))
 
+    SUMMARY_FIELDS = ('id', 'name')
+
     # Relationships
     tools = db.relationship('Tool', backref='category', lazy=True)
 
@@ -60,14 +89,19 @@ class Category(db.Model):
         return f'<Category {self.name}>'
 
     def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'icon_url': self.icon_url
-        }
+        return row_serializer(Category)(self)
+
+    def to_summary_dict(self):
+        return row_serializer(Category, Category.SUMMARY_FIELDS)(self)
 
 class Tool(db.Model):
+    __table_args__ = (
+        db.Index('ix_tool_available_category_created', 'is_available', 'category_id', 'created_at'),
+        db.Index('ix_tool_available_created', 'is_available', 'created_at'),
+        db.Index('ix_tool_available_price', 'is_available', 'price_per_day'),
+        db.Index('ix_tool_owner_created', 'owner_id', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
@@ -81,6 +115,9 @@ class Tool(db.Model):
     security_deposit = db.Column(db.Float)
     pickup_delivery_options = db.Column(db.String(100))
     is_available = db.Column(db.Boolean, default=True)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # tool_review ratings
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    average_rating = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -89,58 +126,80 @@ class Tool(db.Model):
     bookings = db.relationship('Booking', backref='tool', lazy=True)
     reviews = db.relationship('Review', backref='tool', lazy=True)
 
+    # Serialized columns: all but rating_sum, with rating_count as review_count;
+    # embeddable relations for sparse fieldsets
+    EXCLUDED_FIELDS = ('rating_sum',)
+    RENAMED_FIELDS = {'rating_count': 'review_count'}
+    RELATIONS = ('owner', 'category', 'images')
+
     def __repr__(self):
         return f'<Tool {self.name}>'
 
-    def to_dict(self):
-        return {
+    def to_dict(self, fields=None, include=None):
+        if fields is not None or include is not None:
+            return self.to_sparse_dict(fields, include or ())
+        data = row_serializer(Tool)(self)
+        data['owner'] = self.owner.to_dict() if self.owner else None
+        data['category'] = self.category.to_dict() if self.category else None
+        data['images'] = [image.to_dict() for image in self.images]
+        return data
+
+    def to_sparse_dict(self, fields, include, native_datetimes=False, memo=None):
+        """Only the given fields and relations, with relations as slim public embeds."""
+        data = row_serializer(Tool, fields, native_datetimes)(self)
+        if 'owner' in include:
+            data['owner'] = _summary(self.owner, memo)
+        if 'category' in include:
+            data['category'] = _summary(self.category, memo)
+        if 'images' in include:
+            data['images'] = [image.to_summary_dict() for image in self.images]
+        return data
+
+    def get_average_rating(self):
+        return self.average_rating
+
+    def to_summary_dict(self, with_category=False):
+        primary_image = next((image for image in self.images if image.is_primary), None)
+        primary_image = primary_image or (self.images[0] if self.images else None)
+        data = {
             'id': self.id,
-            'owner_id': self.owner_id,
-            'category_id': self.category_id,
             'name': self.name,
-            'brand_model': self.brand_model,
-            'description': self.description,
-            'condition': self.condition,
-            'price_per_hour': self.price_per_hour,
             'price_per_day': self.price_per_day,
-            'price_per_week': self.price_per_week,
-            'security_deposit': self.security_deposit,
-            'pickup_delivery_options': self.pickup_delivery_options,
-            'is_available': self.is_available,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'owner': self.owner.to_dict() if self.owner else None,
-            'category': self.category.to_dict() if self.category else None,
-            'images': [image.to_dict() for image in self.images],
-            'average_rating': self.get_average_rating(),
-            'review_count': len(self.reviews)
+            'image_url': primary_image.image_url if primary_image else None
         }
-
-    def get_average_rating(self):
-        if not self.reviews:
-            return 0
-        return sum(review.rating for review in self.reviews if review.review_type == 'tool_review') / len([r for r in self.reviews if r.review_type == 'tool_review'])
+        if with_category:
+            data['category'] = self.category.to_summary_dict() if self.category else None
+        return data
 
 class ToolImage(db.Model):
+    __table_args__ = (
+        db.Index('ix_tool_image_tool', 'tool_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     tool_id = db.Column(db.Integer, db.ForeignKey('tool.id'), nullable=False)
     image_url = db.Column(db.String(255), nullable=False)
     is_primary = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    SUMMARY_FIELDS = ('id', 'image_url', 'is_primary')
+
     def __repr__(self):
         return f'<ToolImage {self.id}>'
 
     def to_dict(self):
-        return {
-            'id': self.id,
-            'tool_id': self.tool_id,
-            'image_url': self.image_url,
-            'is_primary': self.is_primary,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+        return row_serializer(ToolImage)(self)
+
+    def to_summary_dict(self):
+        return row_serializer(ToolImage, ToolImage.SUMMARY_FIELDS)(self)
 
 class Booking(db.Model):
+    __table_args__ = (
+        db.Index('ix_booking_tool_status_dates', 'tool_id', 'status', 'start_date', 'end_date'),
+        db.Index('ix_booking_borrower_created', 'borrower_id', 'created_at'),
+        db.Index('ix_booking_lender_created', 'lender_id', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     tool_id = db.Column(db.Integer, db.ForeignKey('tool.id'), nullable=False)
     borrower_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -158,29 +217,37 @@ class Booking(db.Model):
     messages = db.relationship('Message', backref='booking', lazy=True)
     reviews = db.relationship('Review', backref='booking', lazy=True)
 
+    RELATIONS = ('tool', 'borrower', 'lender')
+
     def __repr__(self):
         return f'<Booking {self.id}>'
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'tool_id': self.tool_id,
-            'borrower_id': self.borrower_id,
-            'lender_id': self.lender_id,
-            'start_date': self.start_date.isoformat() if self.start_date else None,
-            'end_date': self.end_date.isoformat() if self.end_date else None,
-            'total_price': self.total_price,
-            'security_deposit': self.security_deposit,
-            'status': self.status,
-            'pickup_delivery_method': self.pickup_delivery_method,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'tool': self.tool.to_dict() if self.tool else None,
-            'borrower': self.borrower.to_dict() if self.borrower else None,
-            'lender': self.lender.to_dict() if self.lender else None
-        }
+    def to_dict(self, fields=None, include=None):
+        if fields is not None or include is not None:
+            return self.to_sparse_dict(fields, include or ())
+        data = row_serializer(Booking)(self)
+        data['tool'] = self.tool.to_dict() if self.tool else None
+        data['borrower'] = self.borrower.to_dict() if self.borrower else None
+        data['lender'] = self.lender.to_dict() if self.lender else None
+        return data
+
+    def to_sparse_dict(self, fields, include, native_datetimes=False, memo=None):
+        data = row_serializer(Booking, fields, native_datetimes)(self)
+        if 'tool' in include:
+            data['tool'] = self.tool.to_summary_dict(with_category=True) if self.tool else None
+        if 'borrower' in include:
+            data['borrower'] = _summary(self.borrower, memo)
+        if 'lender' in include:
+            data['lender'] = _summary(self.lender, memo)
+        return data
 
 class Review(db.Model):
+    __table_args__ = (
+        db.Index('ix_review_tool_type_created', 'tool_id', 'review_type', 'created_at'),
+        db.Index('ix_review_reviewee_type_created', 'reviewee_id', 'review_type', 'created_at'),
+        db.Index('ix_review_booking_reviewer', 'booking_id', 'reviewer_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     booking_id = db.Column(db.Integer, db.ForeignKey('booking.id'), nullable=False)
     reviewer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -195,21 +262,17 @@ class Review(db.Model):
         return f'<Review {self.id}>'
 
     def to_dict(self):
-        return {
-            'id': self.id,
-            'booking_id': self.booking_id,
-            'reviewer_id': self.reviewer_id,
-            'reviewee_id': self.reviewee_id,
-            'tool_id': self.tool_id,
-            'rating': self.rating,
-            'comment': self.comment,
-            'review_type': self.review_type,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'reviewer': self.reviewer.to_dict() if self.reviewer else None,
-            'reviewee': self.reviewee.to_dict() if self.reviewee else None
-        }
+        data = row_serializer(Review)(self)
+        data['reviewer'] = self.reviewer.to_dict() if self.reviewer else None
+        data['reviewee'] = self.reviewee.to_dict() if self.reviewee else None
+        return data
 
 class Message(db.Model):
+    __table_args__ = (
+        db.Index('ix_message_booking_created', 'booking_id', 'created_at'),
+        db.Index('ix_message_booking_receiver', 'booking_id', 'receiver_id', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     booking_id = db.Column(db.Integer, db.ForeignKey('booking.id'), nullable=False)
     sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -225,16 +288,101 @@ class Message(db.Model):
     def __repr__(self):
         return f'<Message {self.id}>'
 
+    def to_dict(self, read_upto=None):
+        # read_upto: the receiver's read mark for this booking; is_read is derived from it
+        data = row_serializer(Message)(self)
+        if read_upto is not None:
+            data['is_read'] = self.id <= read_upto
+        data['sender'] = self.sender.to_dict() if self.sender else None
+        data['receiver'] = self.receiver.to_dict() if self.receiver else None
+        return data
+
+# Read receipt per (booking, user): every message in the booking with an id
+# up to last_read_message_id has been read by the user
+class MessageReadMark(db.Model):
+    __tablename__ = 'message_read_mark'
+
+    booking_id = db.Column(db.Integer, db.ForeignKey('booking.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    last_read_message_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<MessageReadMark {self.booking_id} {self.user_id}>'
+
+class Notification(db.Model):
+    __table_args__ = (
+        db.Index('ix_notification_user_read_created', 'user_id', 'is_read', 'created_at'),
+        db.Index('ix_notification_user_created', 'user_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    type = db.Column(db.String(30), nullable=False)  # booking_request, booking_confirmed, new_message, ...
+    title = db.Column(db.String(100), nullable=False)
+    message = db.Column(db.String(255))
+    booking_id = db.Column(db.Integer, db.ForeignKey('booking.id'))
+    is_read = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Notification {self.id}>'
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'booking_id': self.booking_id,
-            'sender_id': self.sender_id,
-            'receiver_id': self.receiver_id,
-            'content': self.content,
-            'is_read': self.is_read,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'sender': self.sender.to_dict() if self.sender else None,
-            'receiver': self.receiver.to_dict() if self.receiver else None
-        }
+        return row_serializer(Notification)(self)
 
+# Bulk tool import progress; rows_processed is the resume point in the uploaded file
+class ToolImportJob(db.Model):
+    __tablename__ = 'tool_import_job'
+    __table_args__ = (
+        db.Index('ix_tool_import_job_owner_created', 'owner_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    format = db.Column(db.String(10), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='in_progress')  # in_progress, completed
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    imported = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.Text)  # JSON list of {"row", "error"}, capped
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    EXCLUDED_FIELDS = ('owner_id', 'errors')  # errors are decoded in to_dict()
+
+    def __repr__(self):
+        return f'<ToolImportJob {self.id}>'
+
+    def to_dict(self, with_errors=True):
+        data = row_serializer(ToolImportJob)(self)
+        if with_errors:
+            data['errors'] = json.loads(self.errors) if self.errors else []
+        return data
+
+# Completed-booking earnings per tool per day, keyed by booking creation date
+class EarningsDaily(db.Model):
+    __tablename__ = 'earnings_daily'
+    __table_args__ = (
+        db.Index('ix_earnings_daily_lender_day', 'lender_id', 'day'),
+    )
+
+    tool_id = db.Column(db.Integer, db.ForeignKey('tool.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    lender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    earnings = db.Column(db.Float, nullable=False, default=0.0)
+    bookings = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<EarningsDaily {self.tool_id} {self.day}>'
+
+# Per-scope change counters used to validate cached HTTP responses
+class CacheWatermark(db.Model):
+    __tablename__ = 'cache_watermark'
+
+    scope = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<CacheWatermark {self.scope} {self.version}>'
@@ -0,0 +1,86 @@
+from datetime import datetime
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from src.models.user import db, User, Category, Tool, ToolImage, Booking, Review, CacheWatermark
+from src.models.dialects import dialect_insert
+from src.models.availability import BLOCKING_STATUSES
+
+# Change watermarks per cache scope. Every flush that writes a model bumps
+# the version and updated_at of the scopes it affects, in the same
+# transaction, so all processes see the change as soon as it commits.
+# Writes no cached response shows (password rehashes, unread counters,
+# pending bookings) leave the watermarks alone, so they don't all queue on
+# the same row. Core and bulk writes skip the flush hooks: they call
+# bump_watermarks themselves, and after manual SQL run
+# `flask --app src.main bump-cache-watermarks`.
+
+SCOPES = ('bookings', 'reviews', 'tools', 'users')
+
+SCOPES_BY_MODEL = {
+    Tool: ('tools',),
+    ToolImage: ('tools',),
+    Category: ('tools',),
+    User: ('users',),
+    Review: ('reviews',),  # rating aggregates bump 'tools'/'users' in ratings.py
+    Booking: ('bookings',),
+}
+
+# Columns that appear in no cached response
+IGNORED_COLUMNS = {
+    User: {'password_hash', 'unread_notifications', 'updated_at'},
+}
+
+# Bookings reach cached responses only through tool availability
+AVAILABILITY_COLUMNS = {'tool_id', 'status', 'start_date', 'end_date'}
+
+def bump_watermarks(connection, scopes):
+    now = datetime.utcnow()
+    insert = dialect_insert()
+    for scope in sorted(scopes):
+        stmt = insert(CacheWatermark).values(scope=scope, version=1, updated_at=now)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[CacheWatermark.scope],
+            set_={'version': CacheWatermark.version + 1, 'updated_at': now}
+        ))
+
+def read_watermarks(scopes):
+    """Return {scope: (version, updated_at)}; scopes never written report (0, None)."""
+    rows = db.session.query(CacheWatermark.scope, CacheWatermark.version, CacheWatermark.updated_at).filter(
+        CacheWatermark.scope.in_(scopes)
+    ).all()
+    watermarks = {scope: (0, None) for scope in scopes}
+    watermarks.update({scope: (version, updated_at) for scope, version, updated_at in rows})
+    return watermarks
+
+def _changed_columns(obj):
+    state = inspect(obj)
+    return {prop.key for prop in state.mapper.column_attrs if state.attrs[prop.key].history.has_changes()}
+
+def _affects_cache(obj, new_or_deleted):
+    if isinstance(obj, Booking):
+        if new_or_deleted:
+            return obj.status in BLOCKING_STATUSES
+        return bool(_changed_columns(obj) & AVAILABILITY_COLUMNS)
+    if new_or_deleted:
+        return True
+    return bool(_changed_columns(obj) - IGNORED_COLUMNS.get(type(obj), set()))
+
+def _changed_scopes(session):
+    scopes = set()
+    for obj in list(session.new) + list(session.deleted):
+        if type(obj) in SCOPES_BY_MODEL and _affects_cache(obj, True):
+            scopes.update(SCOPES_BY_MODEL[type(obj)])
+    for obj in session.dirty:
+        if type(obj) in SCOPES_BY_MODEL and _affects_cache(obj, False):
+            scopes.update(SCOPES_BY_MODEL[type(obj)])
+    return scopes
+
+@event.listens_for(Session, 'before_flush')
+def _collect_changed_scopes(session, flush_context, instances):
+    session.info['flush_watermark_scopes'] = _changed_scopes(session)
+
+@event.listens_for(Session, 'after_flush')
+def _bump_changed_scopes(session, flush_context):
+    scopes = session.info.pop('flush_watermark_scopes', None)
+    if scopes:
+        bump_watermarks(session.connection(), scopes)
@@ -0,0 +1,113 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Password hashing off the request threads. Hashes are computed in a
+# bounded process pool (PASSWORD_HASH_WORKERS, 0 = inline) so a login burst
+# cannot pin every worker thread; at most PASSWORD_HASH_MAX_PENDING hashes
+# may be queued or running, and callers beyond that get PasswordHasherBusy
+# immediately (auth routes answer 429). PASSWORD_HASH_METHOD is any
+# werkzeug method string; stored hashes made with other parameters are
+# upgraded on the next successful login (see needs_rehash).
+#
+# Forking a process that already runs other threads can leave locks held
+# in the child, so init_password_hasher starts the pool with fork while the
+# app is still being imported and only the main thread exists. A pool
+# replaced later (a worker died, or a pre-fork server's child inherited the
+# pool) is started with forkserver, or spawn where that isn't available.
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+class PasswordHasherBusy(Exception):
+    pass
+
+class PasswordHasher:
+    def __init__(self, method=DEFAULT_METHOD, workers=0, max_pending=None):
+        self.method = method
+        # werkzeug fills in default parameters ('scrypt' -> 'scrypt:32768:8:1')
+        self.method_prefix = generate_password_hash('', method).split('$', 1)[0]
+        self.workers = workers
+        self.max_pending = max_pending or max(workers, 1) * 4
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+
+    def start(self):
+        """Start the worker processes now; call before the process starts any threads."""
+        # A spawned worker re-imports the app's main module; it mustn't start a pool of its own
+        if self.workers and multiprocessing.parent_process() is None:
+            self._executor().submit(os.getpid).result()
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is not None and self._pool_pid != os.getpid():
+                self._pool = None  # inherited through fork; its workers belong to the parent
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_context())
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy('Too many password checks in progress')
+        try:
+            if not self.workers:
+                return fn(*args)
+            pool = self._executor()
+            try:
+                return pool.submit(fn, *args).result()
+            except BrokenProcessPool:
+                with self._pool_lock:
+                    if self._pool is pool:
+                        self._pool = None
+                raise
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != self.method_prefix
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+def _context():
+    methods = multiprocessing.get_all_start_methods()
+    if 'fork' in methods and threading.active_count() == 1:
+        return multiprocessing.get_context('fork')  # fork starts every worker up front
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+_inline_hasher = None
+
+def get_password_hasher():
+    """The app's hasher, or an inline default one outside an app context (scripts)."""
+    global _inline_hasher
+    if has_app_context() and 'password_hasher' in current_app.extensions:
+        return current_app.extensions['password_hasher']
+    if _inline_hasher is None:
+        _inline_hasher = PasswordHasher()
+    return _inline_hasher
+
+def init_password_hasher(app):
+    workers = app.config.get('PASSWORD_HASH_WORKERS')
+    if workers is None:
+        workers = os.cpu_count() or 1
+    hasher = app.extensions['password_hasher'] = PasswordHasher(
+        method=app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD),
+        workers=workers,
+        max_pending=app.config.get('PASSWORD_HASH_MAX_PENDING')
+    )
+    hasher.start()
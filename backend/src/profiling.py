@@ -0,0 +1,266 @@
+import cProfile
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from flask import current_app, g, request, session
+
+# On-demand request profiling (PROFILING_ENABLED, off by default; when it is
+# off no hooks are installed). A request is profiled when an admin
+# (ADMIN_USER_IDS) sends X-Profile: cpu, memory or 1 (both), or when it is
+# picked by PROFILE_SAMPLE_RATE, optionally only for the PROFILE_ENDPOINTS
+# url rules. One request is profiled at a time per process; others run
+# normally. A profile is the request's cProfile stats (pstats file plus
+# folded stacks for flamegraph.pl or speedscope) and the tracemalloc
+# allocations it left behind, kept in a ring of the newest
+# PROFILE_MAX_COUNT under PROFILE_DIR. cProfile only sees the request's
+# thread, so work done by the write queue isn't included; tracemalloc is
+# process-wide, so allocation diffs include concurrent requests.
+
+PROFILE_ID = re.compile(r'^\d{8}T\d{12}-[0-9a-f]{8}$')
+EXTENSIONS = {'pstats': 'prof', 'collapsed': 'collapsed', 'json': 'json'}
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 30
+MAX_FLAME_NODES = 20000
+MIN_FLAME_SHARE = 0.001
+
+def _label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name.replace(';', ',')  # builtins
+    return f'{name} ({os.path.basename(filename)}:{line})'.replace(';', ',')
+
+def collapsed_stacks(stats):
+    """Folded stacks ("root;caller;callee microseconds" lines) approximated from the call graph.
+
+    cProfile only records caller/callee pairs, so a function's time is split
+    across the paths that reach it in proportion to each caller's share.
+    """
+    entries = stats.stats
+    callees = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+
+    folded = {}
+    budget = [MAX_FLAME_NODES]
+    min_seconds = stats.total_tt * MIN_FLAME_SHARE
+
+    def walk(func, seconds, stack, on_path):
+        budget[0] -= 1
+        _, _, own, cumulative, _ = entries[func]
+        share = seconds / cumulative if cumulative else 0
+        stack = stack + (_label(func),)
+        own_us = int(own * share * 1e6)
+        if own_us:
+            key = ';'.join(stack)
+            folded[key] = folded.get(key, 0) + own_us
+        for callee, edge_seconds in callees.get(func, ()):
+            # Recursion is folded into the outer call; paths under 0.1% of the total are dropped
+            if callee not in on_path and edge_seconds * share >= min_seconds and budget[0] > 0:
+                walk(callee, edge_seconds * share, stack, on_path | {callee})
+
+    for func, (_, _, _, cumulative, callers) in entries.items():
+        if not callers:
+            walk(func, cumulative, (), {func})
+    return ''.join(f'{stack} {us}\n' for stack, us in sorted(folded.items()))
+
+def top_functions(stats, limit=TOP_FUNCTIONS):
+    stats.sort_stats('cumulative')
+    rows = []
+    for func in stats.fcn_list[:limit]:
+        primitive_calls, calls, own, cumulative, _ = stats.stats[func]
+        rows.append({
+            'function': pstats.func_std_string(func),
+            'calls': calls,
+            'primitive_calls': primitive_calls,
+            'own_ms': round(own * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3)
+        })
+    return rows
+
+class RequestProfile:
+    def __init__(self, cpu=True, memory=True):
+        self.profiler = cProfile.Profile() if cpu else None
+        self.memory = memory
+        self.memory_stats = None
+        self.duration = None
+        self._baseline = None
+        self._started_tracing = False
+
+    def start(self):
+        if self.memory:
+            if tracemalloc.is_tracing():
+                self._baseline = tracemalloc.take_snapshot()
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                self._started_tracing = True
+        self._start = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def stop(self):
+        if self.duration is not None:
+            return
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.duration = time.perf_counter() - self._start
+        if self.memory:
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            if self._started_tracing:
+                tracemalloc.stop()
+            self.memory_stats = self._allocations(snapshot, peak)
+
+    def _allocations(self, snapshot, peak):
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, '<frozen importlib._bootstrap>')]
+        snapshot = snapshot.filter_traces(ignore)
+        if self._baseline is None:
+            # Tracing started with the request, so everything traced is new
+            diffs = [(stat.traceback[0], stat.size, stat.count) for stat in snapshot.statistics('lineno')]
+        else:
+            baseline = self._baseline.filter_traces(ignore)
+            diffs = [(stat.traceback[0], stat.size_diff, stat.count_diff) for stat in snapshot.compare_to(baseline, 'lineno')]
+        diffs.sort(key=lambda diff: abs(diff[1]), reverse=True)
+        return {
+            'peak_bytes': peak,
+            'net_allocated_bytes': sum(size for _, size, _ in diffs),
+            'top_allocations': [
+                {'file': frame.filename, 'line': frame.lineno, 'size_diff': size, 'count_diff': count}
+                for frame, size, count in diffs[:TOP_ALLOCATIONS] if size or count
+            ]
+        }
+
+class ProfileStore:
+    def __init__(self, directory, max_profiles=50):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, profile_id, kind):
+        if not PROFILE_ID.match(profile_id) or kind not in EXTENSIONS:
+            return None
+        return os.path.join(self.directory, f'{profile_id}.{EXTENSIONS[kind]}')
+
+    def ids(self):
+        """Stored profile ids, newest first (the JSON file is written last, so these are complete)."""
+        names = (name[:-len('.json')] for name in os.listdir(self.directory) if name.endswith('.json'))
+        return sorted((name for name in names if PROFILE_ID.match(name)), reverse=True)
+
+    def load(self, profile_id):
+        path = self.path(profile_id, 'json')
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (TypeError, OSError, ValueError):
+            return None
+
+    def save(self, profile, metadata):
+        now = datetime.utcnow()
+        profile_id = now.strftime('%Y%m%dT%H%M%S') + f'{now.microsecond:06d}-{os.urandom(4).hex()}'
+        metadata = dict(metadata, id=profile_id, created_at=now.isoformat(), duration_ms=round(profile.duration * 1000, 3))
+        if profile.profiler is not None:
+            stats = pstats.Stats(profile.profiler)
+            stats.dump_stats(self.path(profile_id, 'pstats'))
+            with open(self.path(profile_id, 'collapsed'), 'w') as f:
+                f.write(collapsed_stacks(stats))
+            metadata['cpu'] = {
+                'total_calls': stats.total_calls,
+                'total_ms': round(stats.total_tt * 1000, 3),
+                'top_functions': top_functions(stats)
+            }
+        metadata['memory'] = profile.memory_stats
+        metadata['files'] = [kind for kind in EXTENSIONS if kind == 'json' or profile.profiler is not None]
+
+        path = self.path(profile_id, 'json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(metadata, f)
+        os.replace(path + '.tmp', path)
+        self._trim()
+        return profile_id
+
+    def _trim(self):
+        with self._lock:
+            for profile_id in self.ids()[self.max_profiles:]:
+                for kind in EXTENSIONS:
+                    try:
+                        os.remove(self.path(profile_id, kind))
+                    except FileNotFoundError:
+                        pass
+
+def get_profile_store():
+    return current_app.extensions.get('profile_store')
+
+def is_admin(user_id):
+    return user_id is not None and user_id in current_app.config.get('ADMIN_USER_IDS', ())
+
+def _endpoint():
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+def init_profiling(app):
+    if not app.config.get('PROFILING_ENABLED'):
+        return
+    store = app.extensions['profile_store'] = ProfileStore(
+        app.config.get('PROFILE_DIR', 'profiles'),
+        max_profiles=app.config.get('PROFILE_MAX_COUNT', 50)
+    )
+    sample_rate = app.config.get('PROFILE_SAMPLE_RATE', 0.0)
+    endpoints = set(app.config.get('PROFILE_ENDPOINTS') or ())
+    sample_memory = app.config.get('PROFILE_MEMORY', True)
+    busy = threading.Lock()
+
+    def requested_profile():
+        mode = request.headers.get('X-Profile')
+        if mode and is_admin(session.get('user_id')):
+            mode = mode.lower()
+            return 'header', RequestProfile(cpu=mode != 'memory', memory=mode != 'cpu')
+        if sample_rate and (not endpoints or _endpoint() in endpoints) and random.random() < sample_rate:
+            return 'sample', RequestProfile(memory=sample_memory)
+        return None, None
+
+    def finish(profile):
+        try:
+            profile.stop()
+        finally:
+            busy.release()
+
+    @app.before_request
+    def start_profile():
+        trigger, profile = requested_profile()
+        if profile is not None and busy.acquire(blocking=False):
+            g.profile = (trigger, profile)
+            profile.start()
+
+    @app.after_request
+    def save_profile(response):
+        trigger, profile = g.pop('profile', (None, None))
+        if profile is None:
+            return response
+        finish(profile)
+        try:
+            response.headers['X-Profile-Id'] = store.save(profile, {
+                'trigger': trigger,
+                'method': request.method,
+                'path': request.full_path.rstrip('?'),
+                'endpoint': _endpoint(),
+                'status': response.status_code,
+                'query_count': g.get('query_count', 0)
+            })
+        except OSError:
+            pass  # a full or read-only disk must not fail the request
+        return response
+
+    @app.teardown_request
+    def abandon_profile(exc):
+        # Only reached with a profile still running when after_request didn't run
+        _, profile = g.pop('profile', (None, None))
+        if profile is not None:
+            finish(profile)
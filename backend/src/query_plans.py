@@ -0,0 +1,122 @@
+import re
+from sqlalchemy import event
+from src.models.user import db, User, Tool, Booking, Category
+
+# Query plan check for the read endpoints: every GET endpoint is called
+# through the test client, and each SELECT/UPDATE/DELETE it issued is run
+# through EXPLAIN QUERY PLAN (SQLite only). A plan that scans a whole table
+# outside FULL_SCAN_ALLOWED is reported. Used by tests/test_query_plans.py
+# and the check-query-plans command.
+
+# Tables that are read in full by design (the whole catalogue is listed)
+FULL_SCAN_ALLOWED = {'category'}
+
+def read_endpoints(user_id=None):
+    """(user id to sign in as, GET endpoints to call), using ids from the current database."""
+    user = db.session.get(User, user_id) if user_id else User.query.first()
+    tool = Tool.query.filter_by(owner_id=user.id).first() if user else None
+    tool = tool or Tool.query.first()
+    booking = Booking.query.filter(
+        (Booking.borrower_id == user.id) | (Booking.lender_id == user.id)
+    ).first() if user else None
+    category = Category.query.first()
+
+    endpoints = [
+        '/api/tools/',
+        '/api/tools/?search=drill',
+        '/api/tools/?search=drill&sort_by=relevance',
+        '/api/tools/?sort_by=price_low',
+        '/api/tools/?sort_by=price_high&cursor=',
+        '/api/tools/my-tools',
+        '/api/tools/import',
+        '/api/tools/?available_from=2030-01-01&available_to=2030-01-08',
+        '/api/tools/availability?tool_ids=1,2,3',
+        '/api/categories/',
+        '/api/bookings/',
+        '/api/bookings/?type=lender&status=pending',
+        '/api/bookings/?type=borrower&cursor=',
+        '/api/messages/conversations',
+        '/api/dashboard/stats',
+        '/api/analytics/earnings',
+        '/api/analytics/earnings?range=year',
+        '/api/notifications/',
+        '/api/notifications/?unread=1&cursor=',
+        '/api/notifications/unread-count',
+    ]
+    if user:
+        endpoints.append(f'/api/reviews/user/{user.id}')
+    if tool:
+        endpoints += [
+            f'/api/tools/{tool.id}',
+            f'/api/tools/{tool.id}/bookings',
+            f'/api/tools/{tool.id}/insights',
+            f'/api/tools/{tool.id}/availability',
+            f'/api/reviews/tool/{tool.id}',
+            f'/api/reviews/tool/{tool.id}?cursor=',
+        ]
+    if category:
+        endpoints += [
+            f'/api/categories/{category.id}',
+            f'/api/categories/{category.id}/tools',
+            f'/api/categories/{category.id}/tools?sort_by=price_low&cursor=',
+        ]
+    if booking:
+        endpoints.append(f'/api/bookings/{booking.id}')
+
+    return (user.id if user else None), endpoints
+
+def full_scans(plan):
+    """The SCAN details in an EXPLAIN QUERY PLAN result that read a whole table outside FULL_SCAN_ALLOWED."""
+    tables = set(db.metadata.tables)
+    scans = []
+    for row in plan:
+        detail = row[-1]
+        match = re.match(r'SCAN (\w+)', detail)
+        if not match or 'VIRTUAL TABLE' in detail:
+            continue
+        name = match.group(1)
+        if name not in tables:
+            name = re.sub(r'_\d+$', '', name)  # SQLAlchemy alias, e.g. tool_1
+        if name in tables and name not in FULL_SCAN_ALLOWED:
+            scans.append(detail)
+    return scans
+
+def check_query_plans(app, user_id=None):
+    """Call the read endpoints, signed in as user_id (default the first user), and explain their statements.
+
+    Returns (endpoints, errors, plans): errors lists (endpoint, status) for
+    responses with a 5xx status, and plans maps each distinct statement to
+    (the endpoints that issued it, its full scans).
+    """
+    user_id, endpoints = read_endpoints(user_id)
+    statements = {}
+    current = [None]
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+            statements.setdefault(statement, (parameters, set()))[1].add(current[0])
+
+    errors = []
+    cache_enabled = app.config.get('RESPONSE_CACHE_ENABLED')
+    app.config['RESPONSE_CACHE_ENABLED'] = False
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        client = app.test_client()
+        if user_id:
+            with client.session_transaction() as session:
+                session['user_id'] = user_id
+        for endpoint in endpoints:
+            current[0] = endpoint
+            response = client.get(endpoint)
+            if response.status_code >= 500:
+                errors.append((endpoint, response.status_code))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+        app.config['RESPONSE_CACHE_ENABLED'] = cache_enabled
+
+    plans = {}
+    with db.engine.connect() as conn:
+        for statement, (parameters, sources) in statements.items():
+            plan = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+            plans[statement] = (sources, full_scans(plan))
+    return endpoints, errors, plans
@@ -1,11 +1,23 @@
-from flask import Blueprint, request, jsonify, session
-from src.models.user import db, Tool, Booking, Review
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context
+from src.models.user import db, Tool, Booking, Review, User
+from src.models.earnings import (
+    GRANULARITIES, resolve_date_range, default_granularity, earnings_history,
+    top_tools, listing_stats, rebuild_earnings_rollup
+)
 from datetime import datetime, timedelta
+import click
 import csv
 import io
+import zlib
 
 analytics_bp = Blueprint('analytics', __name__)
 
+# Rows fetched from the database and written to the response per chunk
+EXPORT_CHUNK_SIZE = 1000
+
+# Most top tools one earnings call may ask for (?top=)
+MAX_TOP_TOOLS = 50
+
 @analytics_bp.route('/earnings', methods=['GET'])
 def get_earnings_analytics():
     try:
@@ -13,66 +25,37 @@ def get_earnings_analytics():
         if not user_id:
             return jsonify({'error': 'Not authenticated'}), 401
         
-        time_range = request.args.get('range', 'month')
-        
-        # Calculate date range
-        now = datetime.utcnow()
-        if time_range == 'week':
-            start_date = now - timedelta(weeks=1)
-        elif time_range == 'year':
-            start_date = now - timedelta(days=365)
-        else:  # month
-            start_date = now - timedelta(days=30)
-        
-        # Get user's tools
-        user_tools = Tool.query.filter_by(owner_id=user_id).all()
-        tool_ids = [tool.id for tool in user_tools]
+        # Calculate date range: ?range=week|month|quarter|year|all or ?start=&end= (ISO dates)
+        try:
+            start_date, end_date = resolve_date_range(request.args)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid date range: {e}'}), 400
         
-        # Get completed bookings for user's tools
-        completed_bookings = Booking.query.filter(
-            Booking.tool_id.in_(tool_ids),
-            Booking.status == 'completed',
-            Booking.created_at >= start_date
-        ).all()
+        granularity = request.args.get('granularity') or default_granularity(start_date, end_date)
+        if granularity not in GRANULARITIES:
+            return jsonify({'error': f'granularity must be one of {", ".join(GRANULARITIES)}'}), 400
         
-        # Calculate analytics
-        total_earnings = sum(booking.total_price for booking in completed_bookings)
-        monthly_earnings = total_earnings  # For the selected time range
+        try:
+            top = min(max(int(request.args.get('top', 5)), 1), MAX_TOP_TOOLS)
+        except ValueError:
+            return jsonify({'error': 'top must be an integer'}), 400
         
-        # Top performing tools
-        tool_earnings = {}
-        for booking in completed_bookings:
-            tool_id = booking.tool_id
-            if tool_id not in tool_earnings:
-                tool_earnings[tool_id] = {'earnings': 0, 'bookings': 0}
-            tool_earnings[tool_id]['earnings'] += booking.total_price
-            tool_earnings[tool_id]['bookings'] += 1
-        
-        top_tools = []
-        for tool in user_tools:
-            if tool.id in tool_earnings:
-                top_tools.append({
-                    'id': tool.id,
-                    'name': tool.name,
-                    'category': tool.category.name if tool.category else 'Unknown',
-                    'earnings': tool_earnings[tool.id]['earnings'],
-                    'bookings': tool_earnings[tool.id]['bookings']
-                })
-        
-        top_tools.sort(key=lambda x: x['earnings'], reverse=True)
-        
-        # Booking stats
-        booking_stats = {
-            'activeTools': len([tool for tool in user_tools if tool.is_available]),
-            'avgDailyRate': sum(tool.price_per_day for tool in user_tools) / len(user_tools) if user_tools else 0
-        }
+        # Bucketed earnings from the daily rollup
+        try:
+            history = earnings_history(user_id, start_date, end_date, granularity)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid date range: {e}'}), 400
+        total_earnings = sum(bucket['earnings'] for bucket in history)
         
         return jsonify({
             'totalEarnings': total_earnings,
-            'monthlyEarnings': monthly_earnings,
-            'topTools': top_tools[:5],
-            'earningsHistory': [],  # Would contain historical data
-            'bookingStats': booking_stats
+            'monthlyEarnings': total_earnings,  # For the selected time range
+            'topTools': top_tools(user_id, start_date, end_date, top),
+            'earningsHistory': history,
+            'granularity': granularity,
+            'startDate': start_date.isoformat() if start_date else None,
+            'endDate': end_date.isoformat(),
+            'bookingStats': listing_stats(user_id)
         }), 200
         
     except Exception as e:
@@ -86,42 +69,84 @@ def export_earnings_data():
             return jsonify({'error': 'Not authenticated'}), 401
         
         time_range = request.args.get('range', 'month')
+        try:
+            start_date, end_date = resolve_date_range(request.args)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid date range: {e}'}), 400
+        
+        # Completed bookings with tool and borrower names joined in, streamed in chunks
+        query = db.session.query(
+            Booking.created_at,
+            Tool.name,
+            User.full_name,
+            User.username,
+            Booking.start_date,
+            Booking.end_date,
+            Booking.total_price
+        ).join(
+            Tool, Tool.id == Booking.tool_id
+        ).join(
+            User, User.id == Booking.borrower_id
+        ).filter(
+            Booking.lender_id == user_id,
+            Booking.status == 'completed',
+            Booking.created_at < datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+        )
+        if start_date:
+            query = query.filter(Booking.created_at >= datetime.combine(start_date, datetime.min.time()))
+        query = query.order_by(Booking.created_at.asc(), Booking.id.asc()).execution_options(
+            yield_per=EXPORT_CHUNK_SIZE
+        )
         
-        # Get user's completed bookings
-        user_tools = Tool.query.filter_by(owner_id=user_id).all()
-        tool_ids = [tool.id for tool in user_tools]
-        
-        completed_bookings = Booking.query.filter(
-            Booking.tool_id.in_(tool_ids),
-            Booking.status == 'completed'
-        ).all()
-        
-        # Create CSV
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow(['Date', 'Tool', 'Borrower', 'Duration', 'Earnings'])
-        
-        # Write data
-        for booking in completed_bookings:
-            writer.writerow([
-                booking.created_at.strftime('%Y-%m-%d'),
-                booking.tool.name,
-                booking.borrower.full_name or booking.borrower.username,
-                f"{(booking.end_date - booking.start_date).days} days",
-                f"€{booking.total_price}"
-            ])
-        
-        output.seek(0)
+        compress = request.args.get('gzip') == '1'
+        filename = f'earnings-{time_range}.csv' + ('.gz' if compress else '')
+        chunks = _csv_chunks(query)
+        if compress:
+            chunks = _gzip_chunks(chunks)
         
-        # Return CSV as response
-        from flask import Response
+        # Return CSV as a streamed response
         return Response(
-            output.getvalue(),
-            mimetype='text/csv',
-            headers={'Content-Disposition': f'attachment; filename=earnings-{time_range}.csv'}
+            stream_with_context(chunks),
+            mimetype='application/gzip' if compress else 'text/csv',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
         )
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+def _csv_chunks(rows):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    
+    # Write header
+    writer.writerow(['Date', 'Tool', 'Borrower', 'Duration', 'Earnings'])
+    
+    # Write data, flushing the buffer every chunk
+    for i, (created_at, tool_name, full_name, username, start_date, end_date, total_price) in enumerate(rows, 1):
+        writer.writerow([
+            created_at.strftime('%Y-%m-%d'),
+            tool_name,
+            full_name or username,
+            f"{(end_date - start_date).days} days",
+            f"€{total_price}"
+        ])
+        if i % EXPORT_CHUNK_SIZE == 0:
+            yield output.getvalue().encode('utf-8')
+            output.seek(0)
+            output.truncate()
+    
+    yield output.getvalue().encode('utf-8')
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+@analytics_bp.cli.command('rebuild-earnings')
+def rebuild_earnings_command():
+    """Rebuild the daily earnings rollup from completed bookings."""
+    rebuild_earnings_rollup()
+    click.echo('Earnings rollup rebuilt')
@@ -1,9 +1,15 @@
 from flask import Blueprint, request, jsonify, session
 from src.models.user import db, User
+from src.passwords import PasswordHasherBusy
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
 
+def _hasher_busy_response():
+    response = jsonify({'error': 'Too many sign-in attempts right now, please try again shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 429
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     try:
@@ -41,6 +47,9 @@ def register():
         
         return jsonify(user.to_dict()), 201
         
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return _hasher_busy_response()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -58,11 +67,20 @@ def login():
         if not user or not user.check_password(data['password']):
             return jsonify({'error': 'Invalid credentials'}), 401
         
+        # Upgrade hashes made with an older method or cost; skipped when the pool is busy
+        try:
+            if user.rehash_password_if_needed(data['password']):
+                db.session.commit()
+        except PasswordHasherBusy:
+            pass
+        
         # Store user in session
         session['user_id'] = user.id
         
         return jsonify(user.to_dict()), 200
         
+    except PasswordHasherBusy:
+        return _hasher_busy_response()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1,5 +1,13 @@
 from flask import Blueprint, request, jsonify, session
 from src.models.user import db, Booking, Tool, User
+from src.write_queue import run_write
+from src.events import publish_after_commit
+from src.models.availability import has_conflict
+from src.models.earnings import record_completed_booking
+from src.models.pagination import order_by_keys, keyset_paginate, InvalidCursor
+from src.models.serializers import (
+    booking_load_options, serialize_bookings, parse_projection, InvalidProjection, BOOKING_LIST_PROJECTION
+)
 from datetime import datetime, timedelta
 
 bookings_bp = Blueprint('bookings', __name__)
@@ -19,67 +27,63 @@ def create_booking():
             if not data.get(field):
                 return jsonify({'error': f'{field} is required'}), 400
         
-        # Get tool
-        tool = Tool.query.get(data['tool_id'])
-        if not tool:
-            return jsonify({'error': 'Tool not found'}), 404
-        
-        if not tool.is_available:
-            return jsonify({'error': 'Tool is not available'}), 400
-        
-        if tool.owner_id == user_id:
-            return jsonify({'error': 'Cannot book your own tool'}), 400
-        
-        # Parse dates
-        start_date = datetime.fromisoformat(data['start_date'].replace('Z', '+00:00'))
-        end_date = datetime.fromisoformat(data['end_date'].replace('Z', '+00:00'))
-        
-        if start_date >= end_date:
-            return jsonify({'error': 'End date must be after start date'}), 400
-        
-        if start_date < datetime.utcnow():
-            return jsonify({'error': 'Start date cannot be in the past'}), 400
-        
-        # Check for conflicting bookings
-        conflicting_booking = Booking.query.filter(
-            Booking.tool_id == data['tool_id'],
-            Booking.status.in_(['confirmed', 'active']),
-            Booking.start_date < end_date,
-            Booking.end_date > start_date
-        ).first()
-        
-        if conflicting_booking:
-            return jsonify({'error': 'Tool is already booked for this period'}), 400
-        
-        # Calculate total price
-        duration_days = (end_date - start_date).days
-        if duration_days == 0:
-            duration_days = 1  # Minimum 1 day
-        
-        total_price = duration_days * tool.price_per_day
-        
-        # Create booking
-        booking = Booking(
-            tool_id=data['tool_id'],
-            borrower_id=user_id,
-            lender_id=tool.owner_id,
-            start_date=start_date,
-            end_date=end_date,
-            total_price=total_price,
-            security_deposit=tool.security_deposit,
-            pickup_delivery_method=data.get('pickup_delivery_method', 'pickup'),
-            status='pending'
-        )
-        
-        db.session.add(booking)
-        db.session.commit()
-        
-        return jsonify(booking.to_dict()), 201
+        return run_write(_create_booking, user_id, data)
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def _create_booking(user_id, data):
+    # Get tool
+    tool = Tool.query.get(data['tool_id'])
+    if not tool:
+        return jsonify({'error': 'Tool not found'}), 404
+    
+    if not tool.is_available:
+        return jsonify({'error': 'Tool is not available'}), 400
+    
+    if tool.owner_id == user_id:
+        return jsonify({'error': 'Cannot book your own tool'}), 400
+    
+    # Parse dates
+    start_date = datetime.fromisoformat(data['start_date'].replace('Z', '+00:00'))
+    end_date = datetime.fromisoformat(data['end_date'].replace('Z', '+00:00'))
+    
+    if start_date >= end_date:
+        return jsonify({'error': 'End date must be after start date'}), 400
+    
+    if start_date < datetime.utcnow():
+        return jsonify({'error': 'Start date cannot be in the past'}), 400
+    
+    # Check for conflicting bookings
+    if has_conflict(data['tool_id'], start_date, end_date):
+        return jsonify({'error': 'Tool is already booked for this period'}), 400
+    
+    # Calculate total price
+    duration_days = (end_date - start_date).days
+    if duration_days == 0:
+        duration_days = 1  # Minimum 1 day
+    
+    total_price = duration_days * tool.price_per_day
+    
+    # Create booking
+    booking = Booking(
+        tool_id=data['tool_id'],
+        borrower_id=user_id,
+        lender_id=tool.owner_id,
+        start_date=start_date,
+        end_date=end_date,
+        total_price=total_price,
+        security_deposit=tool.security_deposit,
+        pickup_delivery_method=data.get('pickup_delivery_method', 'pickup'),
+        status='pending'
+    )
+    
+    db.session.add(booking)
+    db.session.flush()
+    
+    return jsonify(booking.to_dict()), 201
+
 @bookings_bp.route('/', methods=['GET'])
 def get_bookings():
     try:
@@ -92,6 +96,7 @@ def get_bookings():
         status = request.args.get('status')
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 20))
+        projection = parse_projection(request.args, Booking, BOOKING_LIST_PROJECTION)
         
         # Build query
         if booking_type == 'borrower':
@@ -108,19 +113,35 @@ def get_bookings():
             query = query.filter_by(status=status)
         
         # Order by creation date
-        query = query.order_by(Booking.created_at.desc())
+        sort_keys = [(Booking.created_at, True), (Booking.id, True)]
+        query = query.options(*booking_load_options(projection))
+        
+        # Cursor mode: keyset pagination, total only on request
+        cursor = request.args.get('cursor')
+        if cursor is not None:
+            bookings = keyset_paginate(query, sort_keys, per_page, cursor, request.args.get('include_total') == '1')
+            result = {
+                'bookings': serialize_bookings(bookings.items, projection),
+                'next_cursor': bookings.next_cursor,
+                'per_page': per_page
+            }
+            if bookings.total is not None:
+                result['total'] = bookings.total
+            return jsonify(result), 200
         
         # Paginate
-        bookings = query.paginate(page=page, per_page=per_page, error_out=False)
+        bookings = order_by_keys(query, sort_keys).paginate(page=page, per_page=per_page, error_out=False)
         
         return jsonify({
-            'bookings': [booking.to_dict() for booking in bookings.items],
+            'bookings': serialize_bookings(bookings.items, projection),
             'total': bookings.total,
             'pages': bookings.pages,
             'current_page': page,
             'per_page': per_page
         }), 200
         
+    except (InvalidCursor, InvalidProjection) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -151,45 +172,54 @@ def update_booking_status(booking_id):
         if not user_id:
             return jsonify({'error': 'Not authenticated'}), 401
         
-        booking = Booking.query.get(booking_id)
-        if not booking:
-            return jsonify({'error': 'Booking not found'}), 404
-        
         data = request.get_json()
-        new_status = data.get('status')
-        
-        if not new_status:
-            return jsonify({'error': 'Status is required'}), 400
         
-        # Check authorization based on status change
-        if new_status in ['confirmed', 'cancelled'] and booking.lender_id != user_id:
-            return jsonify({'error': 'Only the lender can confirm or cancel bookings'}), 403
-        
-        if new_status == 'cancelled' and booking.borrower_id != user_id and booking.lender_id != user_id:
-            return jsonify({'error': 'Only borrower or lender can cancel bookings'}), 403
-        
-        # Validate status transitions
-        valid_transitions = {
-            'pending': ['confirmed', 'cancelled'],
-            'confirmed': ['active', 'cancelled'],
-            'active': ['completed', 'cancelled'],
-            'completed': [],
-            'cancelled': []
-        }
-        
-        if new_status not in valid_transitions.get(booking.status, []):
-            return jsonify({'error': f'Cannot change status from {booking.status} to {new_status}'}), 400
-        
-        booking.status = new_status
-        booking.updated_at = datetime.utcnow()
-        db.session.commit()
-        
-        return jsonify(booking.to_dict()), 200
+        return run_write(_update_booking_status, booking_id, user_id, data)
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def _update_booking_status(booking_id, user_id, data):
+    booking = Booking.query.get(booking_id)
+    if not booking:
+        return jsonify({'error': 'Booking not found'}), 404
+    
+    new_status = data.get('status')
+    
+    if not new_status:
+        return jsonify({'error': 'Status is required'}), 400
+    
+    # Check authorization based on status change
+    if new_status in ['confirmed', 'cancelled'] and booking.lender_id != user_id:
+        return jsonify({'error': 'Only the lender can confirm or cancel bookings'}), 403
+    
+    if new_status == 'cancelled' and booking.borrower_id != user_id and booking.lender_id != user_id:
+        return jsonify({'error': 'Only borrower or lender can cancel bookings'}), 403
+    
+    # Validate status transitions
+    valid_transitions = {
+        'pending': ['confirmed', 'cancelled'],
+        'confirmed': ['active', 'cancelled'],
+        'active': ['completed', 'cancelled'],
+        'completed': [],
+        'cancelled': []
+    }
+    
+    if new_status not in valid_transitions.get(booking.status, []):
+        return jsonify({'error': f'Cannot change status from {booking.status} to {new_status}'}), 400
+    
+    booking.status = new_status
+    booking.updated_at = datetime.utcnow()
+    if new_status == 'completed':
+        record_completed_booking(booking)
+    db.session.flush()
+    
+    publish_after_commit(db.session, [booking.borrower_id, booking.lender_id], 'booking_status', {
+        'booking_id': booking.id, 'status': booking.status, 'updated_at': booking.updated_at.isoformat()
+    })
+    return jsonify(booking.to_dict()), 200
+
 @bookings_bp.route('/<int:booking_id>', methods=['DELETE'])
 def delete_booking(booking_id):
     try:
@@ -1,21 +1,18 @@
 from flask import Blueprint, request, jsonify
 from src.models.user import db, Category, Tool
+from src.response_cache import cached_response
+from src.models.category_cache import get_category_catalogue, get_cached_category
+from src.models.pagination import tool_sort_keys, order_by_keys, keyset_paginate, InvalidCursor
+from src.models.serializers import tool_load_options, serialize_tools, parse_projection, InvalidProjection, TOOL_LIST_PROJECTION
 
 categories_bp = Blueprint('categories', __name__)
 
 @categories_bp.route('/', methods=['GET'])
+@cached_response('tools')
 def get_categories():
     try:
-        categories = Category.query.all()
-        
-        # Add tool count for each category
-        result = []
-        for category in categories:
-            category_dict = category.to_dict()
-            category_dict['tool_count'] = Tool.query.filter_by(category_id=category.id, is_available=True).count()
-            result.append(category_dict)
-        
-        return jsonify(result), 200
+        # Categories with tool counts, served from the process-local catalogue cache
+        return jsonify(get_category_catalogue()), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -23,14 +20,11 @@ def get_categories():
 @categories_bp.route('/<int:category_id>', methods=['GET'])
 def get_category(category_id):
     try:
-        category = Category.query.get(category_id)
+        category = get_cached_category(category_id)
         if not category:
             return jsonify({'error': 'Category not found'}), 404
         
-        category_dict = category.to_dict()
-        category_dict['tool_count'] = Tool.query.filter_by(category_id=category.id, is_available=True).count()
-        
-        return jsonify(category_dict), 200
+        return jsonify(category), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -46,32 +40,43 @@ def get_category_tools(category_id):
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 20))
         sort_by = request.args.get('sort_by', 'created_at')
+        projection = parse_projection(request.args, Tool, TOOL_LIST_PROJECTION)
         
         # Build query
         query = Tool.query.filter_by(category_id=category_id, is_available=True)
         
         # Apply sorting
-        if sort_by == 'price_low':
-            query = query.order_by(Tool.price_per_day.asc())
-        elif sort_by == 'price_high':
-            query = query.order_by(Tool.price_per_day.desc())
-        elif sort_by == 'newest':
-            query = query.order_by(Tool.created_at.desc())
-        else:
-            query = query.order_by(Tool.created_at.desc())
+        sort_keys = tool_sort_keys(sort_by)
+        query = query.options(*tool_load_options(projection))
+        
+        # Cursor mode: keyset pagination, total only on request
+        cursor = request.args.get('cursor')
+        if cursor is not None:
+            tools = keyset_paginate(query, sort_keys, per_page, cursor, request.args.get('include_total') == '1')
+            result = {
+                'category': category.to_dict(),
+                'tools': serialize_tools(tools.items, projection),
+                'next_cursor': tools.next_cursor,
+                'per_page': per_page
+            }
+            if tools.total is not None:
+                result['total'] = tools.total
+            return jsonify(result), 200
         
         # Paginate
-        tools = query.paginate(page=page, per_page=per_page, error_out=False)
+        tools = order_by_keys(query, sort_keys).paginate(page=page, per_page=per_page, error_out=False)
         
         return jsonify({
             'category': category.to_dict(),
-            'tools': [tool.to_dict() for tool in tools.items],
+            'tools': serialize_tools(tools.items, projection),
             'total': tools.total,
             'pages': tools.pages,
             'current_page': page,
             'per_page': per_page
         }), 200
         
+    except (InvalidCursor, InvalidProjection) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
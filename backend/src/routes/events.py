@@ -0,0 +1,31 @@
+from flask import Blueprint, Response, request, jsonify, session
+from src.events import get_event_broker, TooManyStreams
+
+events_bp = Blueprint('events', __name__)
+
+@events_bp.route('/', methods=['GET'])
+def stream_events():
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    broker = get_event_broker()
+    if broker is None:
+        return jsonify({'error': 'Event stream is disabled'}), 404
+
+    # Browsers resend the last id they saw on reconnect; ?last_event_id= for manual resumes
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        subscription, missed = broker.subscribe(user_id, last_event_id)
+    except TooManyStreams as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+
+    response = Response(broker.stream(subscription, missed), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Covers a response that is closed before its body is ever iterated
+    response.call_on_close(lambda: broker.unsubscribe(subscription))
+    return response
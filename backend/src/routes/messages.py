@@ -1,6 +1,13 @@
 from flask import Blueprint, request, jsonify, session
-from src.models.user import db, Message, Booking, User
+from src.models.user import db, Message, Booking, User, MessageReadMark
+from src.write_queue import run_write
+from src.events import publish_after_commit
+from src.models.dashboard_stats import invalidate_dashboard_stats_on_commit
+from src.models.read_marks import read_marks, advance_read_mark, mark_all_read, mark_join, unread_case
+from src.models.pagination import keyset_paginate, InvalidCursor
+from src.models.serializers import conversation_load_options
 from datetime import datetime
+from sqlalchemy import func
 
 messages_bp = Blueprint('messages', __name__)
 
@@ -13,37 +20,46 @@ def create_message():
         
         data = request.get_json()
         
-        # Validate required fields
-        required_fields = ['booking_id', 'receiver_id', 'content']
+        # Validate required fields (the receiver is always the booking's other party)
+        required_fields = ['booking_id', 'content']
         for field in required_fields:
             if not data.get(field):
                 return jsonify({'error': f'{field} is required'}), 400
         
-        # Verify booking exists and user is involved
-        booking = Booking.query.get(data['booking_id'])
-        if not booking:
-            return jsonify({'error': 'Booking not found'}), 404
-        
-        if booking.borrower_id != user_id and booking.lender_id != user_id:
-            return jsonify({'error': 'Not authorized to message in this booking'}), 403
-        
-        # Create message
-        message = Message(
-            booking_id=data['booking_id'],
-            sender_id=user_id,
-            receiver_id=data['receiver_id'],
-            content=data['content']
-        )
-        
-        db.session.add(message)
-        db.session.commit()
-        
-        return jsonify(message.to_dict()), 201
+        return run_write(_create_message, user_id, data)
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def _create_message(user_id, data):
+    # Verify booking exists and user is involved
+    booking = Booking.query.get(data['booking_id'])
+    if not booking:
+        return jsonify({'error': 'Booking not found'}), 404
+    
+    if booking.borrower_id != user_id and booking.lender_id != user_id:
+        return jsonify({'error': 'Not authorized to message in this booking'}), 403
+    
+    receiver_id = _other_party(booking, user_id)
+    if data.get('receiver_id') is not None and str(data['receiver_id']) != str(receiver_id):
+        return jsonify({'error': 'receiver_id must be the other party of the booking'}), 400
+    
+    # Create message
+    message = Message(
+        booking_id=booking.id,
+        sender_id=user_id,
+        receiver_id=receiver_id,
+        content=data['content']
+    )
+    
+    db.session.add(message)
+    db.session.flush()
+    
+    message_data = message.to_dict()
+    publish_after_commit(db.session, [message.sender_id, message.receiver_id], 'message', message_data)
+    return jsonify(message_data), 201
+
 @messages_bp.route('/booking/<int:booking_id>', methods=['GET'])
 def get_booking_messages(booking_id):
     try:
@@ -62,21 +78,35 @@ def get_booking_messages(booking_id):
         # Get messages
         messages = Message.query.filter_by(booking_id=booking_id).order_by(Message.created_at.asc()).all()
         
-        # Mark messages as read
-        Message.query.filter_by(
-            booking_id=booking_id,
-            receiver_id=user_id,
-            is_read=False
-        ).update({'is_read': True})
-        db.session.commit()
+        # Mark messages as read: one upsert of the user's read mark, only when something new arrived
+        marks = read_marks(booking_id)
+        unread = any(message.receiver_id == user_id and message.id > marks.get(user_id, 0) for message in messages)
+        if unread:
+            marks[user_id] = max(message.id for message in messages)
+        
+        # Serialized before the write commits and expires the loaded messages
+        response = jsonify({
+            'messages': [message.to_dict(read_upto=marks.get(message.receiver_id, 0)) for message in messages]
+        })
+        if unread:
+            run_write(_mark_thread_read, booking_id, user_id, marks[user_id], _other_party(booking, user_id))
         
-        return jsonify({
-            'messages': [message.to_dict() for message in messages]
-        }), 200
+        return response, 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _other_party(booking, user_id):
+    return booking.lender_id if booking.borrower_id == user_id else booking.borrower_id
+
+def _mark_thread_read(booking_id, user_id, message_id, other_user_id):
+    advance_read_mark(booking_id, user_id, message_id)
+    invalidate_dashboard_stats_on_commit(user_id)
+    # Read receipt for the other party, badge update for the reader's other tabs
+    publish_after_commit(db.session, [user_id, other_user_id], 'messages_read', {
+        'booking_id': booking_id, 'user_id': user_id, 'last_read_message_id': message_id
+    })
+
 @messages_bp.route('/conversations', methods=['GET'])
 def get_conversations():
     try:
@@ -84,43 +114,53 @@ def get_conversations():
         if not user_id:
             return jsonify({'error': 'Not authenticated'}), 401
         
-        # Get all bookings where user is involved
-        bookings = Booking.query.filter(
+        # Last message time and unread count for every booking the user is in, in one grouped query
+        conversations = db.session.query(
+            Message.booking_id.label('booking_id'),
+            func.max(Message.created_at).label('last_message_at'),
+            func.sum(unread_case(user_id)).label('unread_count')
+        ).join(
+            Booking, Booking.id == Message.booking_id
+        ).outerjoin(
+            MessageReadMark, mark_join(user_id)
+        ).filter(
             (Booking.borrower_id == user_id) | (Booking.lender_id == user_id)
-        ).all()
-        
-        conversations = []
-        for booking in bookings:
-            # Get last message for this booking
-            last_message = Message.query.filter_by(booking_id=booking.id).order_by(Message.created_at.desc()).first()
-            
-            if last_message:
-                # Determine other user
-                other_user = booking.borrower if booking.lender_id == user_id else booking.lender
-                
-                # Count unread messages
-                unread_count = Message.query.filter_by(
-                    booking_id=booking.id,
-                    receiver_id=user_id,
-                    is_read=False
-                ).count()
-                
-                conversations.append({
-                    'id': booking.id,
-                    'booking_id': booking.id,
-                    'other_user': other_user.to_dict(),
-                    'tool': booking.tool.to_dict(),
-                    'last_message_at': last_message.created_at.isoformat(),
-                    'unread_count': unread_count
-                })
-        
-        # Sort by last message time
-        conversations.sort(key=lambda x: x['last_message_at'], reverse=True)
-        
-        return jsonify({
-            'conversations': conversations
-        }), 200
-        
+        ).group_by(Message.booking_id).subquery()
+        
+        query = db.session.query(conversations.c.booking_id, conversations.c.last_message_at, conversations.c.unread_count)
+        sort_keys = [(conversations.c.last_message_at, True), (conversations.c.booking_id, True)]
+        
+        # One page at a time, newest conversation first; no cursor starts from the top
+        per_page = int(request.args.get('per_page', 20))
+        page = keyset_paginate(query, sort_keys, per_page, request.args.get('cursor'))
+        rows = page.items
+        
+        # Batch-load the bookings with only the columns the summaries use
+        booking_ids = [row[0] for row in rows]
+        bookings = {}
+        if booking_ids:
+            bookings = {
+                booking.id: booking
+                for booking in Booking.query.filter(Booking.id.in_(booking_ids)).options(*conversation_load_options())
+            }
+        
+        result = []
+        for booking_id, last_message_at, unread_count in rows:
+            booking = bookings[booking_id]
+            other_user = booking.borrower if booking.lender_id == user_id else booking.lender
+            result.append({
+                'id': booking_id,
+                'booking_id': booking_id,
+                'other_user': other_user.to_summary_dict(),
+                'tool': booking.tool.to_summary_dict(),
+                'last_message_at': last_message_at.isoformat(),
+                'unread_count': unread_count or 0
+            })
+        
+        return jsonify({'conversations': result, 'next_cursor': page.next_cursor, 'per_page': per_page}), 200
+        
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -131,18 +171,42 @@ def mark_message_read(message_id):
         if not user_id:
             return jsonify({'error': 'Not authenticated'}), 401
         
-        message = Message.query.get(message_id)
-        if not message:
-            return jsonify({'error': 'Message not found'}), 404
+        return run_write(_mark_message_read, message_id, user_id)
         
-        if message.receiver_id != user_id:
-            return jsonify({'error': 'Not authorized to mark this message as read'}), 403
-        
-        message.is_read = True
-        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+def _mark_message_read(message_id, user_id):
+    message = Message.query.get(message_id)
+    if not message:
+        return jsonify({'error': 'Message not found'}), 404
+    
+    if message.receiver_id != user_id:
+        return jsonify({'error': 'Not authorized to mark this message as read'}), 403
+    
+    # Moves the read mark, so earlier messages in the booking count as read too
+    _mark_thread_read(message.booking_id, user_id, message_id, message.sender_id)
+    
+    return jsonify(message.to_dict(read_upto=message_id)), 200
+
+@messages_bp.route('/read', methods=['PUT'])
+def mark_all_messages_read():
+    try:
+        user_id = session.get('user_id')
+        if not user_id:
+            return jsonify({'error': 'Not authenticated'}), 401
         
-        return jsonify(message.to_dict()), 200
+        return run_write(_mark_all_messages_read, user_id)
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+def _mark_all_messages_read(user_id):
+    conversations = mark_all_read(user_id)
+    if conversations:
+        publish_after_commit(db.session, [user_id], 'messages_read', {'user_id': user_id, 'all': True})
+        invalidate_dashboard_stats_on_commit(user_id)
+    
+    return jsonify({'updated_conversations': conversations}), 200
\ No newline at end of file
@@ -1,40 +1,14 @@
 from flask import Blueprint, request, jsonify, session
-from src.models.user import db, User
-from datetime import datetime
+from src.models.user import db, Notification
+from src.write_queue import run_write
+from src.events import publish_after_commit
+from src.models.notifications import unread_count, mark_read, reconcile_unread_counts
+from src.models.pagination import keyset_paginate, InvalidCursor
+import click
 
 notifications_bp = Blueprint('notifications', __name__)
 
-# Mock notification data for demonstration
-def get_mock_notifications(user_id):
-    return [
-        {
-            'id': 1,
-            'user_id': user_id,
-            'type': 'booking_request',
-            'title': 'New Booking Request',
-            'message': 'Someone wants to rent your DEWALT Drill',
-            'is_read': False,
-            'created_at': datetime.utcnow().isoformat()
-        },
-        {
-            'id': 2,
-            'user_id': user_id,
-            'type': 'booking_confirmed',
-            'title': 'Booking Confirmed',
-            'message': 'Your booking for Circular Saw has been confirmed',
-            'is_read': False,
-            'created_at': datetime.utcnow().isoformat()
-        },
-        {
-            'id': 3,
-            'user_id': user_id,
-            'type': 'new_review',
-            'title': 'New Review',
-            'message': 'You received a 5-star review for your hammer',
-            'is_read': True,
-            'created_at': datetime.utcnow().isoformat()
-        }
-    ]
+MAX_PER_PAGE = 100
 
 @notifications_bp.route('/', methods=['GET'])
 def get_notifications():
@@ -42,16 +16,36 @@ def get_notifications():
         user_id = session.get('user_id')
         if not user_id:
             return jsonify({'error': 'Not authenticated'}), 401
-        
-        # Get mock notifications (in real app, this would query a notifications table)
-        notifications = get_mock_notifications(user_id)
-        unread_count = len([n for n in notifications if not n['is_read']])
-        
+
+        per_page = min(int(request.args.get('per_page', 20)), MAX_PER_PAGE)
+
+        # Newest first, keyset-paginated; ?unread=1 lists only unread ones
+        query = Notification.query.filter(Notification.user_id == user_id)
+        if request.args.get('unread') == '1':
+            query = query.filter(Notification.is_read == False)
+        sort_keys = [(Notification.created_at, True), (Notification.id, True)]
+        notifications = keyset_paginate(query, sort_keys, per_page, request.args.get('cursor'))
+
         return jsonify({
-            'notifications': notifications,
-            'unread_count': unread_count
+            'notifications': [notification.to_dict() for notification in notifications.items],
+            'next_cursor': notifications.next_cursor,
+            'unread_count': unread_count(user_id)
         }), 200
-        
+
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@notifications_bp.route('/unread-count', methods=['GET'])
+def get_unread_count():
+    try:
+        user_id = session.get('user_id')
+        if not user_id:
+            return jsonify({'error': 'Not authenticated'}), 401
+
+        return jsonify({'unread_count': unread_count(user_id)}), 200
+
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -61,11 +55,53 @@ def mark_notification_read(notification_id):
         user_id = session.get('user_id')
         if not user_id:
             return jsonify({'error': 'Not authenticated'}), 401
-        
-        # In a real app, this would update the notification in the database
-        # For now, we'll just return success
-        
-        return jsonify({'message': 'Notification marked as read'}), 200
-        
+
+        return run_write(_mark_notification_read, notification_id, user_id)
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+def _mark_notification_read(notification_id, user_id):
+    if not mark_read(user_id, [notification_id]):
+        notification = Notification.query.get(notification_id)
+        if not notification or notification.user_id != user_id:
+            return jsonify({'error': 'Notification not found'}), 404
+
+    count = unread_count(user_id)
+    publish_after_commit(db.session, [user_id], 'unread_count', {'unread_count': count})
+    return jsonify({'message': 'Notification marked as read', 'unread_count': count}), 200
+
+@notifications_bp.route('/read', methods=['PUT'])
+def mark_notifications_read():
+    try:
+        user_id = session.get('user_id')
+        if not user_id:
+            return jsonify({'error': 'Not authenticated'}), 401
+
+        # {"ids": [...]} marks those notifications, an empty body marks all of them
+        data = request.get_json(silent=True) or {}
+        notification_ids = data.get('ids')
+        if notification_ids is not None and (
+            not isinstance(notification_ids, list) or not all(isinstance(i, int) for i in notification_ids)
+        ):
+            return jsonify({'error': 'ids must be a list of notification ids'}), 400
+
+        return run_write(_mark_notifications_read, user_id, notification_ids)
+
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+def _mark_notifications_read(user_id, notification_ids):
+    updated = mark_read(user_id, notification_ids)
+    count = unread_count(user_id)
+    if updated:
+        publish_after_commit(db.session, [user_id], 'unread_count', {'unread_count': count})
+    return jsonify({'updated': updated, 'unread_count': count}), 200
+
+@notifications_bp.cli.command('reconcile-unread')
+def reconcile_unread_command():
+    """Recount every user's unread notifications."""
+    reconcile_unread_counts()
+    click.echo('Unread notification counts reconciled')
@@ -0,0 +1,68 @@
+import os
+from flask import Blueprint, request, jsonify, session, send_file
+from src.profiling import get_profile_store, is_admin
+
+profiles_bp = Blueprint('profiles', __name__)
+
+MIMETYPES = {'pstats': 'application/octet-stream', 'collapsed': 'text/plain', 'json': 'application/json'}
+
+def _admin_store():
+    """(profile store, None) for an admin, else (None, error response)."""
+    store = get_profile_store()
+    if store is None:
+        return None, (jsonify({'error': 'Profiling is disabled'}), 404)
+    user_id = session.get('user_id')
+    if not user_id:
+        return None, (jsonify({'error': 'Not authenticated'}), 401)
+    if not is_admin(user_id):
+        return None, (jsonify({'error': 'Admin access required'}), 403)
+    return store, None
+
+@profiles_bp.route('/', methods=['GET'])
+def get_profiles():
+    try:
+        store, error = _admin_store()
+        if error:
+            return error
+
+        # Summaries only; the top functions and allocations are in the detail view
+        profiles = []
+        for profile_id in store.ids():
+            profile = store.load(profile_id)
+            if profile is not None:
+                profile.pop('cpu', None)
+                profile.pop('memory', None)
+                profiles.append(profile)
+        return jsonify({'profiles': profiles}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@profiles_bp.route('/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    try:
+        store, error = _admin_store()
+        if error:
+            return error
+
+        profile = store.load(profile_id)
+        if profile is None:
+            return jsonify({'error': 'Profile not found'}), 404
+        return jsonify(profile), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@profiles_bp.route('/<profile_id>/download', methods=['GET'])
+def download_profile(profile_id):
+    store, error = _admin_store()
+    if error:
+        return error
+
+    kind = request.args.get('format', 'pstats')
+    if kind not in MIMETYPES:
+        return jsonify({'error': f"format must be one of {', '.join(MIMETYPES)}"}), 400
+    path = store.path(profile_id, kind)
+    if path is None or not os.path.exists(path):
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(path, mimetype=MIMETYPES[kind], as_attachment=True, download_name=os.path.basename(path))
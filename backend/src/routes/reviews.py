@@ -1,6 +1,12 @@
 from flask import Blueprint, request, jsonify, session
 from src.models.user import db, Review, Booking, Tool, User
+from src.write_queue import run_write
+from src.response_cache import cached_response
+from src.models.pagination import order_by_keys, keyset_paginate, InvalidCursor
+from src.models.ratings import adjust_rating_aggregates, reconcile_rating_aggregates
 from datetime import datetime
+from sqlalchemy.orm import selectinload
+import click
 
 reviews_bp = Blueprint('reviews', __name__)
 
@@ -24,60 +30,67 @@ def create_review():
         if not isinstance(rating, int) or rating < 1 or rating > 5:
             return jsonify({'error': 'Rating must be between 1 and 5'}), 400
         
-        # Get booking
-        booking = Booking.query.get(data['booking_id'])
-        if not booking:
-            return jsonify({'error': 'Booking not found'}), 404
-        
-        # Check if user is involved in this booking
-        if booking.borrower_id != user_id and booking.lender_id != user_id:
-            return jsonify({'error': 'Not authorized to review this booking'}), 403
-        
-        # Check if booking is completed
-        if booking.status != 'completed':
-            return jsonify({'error': 'Can only review completed bookings'}), 400
-        
-        # Determine reviewee based on review type and user role
-        review_type = data['review_type']
-        if review_type == 'tool_review':
-            reviewee_id = booking.lender_id  # Tool owner
-        elif review_type == 'user_review':
-            # If borrower is reviewing, reviewee is lender and vice versa
-            reviewee_id = booking.lender_id if booking.borrower_id == user_id else booking.borrower_id
-        else:
-            return jsonify({'error': 'Invalid review type'}), 400
-        
-        # Check if review already exists
-        existing_review = Review.query.filter_by(
-            booking_id=data['booking_id'],
-            reviewer_id=user_id,
-            review_type=review_type
-        ).first()
-        
-        if existing_review:
-            return jsonify({'error': 'Review already exists for this booking'}), 400
-        
-        # Create review
-        review = Review(
-            booking_id=data['booking_id'],
-            reviewer_id=user_id,
-            reviewee_id=reviewee_id,
-            tool_id=booking.tool_id,
-            rating=rating,
-            comment=data.get('comment', ''),
-            review_type=review_type
-        )
-        
-        db.session.add(review)
-        db.session.commit()
-        
-        return jsonify(review.to_dict()), 201
+        return run_write(_create_review, user_id, data)
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def _create_review(user_id, data):
+    rating = data['rating']
+    
+    # Get booking
+    booking = Booking.query.get(data['booking_id'])
+    if not booking:
+        return jsonify({'error': 'Booking not found'}), 404
+    
+    # Check if user is involved in this booking
+    if booking.borrower_id != user_id and booking.lender_id != user_id:
+        return jsonify({'error': 'Not authorized to review this booking'}), 403
+    
+    # Check if booking is completed
+    if booking.status != 'completed':
+        return jsonify({'error': 'Can only review completed bookings'}), 400
+    
+    # Determine reviewee based on review type and user role
+    review_type = data['review_type']
+    if review_type == 'tool_review':
+        reviewee_id = booking.lender_id  # Tool owner
+    elif review_type == 'user_review':
+        # If borrower is reviewing, reviewee is lender and vice versa
+        reviewee_id = booking.lender_id if booking.borrower_id == user_id else booking.borrower_id
+    else:
+        return jsonify({'error': 'Invalid review type'}), 400
+    
+    # Check if review already exists
+    existing_review = Review.query.filter_by(
+        booking_id=data['booking_id'],
+        reviewer_id=user_id,
+        review_type=review_type
+    ).first()
+    
+    if existing_review:
+        return jsonify({'error': 'Review already exists for this booking'}), 400
+    
+    # Create review
+    review = Review(
+        booking_id=data['booking_id'],
+        reviewer_id=user_id,
+        reviewee_id=reviewee_id,
+        tool_id=booking.tool_id,
+        rating=rating,
+        comment=data.get('comment', ''),
+        review_type=review_type
+    )
+    
+    db.session.add(review)
+    adjust_rating_aggregates(review, rating, 1)
+    db.session.flush()
+    
+    return jsonify(review.to_dict()), 201
+
 @reviews_bp.route('/tool/<int:tool_id>', methods=['GET'])
+@cached_response('reviews', 'tools', 'users')
 def get_tool_reviews(tool_id):
     try:
         tool = Tool.query.get(tool_id)
@@ -89,31 +102,50 @@ def get_tool_reviews(tool_id):
         per_page = int(request.args.get('per_page', 20))
         
         # Get tool reviews
-        reviews = Review.query.filter_by(
+        query = Review.query.filter_by(
             tool_id=tool_id,
             review_type='tool_review'
-        ).order_by(Review.created_at.desc()).paginate(
+        ).options(
+            selectinload(Review.reviewer), selectinload(Review.reviewee)
+        )
+        sort_keys = [(Review.created_at, True), (Review.id, True)]
+        
+        # Cursor mode: keyset pagination, total only on request
+        cursor = request.args.get('cursor')
+        if cursor is not None:
+            reviews = keyset_paginate(query, sort_keys, per_page, cursor, request.args.get('include_total') == '1')
+            result = {
+                'reviews': [review.to_dict() for review in reviews.items],
+                'next_cursor': reviews.next_cursor,
+                'per_page': per_page,
+                'average_rating': round(tool.average_rating, 1),
+                'review_count': tool.rating_count
+            }
+            if reviews.total is not None:
+                result['total'] = reviews.total
+            return jsonify(result), 200
+        
+        reviews = order_by_keys(query, sort_keys).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
-        # Calculate average rating
-        all_reviews = Review.query.filter_by(tool_id=tool_id, review_type='tool_review').all()
-        average_rating = sum(r.rating for r in all_reviews) / len(all_reviews) if all_reviews else 0
-        
         return jsonify({
             'reviews': [review.to_dict() for review in reviews.items],
             'total': reviews.total,
             'pages': reviews.pages,
             'current_page': page,
             'per_page': per_page,
-            'average_rating': round(average_rating, 1),
-            'review_count': len(all_reviews)
+            'average_rating': round(tool.average_rating, 1),
+            'review_count': tool.rating_count
         }), 200
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @reviews_bp.route('/user/<int:user_id>', methods=['GET'])
+@cached_response('reviews', 'users')
 def get_user_reviews(user_id):
     try:
         user = User.query.get(user_id)
@@ -125,27 +157,45 @@ def get_user_reviews(user_id):
         per_page = int(request.args.get('per_page', 20))
         
         # Get user reviews (reviews received by this user)
-        reviews = Review.query.filter_by(
+        query = Review.query.filter_by(
             reviewee_id=user_id,
             review_type='user_review'
-        ).order_by(Review.created_at.desc()).paginate(
+        ).options(
+            selectinload(Review.reviewer), selectinload(Review.reviewee)
+        )
+        sort_keys = [(Review.created_at, True), (Review.id, True)]
+        
+        # Cursor mode: keyset pagination, total only on request
+        cursor = request.args.get('cursor')
+        if cursor is not None:
+            reviews = keyset_paginate(query, sort_keys, per_page, cursor, request.args.get('include_total') == '1')
+            result = {
+                'reviews': [review.to_dict() for review in reviews.items],
+                'next_cursor': reviews.next_cursor,
+                'per_page': per_page,
+                'average_rating': round(user.average_rating, 1),
+                'review_count': user.rating_count
+            }
+            if reviews.total is not None:
+                result['total'] = reviews.total
+            return jsonify(result), 200
+        
+        reviews = order_by_keys(query, sort_keys).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
-        # Calculate average rating
-        all_reviews = Review.query.filter_by(reviewee_id=user_id, review_type='user_review').all()
-        average_rating = sum(r.rating for r in all_reviews) / len(all_reviews) if all_reviews else 0
-        
         return jsonify({
             'reviews': [review.to_dict() for review in reviews.items],
             'total': reviews.total,
             'pages': reviews.pages,
             'current_page': page,
             'per_page': per_page,
-            'average_rating': round(average_rating, 1),
-            'review_count': len(all_reviews)
+            'average_rating': round(user.average_rating, 1),
+            'review_count': user.rating_count
         }), 200
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -182,6 +232,7 @@ def update_review(review_id):
             rating = data['rating']
             if not isinstance(rating, int) or rating < 1 or rating > 5:
                 return jsonify({'error': 'Rating must be between 1 and 5'}), 400
+            adjust_rating_aggregates(review, rating - review.rating, 0)
             review.rating = rating
         
         if 'comment' in data:
@@ -209,6 +260,7 @@ def delete_review(review_id):
         if review.reviewer_id != user_id:
             return jsonify({'error': 'Not authorized to delete this review'}), 403
         
+        adjust_rating_aggregates(review, -review.rating, -1)
         db.session.delete(review)
         db.session.commit()
         
@@ -218,3 +270,8 @@ def delete_review(review_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@reviews_bp.cli.command('reconcile-ratings')
+def reconcile_ratings_command():
+    """Rebuild Tool and User rating aggregates from the Review table."""
+    reconcile_rating_aggregates()
+    click.echo('Rating aggregates rebuilt')
@@ -1,11 +1,24 @@
 from flask import Blueprint, request, jsonify, session
-from src.models.user import db, Tool, Category, ToolImage, User, Booking
-from datetime import datetime
-from sqlalchemy import or_, and_
+from src.models.user import db, Tool, Category, ToolImage, Booking, ToolImportJob
+from src.write_queue import run_write
+from datetime import datetime, timedelta
+import click
+from src.models.availability import (
+    MAX_WINDOW_DAYS, parse_datetime, tool_availability, filter_available
+)
+from src.response_cache import cached_response
+from src.models.search import apply_search, rebuild_search_index, fts_enabled
+from src.models.pagination import tool_sort_keys, order_by_keys, keyset_paginate, InvalidCursor
+from src.models.tool_import import detect_format, read_rows, run_import, ImportConflict
+from src.models.serializers import (
+    tool_load_options, booking_load_options, serialize_tools, serialize_bookings,
+    parse_projection, InvalidProjection, TOOL_LIST_PROJECTION
+)
 
 tools_bp = Blueprint('tools', __name__)
 
 @tools_bp.route('/', methods=['GET'])
+@cached_response('tools', 'users', arg_scopes={'available_from': 'bookings'})
 def get_tools():
     try:
         # Get query parameters
@@ -14,49 +27,69 @@ def get_tools():
         sort_by = request.args.get('sort_by', 'created_at')
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 20))
+        projection = parse_projection(request.args, Tool, TOOL_LIST_PROJECTION)
         
         # Build query
         query = Tool.query.filter(Tool.is_available == True)
         
         # Apply search filter
+        rank = None
         if search:
-            query = query.join(User).filter(
-                or_(
-                    Tool.name.ilike(f'%{search}%'),
-                    Tool.description.ilike(f'%{search}%'),
-                    Tool.brand_model.ilike(f'%{search}%')
-                )
-            )
+            query, rank = apply_search(query, search)
         
         # Apply category filter
         if category_id:
             query = query.filter(Tool.category_id == category_id)
         
+        # Apply availability filter: no confirmed/active booking in the window
+        available_from = request.args.get('available_from')
+        available_to = request.args.get('available_to')
+        if available_from or available_to:
+            if not (available_from and available_to):
+                return jsonify({'error': 'available_from and available_to must be given together'}), 400
+            try:
+                window_start, window_end = parse_datetime(available_from), parse_datetime(available_to)
+            except ValueError:
+                return jsonify({'error': 'Invalid available_from/available_to date'}), 400
+            if window_start >= window_end:
+                return jsonify({'error': 'available_to must be after available_from'}), 400
+            query = filter_available(query, window_start, window_end)
+        
         # Apply sorting
-        if sort_by == 'price_low':
-            query = query.order_by(Tool.price_per_day.asc())
-        elif sort_by == 'price_high':
-            query = query.order_by(Tool.price_per_day.desc())
-        elif sort_by == 'newest':
-            query = query.order_by(Tool.created_at.desc())
-        else:
-            query = query.order_by(Tool.created_at.desc())
+        sort_keys = tool_sort_keys(sort_by, rank)
+        query = query.options(*tool_load_options(projection))
+        
+        # Cursor mode: keyset pagination, total only on request
+        cursor = request.args.get('cursor')
+        if cursor is not None:
+            tools = keyset_paginate(query, sort_keys, per_page, cursor, request.args.get('include_total') == '1')
+            result = {
+                'tools': serialize_tools(tools.items, projection),
+                'next_cursor': tools.next_cursor,
+                'per_page': per_page
+            }
+            if tools.total is not None:
+                result['total'] = tools.total
+            return jsonify(result), 200
         
         # Paginate
-        tools = query.paginate(page=page, per_page=per_page, error_out=False)
+        tools = order_by_keys(query, sort_keys).paginate(page=page, per_page=per_page, error_out=False)
         
         return jsonify({
-            'tools': [tool.to_dict() for tool in tools.items],
+            'tools': serialize_tools(tools.items, projection),
             'total': tools.total,
             'pages': tools.pages,
             'current_page': page,
             'per_page': per_page
         }), 200
         
+    except (InvalidCursor, InvalidProjection) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @tools_bp.route('/<int:tool_id>', methods=['GET'])
+@cached_response('tools', 'users')
 def get_tool(tool_id):
     try:
         tool = Tool.query.get(tool_id)
@@ -68,6 +101,63 @@ def get_tool(tool_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _availability_window():
+    """Parse ?from=&to= (defaults: now and 30 days later) into a bounded window."""
+    start = parse_datetime(request.args['from']) if request.args.get('from') else datetime.utcnow()
+    end = parse_datetime(request.args['to']) if request.args.get('to') else start + timedelta(days=30)
+    if start >= end:
+        raise ValueError('to must be after from')
+    if end - start > timedelta(days=MAX_WINDOW_DAYS):
+        raise ValueError(f'window cannot exceed {MAX_WINDOW_DAYS} days')
+    return start, end
+
+@tools_bp.route('/<int:tool_id>/availability', methods=['GET'])
+def get_tool_availability(tool_id):
+    try:
+        if not Tool.query.get(tool_id):
+            return jsonify({'error': 'Tool not found'}), 404
+        
+        try:
+            start, end = _availability_window()
+        except ValueError as e:
+            return jsonify({'error': f'Invalid window: {e}'}), 400
+        
+        availability = tool_availability([tool_id], start, end)[tool_id]
+        
+        return jsonify(dict(availability, tool_id=tool_id, start=start.isoformat(), end=end.isoformat())), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@tools_bp.route('/availability', methods=['GET'])
+def get_tools_availability():
+    try:
+        # Batch mode: ?tool_ids=1,2,3&from=&to= answered with one query
+        try:
+            tool_ids = [int(tool_id) for tool_id in request.args.get('tool_ids', '').split(',') if tool_id]
+        except ValueError:
+            return jsonify({'error': 'tool_ids must be a comma-separated list of ids'}), 400
+        if not tool_ids:
+            return jsonify({'error': 'tool_ids is required'}), 400
+        if len(tool_ids) > 100:
+            return jsonify({'error': 'At most 100 tool_ids per request'}), 400
+        
+        try:
+            start, end = _availability_window()
+        except ValueError as e:
+            return jsonify({'error': f'Invalid window: {e}'}), 400
+        
+        availability = tool_availability(tool_ids, start, end)
+        
+        return jsonify({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'tools': {str(tool_id): result for tool_id, result in availability.items()}
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @tools_bp.route('/', methods=['POST'])
 def create_tool():
     try:
@@ -83,42 +173,45 @@ def create_tool():
             if not data.get(field):
                 return jsonify({'error': f'{field} is required'}), 400
         
-        # Create new tool
-        tool = Tool(
-            owner_id=user_id,
-            category_id=data['category_id'],
-            name=data['name'],
-            brand_model=data.get('brand_model'),
-            description=data['description'],
-            condition=data.get('condition', 'Good'),
-            price_per_hour=data.get('price_per_hour'),
-            price_per_day=data['price_per_day'],
-            price_per_week=data.get('price_per_week'),
-            security_deposit=data.get('security_deposit', 0),
-            pickup_delivery_options=data.get('pickup_delivery_options', 'Pickup only')
-        )
-        
-        db.session.add(tool)
-        db.session.flush()  # Get the tool ID
-        
-        # Add images if provided
-        if data.get('images'):
-            for i, image_url in enumerate(data['images']):
-                image = ToolImage(
-                    tool_id=tool.id,
-                    image_url=image_url,
-                    is_primary=(i == 0)
-                )
-                db.session.add(image)
-        
-        db.session.commit()
-        
-        return jsonify(tool.to_dict()), 201
+        return run_write(_create_tool, user_id, data)
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def _create_tool(user_id, data):
+    # Create new tool
+    tool = Tool(
+        owner_id=user_id,
+        category_id=data['category_id'],
+        name=data['name'],
+        brand_model=data.get('brand_model'),
+        description=data['description'],
+        condition=data.get('condition', 'Good'),
+        price_per_hour=data.get('price_per_hour'),
+        price_per_day=data['price_per_day'],
+        price_per_week=data.get('price_per_week'),
+        security_deposit=data.get('security_deposit', 0),
+        pickup_delivery_options=data.get('pickup_delivery_options', 'Pickup only')
+    )
+    
+    db.session.add(tool)
+    db.session.flush()  # Get the tool ID
+    
+    # Add images if provided
+    if data.get('images'):
+        for i, image_url in enumerate(data['images']):
+            image = ToolImage(
+                tool_id=tool.id,
+                image_url=image_url,
+                is_primary=(i == 0)
+            )
+            db.session.add(image)
+    
+    db.session.flush()
+    
+    return jsonify(tool.to_dict()), 201
+
 @tools_bp.route('/<int:tool_id>', methods=['PUT'])
 def update_tool(tool_id):
     try:
@@ -126,46 +219,49 @@ def update_tool(tool_id):
         if not user_id:
             return jsonify({'error': 'Not authenticated'}), 401
         
-        tool = Tool.query.get(tool_id)
-        if not tool:
-            return jsonify({'error': 'Tool not found'}), 404
-        
-        if tool.owner_id != user_id:
-            return jsonify({'error': 'Not authorized to update this tool'}), 403
-        
         data = request.get_json()
         
-        # Update allowed fields
-        if 'name' in data:
-            tool.name = data['name']
-        if 'brand_model' in data:
-            tool.brand_model = data['brand_model']
-        if 'description' in data:
-            tool.description = data['description']
-        if 'condition' in data:
-            tool.condition = data['condition']
-        if 'price_per_hour' in data:
-            tool.price_per_hour = data['price_per_hour']
-        if 'price_per_day' in data:
-            tool.price_per_day = data['price_per_day']
-        if 'price_per_week' in data:
-            tool.price_per_week = data['price_per_week']
-        if 'security_deposit' in data:
-            tool.security_deposit = data['security_deposit']
-        if 'pickup_delivery_options' in data:
-            tool.pickup_delivery_options = data['pickup_delivery_options']
-        if 'is_available' in data:
-            tool.is_available = data['is_available']
-        
-        tool.updated_at = datetime.utcnow()
-        db.session.commit()
-        
-        return jsonify(tool.to_dict()), 200
+        return run_write(_update_tool, tool_id, user_id, data)
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def _update_tool(tool_id, user_id, data):
+    tool = Tool.query.get(tool_id)
+    if not tool:
+        return jsonify({'error': 'Tool not found'}), 404
+    
+    if tool.owner_id != user_id:
+        return jsonify({'error': 'Not authorized to update this tool'}), 403
+    
+    # Update allowed fields
+    if 'name' in data:
+        tool.name = data['name']
+    if 'brand_model' in data:
+        tool.brand_model = data['brand_model']
+    if 'description' in data:
+        tool.description = data['description']
+    if 'condition' in data:
+        tool.condition = data['condition']
+    if 'price_per_hour' in data:
+        tool.price_per_hour = data['price_per_hour']
+    if 'price_per_day' in data:
+        tool.price_per_day = data['price_per_day']
+    if 'price_per_week' in data:
+        tool.price_per_week = data['price_per_week']
+    if 'security_deposit' in data:
+        tool.security_deposit = data['security_deposit']
+    if 'pickup_delivery_options' in data:
+        tool.pickup_delivery_options = data['pickup_delivery_options']
+    if 'is_available' in data:
+        tool.is_available = data['is_available']
+    
+    tool.updated_at = datetime.utcnow()
+    db.session.flush()
+    
+    return jsonify(tool.to_dict()), 200
+
 @tools_bp.route('/<int:tool_id>', methods=['DELETE'])
 def delete_tool(tool_id):
     try:
@@ -173,22 +269,109 @@ def delete_tool(tool_id):
         if not user_id:
             return jsonify({'error': 'Not authenticated'}), 401
         
-        tool = Tool.query.get(tool_id)
-        if not tool:
-            return jsonify({'error': 'Tool not found'}), 404
+        return run_write(_delete_tool, tool_id, user_id)
         
-        if tool.owner_id != user_id:
-            return jsonify({'error': 'Not authorized to delete this tool'}), 403
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+def _delete_tool(tool_id, user_id):
+    tool = Tool.query.get(tool_id)
+    if not tool:
+        return jsonify({'error': 'Tool not found'}), 404
+    
+    if tool.owner_id != user_id:
+        return jsonify({'error': 'Not authorized to delete this tool'}), 403
+    
+    db.session.delete(tool)
+    db.session.flush()
+    
+    return jsonify({'message': 'Tool deleted successfully'}), 200
+
+@tools_bp.route('/import', methods=['POST'])
+def import_tools():
+    try:
+        user_id = session.get('user_id')
+        if not user_id:
+            return jsonify({'error': 'Not authenticated'}), 401
         
-        db.session.delete(tool)
-        db.session.commit()
+        fmt = detect_format(request.content_type, request.args.get('format'))
+        job = ToolImportJob(owner_id=user_id, format=fmt)
+        db.session.add(job)
+        db.session.commit()  # the job id is the resume handle even if the upload breaks off
         
-        return jsonify({'message': 'Tool deleted successfully'}), 200
+        return _run_tool_import(job)
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@tools_bp.route('/import/<int:job_id>', methods=['POST'])
+def resume_tool_import(job_id):
+    try:
+        user_id = session.get('user_id')
+        if not user_id:
+            return jsonify({'error': 'Not authenticated'}), 401
+        
+        job = ToolImportJob.query.get(job_id)
+        if not job or job.owner_id != user_id:
+            return jsonify({'error': 'Import job not found'}), 404
+        
+        if job.status == 'completed':
+            return jsonify(job.to_dict()), 200
+        
+        return _run_tool_import(job)
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+def _run_tool_import(job):
+    # Upload the same file again to the job to resume; rows already processed are skipped
+    job_id = job.id
+    try:
+        run_import(job, read_rows(request.stream, job.format))
+    except ImportConflict as e:
+        return jsonify({'error': str(e), 'job_id': job_id}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e), 'job_id': job_id}), 500
+    
+    db.session.expire_all()
+    return jsonify(ToolImportJob.query.get(job_id).to_dict()), 200
+
+@tools_bp.route('/import', methods=['GET'])
+def get_tool_imports():
+    try:
+        user_id = session.get('user_id')
+        if not user_id:
+            return jsonify({'error': 'Not authenticated'}), 401
+        
+        jobs = ToolImportJob.query.filter_by(owner_id=user_id).order_by(ToolImportJob.created_at.desc()).limit(50).all()
+        
+        return jsonify({'jobs': [job.to_dict(with_errors=False) for job in jobs]}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@tools_bp.route('/import/<int:job_id>', methods=['GET'])
+def get_tool_import(job_id):
+    try:
+        user_id = session.get('user_id')
+        if not user_id:
+            return jsonify({'error': 'Not authenticated'}), 401
+        
+        job = ToolImportJob.query.get(job_id)
+        if not job or job.owner_id != user_id:
+            return jsonify({'error': 'Import job not found'}), 404
+        
+        return jsonify(job.to_dict()), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @tools_bp.route('/my-tools', methods=['GET'])
 def get_my_tools():
     try:
@@ -196,10 +379,13 @@ def get_my_tools():
         if not user_id:
             return jsonify({'error': 'Not authenticated'}), 401
         
-        tools = Tool.query.filter_by(owner_id=user_id).order_by(Tool.created_at.desc()).all()
+        projection = parse_projection(request.args, Tool)
+        tools = Tool.query.filter_by(owner_id=user_id).options(*tool_load_options(projection)).order_by(Tool.created_at.desc()).all()
         
-        return jsonify([tool.to_dict() for tool in tools]), 200
+        return jsonify(serialize_tools(tools, projection)), 200
         
+    except InvalidProjection as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -217,12 +403,15 @@ def get_tool_bookings(tool_id):
         if tool.owner_id != user_id:
             return jsonify({'error': 'Not authorized to view these bookings'}), 403
         
-        bookings = Booking.query.filter_by(tool_id=tool_id).order_by(Booking.start_date.asc()).all()
+        projection = parse_projection(request.args, Booking)
+        bookings = Booking.query.filter_by(tool_id=tool_id).options(*booking_load_options(projection)).order_by(Booking.start_date.asc()).all()
         
         return jsonify({
-            'bookings': [booking.to_dict() for booking in bookings]
+            'bookings': serialize_bookings(bookings, projection)
         }), 200
         
+    except InvalidProjection as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -248,11 +437,6 @@ def get_tool_insights(tool_id):
         total_earnings = sum(booking.total_price for booking in completed_bookings)
         total_bookings = len(bookings)
         
-        # Get reviews for rating
-        from src.models.user import Review
-        reviews = Review.query.filter_by(tool_id=tool_id, review_type='tool_review').all()
-        avg_rating = sum(r.rating for r in reviews) / len(reviews) if reviews else 0
-        
         # Mock competitor analysis (in real app, this would query similar tools)
         competitor_analysis = [
             {
@@ -273,12 +457,21 @@ def get_tool_insights(tool_id):
             'views': 156,  # Mock data
             'bookings': total_bookings,
             'earnings': total_earnings,
-            'rating': avg_rating,
-            'reviews': len(reviews),
+            'rating': tool.average_rating,
+            'reviews': tool.rating_count,
             'viewsHistory': [],
             'bookingHistory': [],
             'competitorAnalysis': competitor_analysis
         }), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@tools_bp.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Rebuild the full-text search index from the tool table."""
+    if not fts_enabled():
+        click.echo('Full-text search is not available; searches use LIKE matching')
+        return
+    rebuild_search_index()
+    click.echo('Search index rebuilt')
@@ -0,0 +1,133 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from flask import current_app
+from src.models.user import db
+
+# Single-writer group commit (WRITE_QUEUE_ENABLED, off by default). Write
+# routes hand their mutation to run_write(); with the queue enabled one
+# writer thread runs queued mutations back to back, each inside its own
+# SAVEPOINT, and commits the whole batch in one transaction, so SQLite pays
+# for one lock acquisition and one fsync per batch instead of per request.
+# A batch is whatever queued up while the previous one committed, capped at
+# WRITE_QUEUE_MAX_BATCH; WRITE_QUEUE_MAX_DELAY_MS (default 0) additionally
+# holds a batch open for more writes after its first one. A mutation that
+# raises is rolled back alone and its caller gets the exception; if the
+# commit itself fails, every caller in the batch gets that error.
+#
+# Mutations run in the writer's app context and session: they must load
+# what they need by id, must not touch `request` or `session`, and flush
+# (not commit) before serializing their result.
+
+class WriteQueueFull(Exception):
+    pass
+
+class _Job:
+    __slots__ = ('fn', 'args', 'future')
+
+    def __init__(self, fn, args):
+        self.fn = fn
+        self.args = args
+        self.future = Future()
+
+class WriteQueue:
+    def __init__(self, app, max_batch=64, max_delay=0.0, max_pending=1024, submit_timeout=5.0):
+        self.app = app
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.submit_timeout = submit_timeout
+        self.batches = 0
+        self.jobs = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_writer(self):
+        # Started on first use, so only processes that serve requests run one
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+                self._thread.start()
+
+    def submit(self, fn, *args):
+        """Run fn(*args) on the writer thread; return its result once the batch has committed."""
+        self._ensure_writer()
+        job = _Job(fn, args)
+        try:
+            self._queue.put(job, timeout=self.submit_timeout)
+        except queue.Full:
+            raise WriteQueueFull('Write queue is full')
+        return job.future.result()
+
+    def pending(self):
+        """Writes submitted and not yet picked up by the writer thread."""
+        return self._queue.qsize()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit_batch(self, batch):
+        outcomes = []
+        for job in batch:
+            try:
+                with db.session.begin_nested():
+                    outcomes.append((job, job.fn(*job.args), None))
+            except Exception as e:
+                outcomes.append((job, None, e))
+        try:
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            outcomes = [(job, None, e) for job, _, _ in outcomes]
+        finally:
+            db.session.close()
+
+        self.batches += 1
+        self.jobs += len(batch)
+        for job, result, error in outcomes:
+            if error is None:
+                job.future.set_result(result)
+            else:
+                job.future.set_exception(error)
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                batch = self._next_batch()
+                try:
+                    self._commit_batch(batch)
+                except Exception as e:  # never leave a caller waiting
+                    for job in batch:
+                        if not job.future.done():
+                            job.future.set_exception(e)
+
+def run_write(fn, *args):
+    """Run a mutation and commit it, through the group-commit queue when enabled."""
+    write_queue = current_app.extensions.get('write_queue')
+    if write_queue is not None:
+        return write_queue.submit(fn, *args)
+    try:
+        result = fn(*args)
+        db.session.commit()
+        return result
+    except Exception:
+        db.session.rollback()
+        raise
+
+def init_write_queue(app):
+    if app.config.get('WRITE_QUEUE_ENABLED'):
+        app.extensions['write_queue'] = WriteQueue(
+            app,
+            max_batch=app.config.get('WRITE_QUEUE_MAX_BATCH', 64),
+            max_delay=app.config.get('WRITE_QUEUE_MAX_DELAY_MS', 0) / 1000,
+            max_pending=app.config.get('WRITE_QUEUE_MAX_PENDING', 1024)
+        )
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Every test module shares one app on a throwaway SQLite database; set up
+# the environment before any of them imports src.main
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.db')
+os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
@@ -0,0 +1,55 @@
+import pytest
+from src.main import app
+from src.models.user import db, User, Category, Tool
+
+PRICES = [12.0, None, 5.0, 12.0, None, 30.0, 5.0, None, 8.0, 12.0, 1.0]
+
+@pytest.fixture(scope='module')
+def tool_ids():
+    with app.app_context():
+        owner = User(username='owner', email='owner@example.com', password_hash='x', full_name='Owner')
+        category = Category(name='Pagination')
+        db.session.add_all([owner, category])
+        db.session.flush()
+        tools = [
+            Tool(owner_id=owner.id, category_id=category.id, name=f'Tool {i}', description='d', price_per_day=price)
+            for i, price in enumerate(PRICES)
+        ]
+        db.session.add_all(tools)
+        db.session.commit()
+        return {tool.id for tool in tools}
+
+def _offset_walk(client, sort_by):
+    ids, page = [], 1
+    while True:
+        data = client.get(f'/api/tools/?sort_by={sort_by}&per_page=3&page={page}').get_json()
+        ids += [tool['id'] for tool in data['tools']]
+        if page >= data['pages']:
+            return ids
+        page += 1
+
+def _cursor_walk(client, sort_by):
+    ids, cursor = [], ''
+    while True:
+        data = client.get(f'/api/tools/?sort_by={sort_by}&per_page=3&cursor={cursor}').get_json()
+        ids += [tool['id'] for tool in data['tools']]
+        cursor = data['next_cursor']
+        if not cursor:
+            return ids
+
+@pytest.mark.parametrize('sort_by', ['price_low', 'price_high', 'newest'])
+def test_cursor_pages_include_null_prices(tool_ids, sort_by):
+    client = app.test_client()
+    cursor_ids = _cursor_walk(client, sort_by)
+    assert len(cursor_ids) == len(set(cursor_ids)) == len(tool_ids)
+    assert set(cursor_ids) == tool_ids
+    assert cursor_ids == _offset_walk(client, sort_by)
+
+def test_null_prices_sort_lowest(tool_ids):
+    client = app.test_client()
+    with app.app_context():
+        prices = dict(db.session.query(Tool.id, Tool.price_per_day).all())
+    low = [prices[tool_id] for tool_id in _cursor_walk(client, 'price_low')]
+    high = [prices[tool_id] for tool_id in _cursor_walk(client, 'price_high')]
+    assert low[:3] == [None] * 3 and low[3:] == sorted(low[3:])
+    assert high[-3:] == [None] * 3 and high[:-3] == sorted(high[:-3], reverse=True)
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+import pytest
+from src.main import app
+from src.models.user import db, User, Category, Tool, ToolImage, Booking, Review, Message, Notification
+from src.query_plans import check_query_plans
+
+@pytest.fixture(scope='module')
+def lender_id():
+    with app.app_context():
+        lender = User(username='lender', email='lender@example.com', password_hash='x', full_name='Lender')
+        borrower = User(username='borrower', email='borrower@example.com', password_hash='x', full_name='Borrower')
+        category = Category(name='Plans')
+        db.session.add_all([lender, borrower, category])
+        db.session.flush()
+
+        now = datetime.utcnow()
+        for i in range(5):
+            tool = Tool(owner_id=lender.id, category_id=category.id, name=f'Drill {i}', description='Cordless drill',
+                        price_per_day=10.0 + i)
+            db.session.add(tool)
+            db.session.flush()
+            db.session.add(ToolImage(tool_id=tool.id, image_url=f'/images/{i}.jpg', is_primary=True))
+            booking = Booking(tool_id=tool.id, borrower_id=borrower.id, lender_id=lender.id,
+                              start_date=now - timedelta(days=10 - i), end_date=now - timedelta(days=8 - i),
+                              total_price=20.0, status='completed' if i % 2 else 'pending')
+            db.session.add(booking)
+            db.session.flush()
+            db.session.add_all([
+                Review(booking_id=booking.id, reviewer_id=borrower.id, reviewee_id=lender.id, tool_id=tool.id,
+                       rating=4, review_type='tool_review'),
+                Message(booking_id=booking.id, sender_id=borrower.id, receiver_id=lender.id, content='Hi'),
+                Notification(user_id=lender.id, type='booking_request', title='New request', booking_id=booking.id)
+            ])
+        db.session.commit()
+        return lender.id
+
+def test_read_endpoints_avoid_full_scans(lender_id):
+    with app.app_context():
+        endpoints, errors, plans = check_query_plans(app, lender_id)
+    assert errors == []
+    assert plans
+    scans = {' '.join(statement.split()): scans for statement, (_, scans) in plans.items() if scans}
+    assert scans == {}